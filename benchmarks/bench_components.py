@@ -0,0 +1,42 @@
+"""
+Time to render a list page of 10, 100 and 1000 row components when the
+rows have an async render method and when it's a plain method:
+
+    python -m benchmarks.bench_components
+"""
+
+import asyncio
+import time
+
+from redmage import Component
+from redmage.elements import Div, Li, Span, Ul
+from redmage.utils import astr
+
+
+class AsyncRow(Component):
+    n: int
+
+    def __init__(self, n: int):
+        self.n = n
+
+    async def render(self):
+        return Li(Span(str(self.n)), Span("item", _class="item"))
+
+
+class SyncRow(AsyncRow):
+    def render(self):
+        return Li(Span(str(self.n)), Span("item", _class="item"))
+
+
+async def measure(row: type, n_rows: int, n: int = 20) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        await astr(Div(Ul(*[row(i) for i in range(n_rows)])))
+    return (time.perf_counter() - start) / n
+
+
+if __name__ == "__main__":
+    for n_rows in (10, 100, 1000):
+        for row in (AsyncRow, SyncRow):
+            seconds = asyncio.run(measure(row, n_rows))
+            print(f"{n_rows:>5} rows {row.__name__:>8}: {seconds * 1000:.2f}ms")
@@ -0,0 +1,92 @@
+"""
+Response bytes and server time of a target that selects a row of a table
+of 1000 rows, responding with the whole table and with only the rows that
+changed:
+
+    python -m benchmarks.bench_diff
+"""
+
+import asyncio
+import time
+from typing import List, Tuple
+
+from redmage import Component, Redmage, Target
+from redmage.diffing import index_html
+from redmage.elements import Div, Table, Tbody, Td, Tr
+from redmage.utils import astr
+
+from .utils import build_scope, call_asgi
+
+ROWS = 1000
+
+
+def create_app(diff: bool) -> Tuple[Redmage, List[str]]:
+    Component.components = []
+    app = Redmage()
+
+    class Rows(Component):
+        state_store = True
+        selected: int
+
+        def __init__(self, selected: int = 0):
+            self.selected = selected
+
+        async def render(self):
+            return Table(
+                Tbody(
+                    *[
+                        Tr(
+                            Td(n, click=self.select(n)),
+                            Td(f"Row {n}"),
+                            Td("selected" if n == self.selected else ""),
+                            _id=f"{self.id}-{n}",
+                        )
+                        for n in range(ROWS)
+                    ],
+                )
+            )
+
+        @Target.post
+        def select(self, n: int):
+            self.selected = n
+
+    Rows.diff = diff
+    app.starlette
+    rows = Rows()
+    # rendered on the page first, which saves its state and last render
+    asyncio.run(astr(Div(rows)))
+    return app, [rows.select(n).path for n in (1, 2)]
+
+
+def measure(diff: bool, seconds: float = 2.0) -> Tuple[float, int]:
+    app, paths = create_app(diff)
+    scopes = [build_scope("POST", path) for path in paths]
+
+    async def run() -> Tuple[float, int]:
+        n = 0
+        size = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            # every request selects another row
+            status, body = await call_asgi(app.starlette, scopes[n % 2])
+            assert status == 200, body
+            size = len(body)
+            n += 1
+        return (time.perf_counter() - start) / n, size
+
+    return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    for diff in (False, True):
+        seconds, size = measure(diff)
+        name = "diff" if diff else "full"
+        print(f"{name:>6}: {size:>8,} bytes {seconds * 1000:>8.2f} ms/request")
+
+    app, paths = create_app(False)
+    html = asyncio.run(astr(Component.components[0][0](3)))
+    start = time.perf_counter()
+    for _ in range(20):
+        index_html(html)
+    elapsed = (time.perf_counter() - start) / 20
+    print(f"index: {len(html):>8,} bytes {elapsed * 1000:>8.2f} ms")
@@ -0,0 +1,48 @@
+"""
+Requests per second for a target with several path, query and component
+state params. Run before and after a change to compare:
+
+    python -m benchmarks.bench_dispatch
+"""
+
+import asyncio
+
+from redmage import Component, Redmage, Target
+from redmage.elements import Div
+
+from .utils import build_scope, call_asgi, requests_per_second
+
+app = Redmage()
+
+
+class DispatchComponent(Component):
+    name: str
+    count: int
+    enabled: bool
+
+    async def render(self):
+        return Div(f"{self.name} {self.count} {self.enabled}")
+
+    @Target.get
+    def update(
+        self,
+        a: int,
+        b: str,
+        c: float,
+        d: int = 0,
+        e: str = "e",
+        f: bool = False,
+    ):
+        self.count = a + d
+
+
+if __name__ == "__main__":
+    scope = build_scope(
+        "GET",
+        "/DispatchComponent/1/name/test/count/1/enabled/True/update/1/b/1.5",
+        {"update__d": 2, "update__e": "x", "update__f": True},
+    )
+    starlette = app.starlette
+    status, body = asyncio.run(call_asgi(starlette, scope))
+    assert status == 200, body
+    print(f"dispatch: {requests_per_second(starlette, scope):,.0f} requests/s")
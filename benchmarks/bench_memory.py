@@ -0,0 +1,26 @@
+"""
+Memory used per element by a tree of 100k elements, measured with
+tracemalloc:
+
+    python -m benchmarks.bench_memory
+"""
+
+import tracemalloc
+
+from redmage.elements import Li, Span, Ul
+
+
+def build_tree(n_elements: int) -> Ul:
+    # three elements per row
+    return Ul(
+        *[Li(Span(str(n)), Span("item", _class="item")) for n in range(n_elements // 3)]
+    )
+
+
+if __name__ == "__main__":
+    n_elements = 100_000
+    tracemalloc.start()
+    tree = build_tree(n_elements)
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{n_elements} elements: {traced / n_elements:.0f} bytes per element")
@@ -0,0 +1,54 @@
+"""
+Time to render a table of 100, 1k, 10k and 100k elements to a string with
+hype, which redmage rendered through before, and with the native
+serializer:
+
+    python -m benchmarks.bench_render
+"""
+
+import asyncio
+import time
+
+import hype.asyncio as hype
+
+from redmage.elements import Table, Td, Tr
+from redmage.utils import astr
+
+
+def build_table(n_elements: int) -> Table:
+    # three elements per row
+    return Table(
+        *[Tr(Td(str(n)), Td("cell", _class="cell")) for n in range(n_elements // 3)]
+    )
+
+
+def build_hype_table(n_elements: int) -> hype.Table:
+    return hype.Table(
+        *[
+            hype.Tr(hype.Td(str(n)), hype.Td("cell", _class="cell"))
+            for n in range(n_elements // 3)
+        ]
+    )
+
+
+async def measure(table: Table, hype_table: hype.Table, n: int = 5) -> tuple:
+    start = time.perf_counter()
+    for _ in range(n):
+        await hype_table.render()
+    hype_seconds = (time.perf_counter() - start) / n
+
+    start = time.perf_counter()
+    for _ in range(n):
+        await astr(table)
+    return hype_seconds, (time.perf_counter() - start) / n
+
+
+if __name__ == "__main__":
+    for n_elements in (100, 1_000, 10_000, 100_000):
+        hype_seconds, native_seconds = asyncio.run(
+            measure(build_table(n_elements), build_hype_table(n_elements))
+        )
+        print(
+            f"{n_elements:>7} elements: hype {hype_seconds * 1000:.2f}ms, "
+            f"native {native_seconds * 1000:.2f}ms"
+        )
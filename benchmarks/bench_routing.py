@@ -0,0 +1,50 @@
+"""
+Requests per second routing to the last registered target with 10, 100
+and 1000 targets, using Starlette's flat route list and the compiled
+target router:
+
+    python -m benchmarks.bench_routing
+"""
+
+import asyncio
+
+from redmage import Component, Redmage, Target
+from redmage.elements import Div
+
+from .utils import build_scope, call_asgi, requests_per_second
+
+
+async def render(self):
+    return Div("Hello World")
+
+
+def update(self, count: int):
+    self.count = count
+
+
+def create_app(n_targets: int, compiled_router: bool) -> Redmage:
+    Component.components = []
+    app = Redmage(compiled_router=compiled_router)
+    # a handful of targets per component like a real app
+    for n in range(n_targets // 5):
+        methods = {f"update_{m}": Target.get(update) for m in range(5)}
+        type(
+            f"Component{n}",
+            (Component,),
+            {"__annotations__": {"count": int}, "render": render, **methods},
+        )
+    return app
+
+
+if __name__ == "__main__":
+    for n_targets in (10, 100, 1000):
+        for compiled_router in (False, True):
+            app = create_app(n_targets, compiled_router)
+            last = n_targets // 5 - 1
+            scope = build_scope("GET", f"/Component{last}/1/count/0/update_4/1")
+            starlette = app.starlette
+            status, body = asyncio.run(call_asgi(starlette, scope))
+            assert status == 200, body
+            rps = requests_per_second(starlette, scope)
+            router = "compiled" if compiled_router else "flat"
+            print(f"{n_targets:>5} targets {router:>8}: {rps:,.0f} requests/s")
@@ -0,0 +1,75 @@
+"""
+URL length and requests per second for a target of a component with 12
+state fields, with a segment per field and with the state packed into one
+token, plain and signed and compressed:
+
+    python -m benchmarks.bench_state
+"""
+
+import asyncio
+
+from redmage import Component, Redmage, Target
+from redmage.elements import Div
+from redmage.tokens import StateCodec
+
+from .utils import build_scope, call_asgi, requests_per_second
+
+
+def create_app(state_codec: StateCodec = None) -> Redmage:
+    Component.components = []
+    app = Redmage(state_codec=state_codec)
+
+    class StateComponent(Component):
+        name: str
+        title: str
+        page: int
+        per_page: int
+        total: int
+        sort: str
+        ascending: bool
+        selected: int
+        filter: str
+        offset: int
+        expanded: bool
+        label: str
+
+        def __init__(self) -> None:
+            self.name = "orders"
+            self.title = "Recent orders"
+            self.page = 12
+            self.per_page = 50
+            self.total = 12345
+            self.sort = "created_at"
+            self.ascending = False
+            self.selected = 987654
+            self.filter = "status:shipped"
+            self.offset = 550
+            self.expanded = True
+            self.label = "Shipped orders"
+
+        async def render(self):
+            return Div(f"{self.name} {self.page}")
+
+        @Target.get
+        def next_page(self, page: int):
+            self.page = page
+
+    app.starlette
+    app.path = StateComponent().next_page(13).path  # type: ignore
+    return app
+
+
+if __name__ == "__main__":
+    for name, codec in (
+        ("segments", None),
+        ("token", StateCodec()),
+        ("signed", StateCodec(secret="secret", compress=True)),
+    ):
+        app = create_app(codec)
+        path = app.path  # type: ignore
+        scope = build_scope("GET", path)
+        starlette = app.starlette
+        status, body = asyncio.run(call_asgi(starlette, scope))
+        assert status == 200, body
+        rps = requests_per_second(starlette, scope)
+        print(f"{name:>8}: {len(path):>4} chars {rps:>10,.0f} requests/s")
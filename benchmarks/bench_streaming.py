@@ -0,0 +1,62 @@
+"""
+Time to first byte and total time of a full page built from the
+components in examples/examples.py plus a component that waits 50ms on
+I/O, with and without streaming:
+
+    python -m benchmarks.bench_streaming
+"""
+
+import asyncio
+import time
+
+from examples.examples import Examples
+from redmage import Component, Redmage
+from redmage.elements import Body, Div, Doc, Head, Html, Script, Title
+
+from .utils import build_scope, call_asgi
+
+
+class SlowComponent(Component):
+    async def render(self):
+        await asyncio.sleep(0.05)
+        return Div("Slow data")
+
+
+class Page(Component, routes=("/ttfb",)):
+    async def render(self):
+        return Doc(
+            Html(
+                Head(
+                    Title("Redmage | Streaming"),
+                    Script(src="https://unpkg.com/htmx.org@2.0.0-beta4"),
+                ),
+                Body(Examples(), SlowComponent()),
+            )
+        )
+
+
+async def measure(app: Redmage, n: int = 20) -> tuple:
+    scope = build_scope("GET", "/ttfb")
+    starlette = app.starlette
+    ttfb = total = 0.0
+    for _ in range(n):
+        start = time.perf_counter()
+        first = None
+
+        def on_message(message):
+            nonlocal first
+            if first is None and message.get("body"):
+                first = time.perf_counter()
+
+        status, _ = await call_asgi(starlette, scope, on_message=on_message)
+        assert status == 200
+        ttfb += first - start
+        total += time.perf_counter() - start
+    return ttfb / n, total / n
+
+
+if __name__ == "__main__":
+    for streaming in (False, True):
+        ttfb, total = asyncio.run(measure(Redmage(streaming=streaming)))
+        mode = "streaming" if streaming else "buffered"
+        print(f"{mode:>9}: ttfb {ttfb * 1000:.2f}ms, total {total * 1000:.2f}ms")
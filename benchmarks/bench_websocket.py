@@ -0,0 +1,110 @@
+"""
+Invocations per second of a POST target like the HoverCount of
+examples/example_8.py, each one a request over HTTP and each one a message
+over a single WebSocket connection:
+
+    python -m benchmarks.bench_websocket
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Dict
+
+from redmage import Component, Redmage, Target
+from redmage.elements import Div
+from redmage.targets import TARGET_PARAM, WS_PATH
+
+from .utils import build_scope, call_asgi, requests_per_second
+
+
+def create_app(websocket: bool) -> Redmage:
+    Component.components = []
+    app = Redmage(websocket=websocket)
+
+    class HoverCount(Component):
+        count: int
+
+        def __init__(self, count: int = 0):
+            self.count = count
+
+        async def render(self):
+            return Div(self.count, mouse_over=self.set_count(self.count + 1))
+
+        @Target.post
+        def set_count(self, count: int):
+            self.count = count
+
+    app.starlette
+    app.path = HoverCount().set_count(1).path  # type: ignore
+    return app
+
+
+def messages_per_second(
+    app: Redmage, pipelined: bool = False, seconds: float = 2.0
+) -> float:
+    """
+    One connection, waiting for the response to each message before
+    sending the next, or sending them 100 at a time like a page firing
+    events faster than they're answered.
+    """
+    starlette = app.starlette
+    message = json.dumps(
+        {
+            TARGET_PARAM: f"POST {app.path}",  # type: ignore
+            "HEADERS": {"HX-Request": "true", "HX-Trigger": None},
+        }
+    )
+    scope = {**build_scope("GET", WS_PATH), "type": "websocket", "scheme": "ws"}
+
+    async def run() -> float:
+        received: asyncio.Queue = asyncio.Queue()
+        sent: asyncio.Queue = asyncio.Queue()
+        await received.put({"type": "websocket.connect"})
+
+        async def send(message: Dict[str, Any]) -> None:
+            await sent.put(message)
+
+        connection = asyncio.create_task(starlette(scope, received.get, send))
+        assert (await sent.get())["type"] == "websocket.accept"
+
+        async def invoke(n: int) -> None:
+            if pipelined:
+                for _ in range(n):
+                    received.put_nowait({"type": "websocket.receive", "text": message})
+                for _ in range(n):
+                    await sent.get()
+            else:
+                for _ in range(n):
+                    await received.put({"type": "websocket.receive", "text": message})
+                    await sent.get()
+
+        # warm up
+        await invoke(100)
+        n = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            await invoke(100)
+            n += 100
+        elapsed = time.perf_counter() - start
+        await received.put({"type": "websocket.disconnect", "code": 1000})
+        await connection
+        return n / elapsed
+
+    return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    app = create_app(websocket=False)
+    headers = [(b"hx-request", b"true"), (b"hx-trigger", b"count")]
+    scope = build_scope("POST", app.path, headers=headers)  # type: ignore
+    status, body = asyncio.run(call_asgi(app.starlette, scope))
+    assert status == 200, body
+    rps = requests_per_second(app.starlette, scope)
+    print(f"{'http':>20}: {rps:>10,.0f} invocations/s")
+
+    app = create_app(websocket=True)
+    for pipelined in (False, True):
+        mps = messages_per_second(app, pipelined)
+        name = "websocket pipelined" if pipelined else "websocket"
+        print(f"{name:>20}: {mps:>10,.0f} invocations/s")
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+
+
+def build_scope(
+    method: str,
+    path: str,
+    query: Optional[Dict[str, Any]] = None,
+    headers: Optional[List[Tuple[bytes, bytes]]] = None,
+) -> Scope:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "client": ("testclient", 50000),
+        "root_path": "",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": urlencode(query or {}).encode(),
+        "headers": headers or [],
+    }
+
+
+async def call_asgi(
+    app: Callable[..., Awaitable[None]],
+    scope: Scope,
+    body: bytes = b"",
+    on_message: Optional[Callable[[Message], None]] = None,
+) -> Tuple[int, bytes]:
+    """
+    Drive an ASGI app directly, bypassing the network and test client, so
+    the numbers reflect the framework and not the transport.
+    """
+    status = 0
+    chunks = []
+    sent = False
+
+    async def receive() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # the client never disconnects, streaming responses listen for it
+        await asyncio.Event().wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        nonlocal status
+        if on_message:
+            on_message(message)
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(dict(scope), receive, send)
+    return status, b"".join(chunks)
+
+
+def requests_per_second(
+    app: Callable[..., Awaitable[None]],
+    scope: Scope,
+    body: bytes = b"",
+    seconds: float = 2.0,
+) -> float:
+    async def run() -> float:
+        # warm up
+        for _ in range(100):
+            await call_asgi(app, scope, body)
+        n = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            for _ in range(100):
+                await call_asgi(app, scope, body)
+            n += 100
+        return n / (time.perf_counter() - start)
+
+    return asyncio.run(run())
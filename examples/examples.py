@@ -90,7 +90,8 @@ class Counter(Component):
             Button("Add 1", target=self.iterate(self.n + 1)),
         )
 
-    @Target.get
+    # the response only depends on n, which is in the URL
+    @Target.get(cache=True)
     def iterate(self, n: int):
         self.n = n
 
@@ -25,6 +25,7 @@ from redmage.elements import (
     Title,
     Ul,
 )
+from redmage.types import HTMXSwap
 
 app = Redmage()
 
@@ -64,16 +65,19 @@ class TodoAppComponent(
         self.route = route
         self.router_component = TodoRouterComponent(self.route, self.todo_id)
 
+    # the head is the same on every page so it's only rendered once
+    head = Head(
+        Title("Todo App"),
+        Link(
+            rel="stylesheet",
+            href="https://unpkg.com/@picocss/pico@1.*/css/pico.min.css",
+        ),
+    ).freeze()
+
     async def render(self):
         return Doc(
             Html(
-                Head(
-                    Title("Todo App"),
-                    Link(
-                        rel="stylesheet",
-                        href="https://unpkg.com/@picocss/pico@1.*/css/pico.min.css",
-                    ),
-                ),
+                self.head,
                 Body(
                     self.router_component,
                     Script(src="https://unpkg.com/htmx.org@2.0.0-beta4"),
@@ -89,6 +93,12 @@ class TodoRouterComponent(Component):
         self.todo_id = todo_id
         Component.add_render_extension(router=self.router)
 
+    @property
+    def id(self) -> str:
+        # there's one router per page, a fixed id keeps the HTML of the
+        # memoized components that link to it the same on every request
+        return "TodoRouterComponent-main"
+
     @classmethod
     def get_route(cls, route: str, todo_id: int = 0):
         if route == "list":
@@ -105,6 +115,7 @@ class TodoRouterComponent(Component):
     async def render(self):
         return Div(
             TodoHeaderComponent(),
+            TodoCountComponent(),
             self.get_route(self.route, self.todo_id),
             _class="container",
         )
@@ -117,6 +128,8 @@ class TodoRouterComponent(Component):
 
 
 class TodoHeaderComponent(Component):
+    memoize = True
+
     async def render(self, router):
         return Nav(
             Ul(
@@ -143,48 +156,66 @@ class TodoHeaderComponent(Component):
         )
 
 
-class TodoListComponent(Component):
+class TodoCountComponent(Component):
+    # rendered again whenever a target writes the todos
+    reads = ("todos",)
+
+    async def render(self):
+        todos = db.get_todos()
+        finished = sum(todo.finished for todo in todos)
+        return Div(f"{finished} of {len(todos)} done")
+
+
+class TodoItemComponent(Component):
+    todo_id: int
+
+    def __init__(self, todo_id: int):
+        self.todo_id = todo_id
+
     async def render(self, router):
-        return Ul(
-            *[
-                Li(
-                    Form(
-                        Input(
-                            type="checkbox",
-                            checked=todo.finished,
-                            click=self.toggle(todo.id),
-                        ),
-                        style="display: inline;",
-                    ),
-                    A(
-                        todo.message if not todo.finished else S(todo.message),
-                        href="javascript:void(0);",
-                        click=router("edit", todo_id=todo.id),
-                        push_url=f"/edit/{todo.id}",
-                        style="display: inline;",
-                    ),
-                    A(
-                        Img(src="/static/images/trash-2.svg"),
-                        href="javascript:void(0);",
-                        click=self.delete_todo(todo.id),
-                        style="display: inline;",
-                        confirm="Are you sure you want to delete this todo?",
-                    ),
-                )
-                for todo in db.get_todos()
-            ],
+        todo = db.get_todo(self.todo_id)
+        return Li(
+            Form(
+                Input(
+                    type="checkbox",
+                    checked=todo.finished,
+                    click=self.toggle(),
+                ),
+                style="display: inline;",
+            ),
+            A(
+                todo.message if not todo.finished else S(todo.message),
+                href="javascript:void(0);",
+                click=router("edit", todo_id=todo.id),
+                push_url=f"/edit/{todo.id}",
+                style="display: inline;",
+            ),
+            A(
+                Img(src="/static/images/trash-2.svg"),
+                href="javascript:void(0);",
+                click=self.delete_todo(),
+                swap=HTMXSwap.DELETE,
+                style="display: inline;",
+                confirm="Are you sure you want to delete this todo?",
+            ),
         )
 
-    @Target.delete
-    def delete_todo(self, todo_id: int):
-        db.delete_todo(todo_id)
-        return TodoRouterComponent.get_route("list")
-
-    @Target.put
-    def toggle(self, /, todo_id: int):
-        todo = db.get_todo(todo_id)
+    # only the item and the count are swapped, not the whole list
+    @Target.put(writes=("todos",))
+    def toggle(self):
+        todo = db.get_todo(self.todo_id)
         db.update_todo(todo.id, todo.message, not todo.finished)
-        return TodoRouterComponent.get_route("list")
+
+    @Target.delete(writes=("todos",))
+    def delete_todo(self):
+        db.delete_todo(self.todo_id)
+        # the swap deletes the item whatever the response is
+        return Li()
+
+
+class TodoListComponent(Component):
+    async def render(self):
+        return Ul(*[TodoItemComponent(todo.id) for todo in db.get_todos()])
 
 
 class TodoAddComponent(Component):
@@ -194,7 +225,7 @@ class TodoAddComponent(Component):
             Button("Add", type="submit", click=self.add_todo(), push_url="/"),
         )
 
-    @Target.post
+    @Target.post(writes=("todos",))
     def add_todo(self, todo: db.Todo, /):
         db.create_todo(todo.message, False)
         return TodoRouterComponent.get_route("list")
@@ -218,7 +249,7 @@ class TodoEditComponent(Component):
             ),
         )
 
-    @Target.put
+    @Target.put(writes=("todos",))
     def edit_todo(self, todo: db.Todo, /, todo_id: int):
         self.todo_id = todo_id
         db.update_todo(todo_id, todo.message, self.todo.finished)
@@ -0,0 +1,333 @@
+import asyncio
+import logging
+import os
+import re
+import struct
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Optional, Set, Tuple
+from urllib.parse import urlencode
+
+from .elements import Div
+
+logger = logging.getLogger("redmage")
+
+# The endpoint browsers listen on with the htmx sse extension
+SSE_PATH = "/_redmage/sse"
+# The event the published HTML is sent as
+SSE_EVENT = "redmage"
+# The line breaks of the event stream format, str.splitlines also splits on
+# \x0b, \u2028 and others, which the client would join back with \n
+_LINE_BREAK = re.compile(r"\r\n|\r|\n")
+
+# Defaults of the subscriptions
+DEFAULT_MAX_QUEUED = 100
+# Seconds the hub waits for a process to take a frame before dropping it
+DEFAULT_DRAIN_TIMEOUT = 5.0
+
+Deliver = Callable[[str, str], None]
+
+# Frames between the processes and the hub: the length of the topic and
+# message, the length of the topic, then both in UTF-8
+FRAME_HEADER = struct.Struct(">IH")
+
+
+class Subscription:
+    """
+    The messages of some topics queued for one connection. At most
+    max_queued are kept, a slow client loses the oldest ones instead of
+    the server buffering everything for it.
+    """
+
+    def __init__(self, topics: Tuple[str, ...], max_queued: int = DEFAULT_MAX_QUEUED):
+        self.topics = topics
+        self.messages: Deque[str] = deque(maxlen=max_queued)
+        self.dropped = 0
+        self._ready = asyncio.Event()
+
+    def put(self, message: str) -> None:
+        if len(self.messages) == self.messages.maxlen:
+            self.dropped += 1
+        self.messages.append(message)
+        self._ready.set()
+
+    async def get(self) -> str:
+        while not self.messages:
+            self._ready.clear()
+            await self._ready.wait()
+        return self.messages.popleft()
+
+
+class BroadcastBackend(ABC):
+    """
+    Carries published messages to the broadcaster of every process of the
+    app, which hands them to its subscriptions. connect is called before
+    the first message is published with the function to deliver the
+    messages to.
+    """
+
+    @abstractmethod
+    async def connect(self, deliver: Deliver) -> None:
+        # start receiving the messages of every process
+        ...  # pragma: no cover
+
+    @abstractmethod
+    async def publish(self, topic: str, message: str) -> None:
+        # send the message to every process, this one included
+        ...  # pragma: no cover
+
+    async def disconnect(self) -> None:
+        pass
+
+
+class MemoryBackend(BroadcastBackend):
+    """
+    Delivers the messages straight to the broadcaster of this process, for
+    apps running in a single process.
+    """
+
+    def __init__(self) -> None:
+        self.deliver: Optional[Deliver] = None
+
+    async def connect(self, deliver: Deliver) -> None:
+        self.deliver = deliver
+
+    async def publish(self, topic: str, message: str) -> None:
+        if self.deliver is not None:
+            self.deliver(topic, message)
+
+
+def pack_frame(topic: str, message: str) -> bytes:
+    encoded_topic = topic.encode()
+    data = encoded_topic + message.encode()
+    return FRAME_HEADER.pack(len(data), len(encoded_topic)) + data
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    # the whole frame, header included
+    header = await reader.readexactly(FRAME_HEADER.size)
+    length, _ = FRAME_HEADER.unpack(header)
+    return header + await reader.readexactly(length)
+
+
+def unpack_frame(frame: bytes) -> Tuple[str, str]:
+    _, topic_length = FRAME_HEADER.unpack_from(frame)
+    start = FRAME_HEADER.size
+    end = start + topic_length
+    return frame[start:end].decode(), frame[end:].decode()
+
+
+class UnixSocketBackend(BroadcastBackend):
+    """
+    Connects the worker processes of the app on one host through a Unix
+    domain socket at path, so a message published in any of them reaches
+    the subscriptions of all of them. The first process to connect runs
+    the hub the others connect to, which sends every frame it gets to every
+    process, the one that published it included. If the process running
+    the hub exits, the others connect again and one of them takes over.
+    Messages published while there's no hub only reach this process. A
+    process that doesn't take a frame within drain_timeout seconds is
+    dropped by the hub instead of the hub buffering everything for it, it
+    connects again like when the hub is gone.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        reconnect_interval: float = 0.1,
+        drain_timeout: float = DEFAULT_DRAIN_TIMEOUT,
+    ):
+        self.path = path
+        self.reconnect_interval = reconnect_interval
+        self.drain_timeout = drain_timeout
+        self.deliver: Optional[Deliver] = None
+        # the hub, if it runs in this process, and its connections
+        self.hub: Optional[asyncio.AbstractServer] = None
+        self.peers: Set[asyncio.StreamWriter] = set()
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self._listen_task: Optional["asyncio.Task[None]"] = None
+
+    async def connect(self, deliver: Deliver) -> None:
+        self.deliver = deliver
+        reader = await self._open()
+        self._listen_task = asyncio.create_task(self._listen(reader))
+
+    async def _open(self) -> asyncio.StreamReader:
+        # not at the top, redmage is imported on platforms without it
+        import fcntl
+
+        # one process at a time looks for the hub and starts it if it's gone
+        with open(f"{self.path}.lock", "a") as lock:
+            while True:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    # without blocking the event loop
+                    await asyncio.sleep(0.01)
+            try:
+                reader, self.writer = await asyncio.open_unix_connection(self.path)
+            except (FileNotFoundError, ConnectionRefusedError):
+                if os.path.exists(self.path):
+                    # left by a hub that exited without removing it
+                    os.unlink(self.path)
+                self.hub = await asyncio.start_unix_server(self._serve, self.path)
+                reader, self.writer = await asyncio.open_unix_connection(self.path)
+        return reader
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        if self.hub is None:
+            # accepted just before the hub was closed
+            writer.close()
+            return
+        self.peers.add(writer)
+        try:
+            while True:
+                frame = await read_frame(reader)
+                await asyncio.gather(
+                    *(self._send(peer, frame) for peer in list(self.peers))
+                )
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.peers.discard(writer)
+            writer.close()
+
+    async def _send(self, peer: asyncio.StreamWriter, frame: bytes) -> None:
+        try:
+            peer.write(frame)
+            await asyncio.wait_for(peer.drain(), self.drain_timeout)
+        except (asyncio.TimeoutError, ConnectionError):
+            # stuck or gone, its connection is served no more
+            logger.warning("Dropped a process from the broadcast hub at %s", self.path)
+            self.peers.discard(peer)
+            peer.close()
+
+    async def _listen(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            try:
+                while True:
+                    frame = await read_frame(reader)
+                    if self.deliver is not None:
+                        self.deliver(*unpack_frame(frame))
+            except (asyncio.IncompleteReadError, ConnectionError):
+                logger.warning("Lost the broadcast hub at %s, reconnecting", self.path)
+            self.writer = None
+            while self.writer is None:
+                await asyncio.sleep(self.reconnect_interval)
+                try:
+                    reader = await self._open()
+                except OSError:
+                    logger.exception("Connecting to the broadcast hub failed")
+
+    async def publish(self, topic: str, message: str) -> None:
+        if self.writer is not None:
+            try:
+                self.writer.write(pack_frame(topic, message))
+                await self.writer.drain()
+                return
+            except ConnectionError:
+                # the hub is gone, _listen connects to the next one
+                pass
+        if self.deliver is not None:
+            self.deliver(topic, message)
+
+    async def disconnect(self) -> None:
+        if self._listen_task is not None:
+            self._listen_task.cancel()
+            self._listen_task = None
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        if self.hub is not None:
+            self.hub.close()
+            for peer in list(self.peers):
+                peer.close()
+            self.hub = None
+            os.unlink(self.path)
+
+
+class Broadcaster:
+    """
+    Fans the messages published on a topic out to every subscription of the
+    topic in this process, through a backend that carries them between
+    processes.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[BroadcastBackend] = None,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+    ):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.max_queued = max_queued
+        self.subscriptions: Dict[str, Set[Subscription]] = {}
+        self.published = 0
+        self.delivered = 0
+        self._connected: Optional["asyncio.Task[None]"] = None
+
+    async def connect(self) -> None:
+        # the first caller connects, the others wait for it
+        if self._connected is None:
+            self._connected = asyncio.ensure_future(self.backend.connect(self.deliver))
+        connected = self._connected
+        try:
+            await asyncio.shield(connected)
+        except Exception:
+            # not connected, the next call tries again
+            if self._connected is connected:
+                self._connected = None
+            raise
+
+    async def disconnect(self) -> None:
+        if self._connected is not None:
+            self._connected = None
+            await self.backend.disconnect()
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        subscription = Subscription(tuple(topics), self.max_queued)
+        for topic in subscription.topics:
+            self.subscriptions.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        for topic in subscription.topics:
+            subscriptions = self.subscriptions.get(topic)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[topic]
+
+    def deliver(self, topic: str, message: str) -> None:
+        for subscription in self.subscriptions.get(topic, ()):
+            subscription.put(message)
+            self.delivered += 1
+
+    async def publish(self, topic: str, message: str) -> None:
+        await self.connect()
+        self.published += 1
+        await self.backend.publish(topic, message)
+
+
+def format_event(message: str, event: str = SSE_EVENT) -> str:
+    # every line of the message is a data line of the event
+    data = "".join(f"data: {line}\n" for line in _LINE_BREAK.split(message))
+    return f"event: {event}\n{data}\n"
+
+
+def listen(*topics: str) -> Div:
+    """
+    The element that connects to the SSE endpoint with the htmx sse
+    extension, the components published on the topics are swapped in out
+    of band. It's never swapped itself, keep it out of the components
+    that are published so the connection isn't opened again.
+    """
+    query = urlencode([("topic", topic) for topic in topics])
+    return Div(
+        hx_ext="sse",
+        sse_connect=f"{SSE_PATH}?{query}",
+        sse_swap=SSE_EVENT,
+        hx_swap="none",
+    )
@@ -0,0 +1,248 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import (
+    Any,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from starlette.responses import Response
+
+# Defaults of the app's response cache
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+TAG_STATS = ("hits", "misses", "evictions", "invalidations")
+
+
+class CacheEntry:
+    __slots__ = ("value", "size", "expires", "stale_until", "tags")
+
+    def __init__(
+        self,
+        value: Any,
+        size: int,
+        expires: Optional[float],
+        stale_until: Optional[float] = None,
+        tags: Tuple[Hashable, ...] = (),
+    ):
+        self.value = value
+        self.size = size
+        self.expires = expires
+        # kept after it expires, until then it can still be served stale
+        self.stale_until = expires if stale_until is None else stale_until
+        self.tags = tags
+
+
+class LRUCache:
+    """
+    An in-process cache that evicts the least recently used entries once it
+    holds more than max_entries entries or max_bytes bytes. Entries expire
+    after ttl seconds, if there's one, and the cache or each entry can set
+    it. The size of an entry is given when it's set.
+
+    Entries can be tagged and all the entries with a tag invalidated at
+    once, the keys are indexed by tag so it only touches those entries.
+    Hits, misses, evictions and invalidations are also counted per tag.
+
+    An entry can be kept for max_stale seconds after it expires, get_stale
+    still returns it, flagged as stale, for stale-while-revalidate.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl: Optional[float] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.tags: Dict[Hashable, Set[Hashable]] = {}
+        self.tag_stats: Dict[Hashable, Dict[str, int]] = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self.entries.get(key)
+        return entry is not None and not self._expired(entry)
+
+    def _expired(self, entry: CacheEntry) -> bool:
+        return entry.expires is not None and entry.expires <= monotonic()
+
+    def _dead(self, entry: CacheEntry) -> bool:
+        return entry.stale_until is not None and entry.stale_until <= monotonic()
+
+    def _count(self, tags: Iterable[Hashable], name: str, n: int = 1) -> None:
+        for tag in tags:
+            stats = self.tag_stats.get(tag)
+            if stats is None:
+                stats = self.tag_stats[tag] = dict.fromkeys(TAG_STATS, 0)
+            stats[name] += n
+
+    def get(self, key: Hashable, tags: Iterable[Hashable] = ()) -> Any:
+        # tags are only used to count a miss, a hit counts the entry's
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            self._count(tags, "misses")
+            return None
+        if self._expired(entry):
+            if self._dead(entry):
+                self.delete(key)
+            self.misses += 1
+            self._count(tags, "misses")
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        self._count(entry.tags, "hits")
+        return entry.value
+
+    def get_stale(
+        self, key: Hashable, tags: Iterable[Hashable] = ()
+    ) -> Tuple[Any, bool]:
+        # the value and whether it's stale, (None, False) on a miss
+        entry = self.entries.get(key)
+        if entry is None or self._dead(entry):
+            if entry is not None:
+                self.delete(key)
+            self.misses += 1
+            self._count(tags, "misses")
+            return None, False
+        self.entries.move_to_end(key)
+        self.hits += 1
+        self._count(entry.tags, "hits")
+        stale = self._expired(entry)
+        if stale:
+            self.stale_hits += 1
+        return entry.value, stale
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        size: int,
+        ttl: Optional[float] = None,
+        tags: Iterable[Hashable] = (),
+        max_stale: Optional[float] = None,
+    ) -> None:
+        self.delete(key)
+        if size > self.max_bytes:
+            # would evict everything else and still not fit
+            return
+
+        ttl = self.ttl if ttl is None else ttl
+        expires = monotonic() + ttl if ttl is not None else None
+        stale_until = expires + max_stale if expires is not None and max_stale else None
+        entry = CacheEntry(value, size, expires, stale_until, tuple(tags))
+        self.entries[key] = entry
+        self.nbytes += size
+        for tag in entry.tags:
+            self.tags.setdefault(tag, set()).add(key)
+
+        while len(self.entries) > self.max_entries or self.nbytes > self.max_bytes:
+            self._evict(next(iter(self.entries)))
+
+    def _evict(self, key: Hashable) -> None:
+        self._count(self.entries[key].tags, "evictions")
+        self.delete(key)
+        self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        self.nbytes -= entry.size
+        for tag in entry.tags:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+        return True
+
+    def invalidate(self, tag: Hashable) -> int:
+        keys = self.tags.pop(tag, ())
+        for key in list(keys):
+            self.delete(key)
+        if keys:
+            # the entries invalidated
+            self._count((tag,), "invalidations", len(keys))
+        return len(keys)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.tags.clear()
+        self.nbytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.nbytes,
+        }
+
+
+class CachePolicy(NamedTuple):
+    """
+    How the responses of a GET target or route are cached. Without a cache
+    the app's response cache is used, without a ttl the cache's.
+
+    With max_stale an expired response is still served for up to
+    max_stale seconds while it's rendered again in the background.
+    """
+
+    ttl: Optional[float] = None
+    cache: Optional[LRUCache] = None
+    max_stale: Optional[float] = None
+
+
+CacheOption = Union[None, bool, float, CachePolicy]
+
+
+def get_cache_policy(option: CacheOption) -> Optional[CachePolicy]:
+    # cache=True, cache=<ttl in seconds> or cache=CachePolicy(...)
+    if option is None or option is False:
+        return None
+    if option is True:
+        return CachePolicy()
+    if isinstance(option, CachePolicy):
+        return option
+    return CachePolicy(ttl=option)
+
+
+class CachedResponse(NamedTuple):
+    status_code: int
+    raw_headers: Tuple[Tuple[bytes, bytes], ...]
+    body: bytes
+
+    @classmethod
+    def from_response(cls, response: Response) -> "CachedResponse":
+        return cls(response.status_code, tuple(response.raw_headers), response.body)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.raw_headers)
+
+    def to_response(self) -> Response:
+        response = Response(self.body, status_code=self.status_code)
+        headers: List[Tuple[bytes, bytes]] = list(self.raw_headers)
+        response.raw_headers = headers
+        return response
@@ -0,0 +1,61 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from starlette.responses import Response
+
+from .cache import CachedResponse
+
+
+class SingleFlight:
+    """
+    Coalesces identical requests in flight at the same time. The first
+    request for a key renders the response and the requests for the same
+    key that arrive before it's done wait for it and get a copy, instead
+    of each rendering their own.
+    """
+
+    def __init__(self) -> None:
+        self.in_flight: Dict[Hashable, "asyncio.Future[Optional[CachedResponse]]"] = {}
+        self.requests = 0
+        self.coalesced = 0
+
+    async def run(
+        self, key: Hashable, route_function: Callable[[], Awaitable[Response]]
+    ) -> Response:
+        self.requests += 1
+        future = self.in_flight.get(key)
+        if future is not None:
+            # the first request being cancelled doesn't cancel this one
+            cached = await asyncio.shield(future)
+            if cached is not None:
+                self.coalesced += 1
+                return cached.to_response()
+            # the first request failed or its response can't be copied,
+            # like a streaming response, so render it for this one too
+            return await route_function()
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            response = await route_function()
+        except BaseException:
+            # the waiting requests render it themselves
+            future.set_result(None)
+            raise
+        finally:
+            del self.in_flight[key]
+
+        future.set_result(
+            CachedResponse.from_response(response)
+            if hasattr(response, "body")
+            else None
+        )
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            # the share of requests that didn't render
+            "ratio": self.coalesced / self.requests if self.requests else 0.0,
+        }
@@ -1,24 +1,106 @@
 import logging
 from abc import ABC, abstractmethod
 from collections import OrderedDict
-from inspect import Parameter, signature
-from typing import Any, Dict, Optional
+from contextvars import ContextVar
+from inspect import Parameter, getmembers, isawaitable, isfunction, signature
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    ClassVar,
+    Dict,
+    Hashable,
+    Optional,
+)
 from typing import OrderedDict as OrderedDictType
-from typing import Tuple, Type
-from uuid import uuid1
+from typing import Tuple, Type, Union
+from uuid import uuid4
 
-from starlette.convertors import CONVERTOR_TYPES as starlette_convertors
-from starlette.responses import HTMLResponse
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, Response, StreamingResponse
 
-from .utils import astr, group_signature_param_by_kind
+from .cache import CacheOption, LRUCache
+from .ids import random_id, uuid_id
+from .state import StateSchema
+from .stores import StateStore
+from .utils import astr, astream
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .core import Redmage
+    from .elements import Element
 
 logger = logging.getLogger("redmage")
 
 
+class MemoScope:
+    """
+    Set while a memoized component renders. Its HTML isn't reused if a
+    component within it has targets, stored state or reads stores, their
+    ids would be reused with it.
+
+    The component is rendered with placeholder in place of its id, unique
+    to the render so only its own is patched, and made of characters that
+    are the same in HTML, JSON and URLs so it's found wherever the id is.
+    """
+
+    __slots__ = ("reusable", "placeholder", "outer")
+
+    def __init__(self, outer: Optional["MemoScope"] = None) -> None:
+        self.reusable = True
+        self.placeholder = f"memo{uuid4().hex}"
+        self.outer = outer
+
+    def has_outer_placeholders(self, html: str) -> bool:
+        # the ids of the memoized components it's in, passed down with
+        # their targets, which only they can patch
+        outer = self.outer
+        while outer is not None and outer.placeholder not in html:
+            outer = outer.outer
+        return outer is not None
+
+
+_memo_scope: ContextVar[Optional[MemoScope]] = ContextVar(
+    "redmage_memo_scope", default=None
+)
+
+# Whether each component class has targets
+_target_classes: Dict[type, bool] = {}
+
+
 class Component(ABC):
-    app: "Redmage"  # type: ignore
+    if TYPE_CHECKING:  # pragma: no cover
+        # only annotated for type checkers so it's never mistaken for state
+        app: "Redmage"
     request = None  # type: ignore
     components = []  # type: ignore
+    # how the responses of the GET targets are cached, see Target.get
+    cache_policy: ClassVar[CacheOption] = None
+    # True, or an LRUCache, to reuse the HTML of instances with the same
+    # state and render extensions, see _memoize
+    memoize: ClassVar[Union[bool, LRUCache]] = False
+    # identical GET target requests in flight at the same time share one
+    # render, see Target.get
+    coalesce: ClassVar[bool] = False
+    # tags of the memoized HTML and cached target responses, invalidated
+    # with Redmage.invalidate
+    cache_tags: ClassVar[Tuple[Hashable, ...]] = ()
+    # answer conditional GET requests to the routes and GET targets with
+    # 304 Not Modified, see get_version
+    etag: ClassVar[bool] = False
+    # True, or a StateStore, to keep the state on the server and only put
+    # the id in the paths of the targets, see save_state
+    state_store: ClassVar[Union[bool, StateStore]] = False
+    # True, or an LRUCache, to respond to its targets with only the
+    # elements with an id that changed since it was last rendered, see
+    # get_diff_cache
+    diff: ClassVar[Union[bool, LRUCache]] = False
+    # the stores it renders from, it's rendered again and swapped in out of
+    # band after a target on its page writes any of them, see Target.post
+    reads: ClassVar[Tuple[Hashable, ...]] = ()
+    # the attributes render uses besides the annotated state, kept with the
+    # state of a component that reads stores to render it again
+    render_attrs: ClassVar[Tuple[str, ...]] = ()
     render_extensions: Dict[str, Any] = {}
 
     def __init_subclass__(cls, routes: Optional[Tuple[str]] = None, **kwargs: Any):
@@ -26,7 +108,7 @@ class Component(ABC):
         Component.components.append((cls, routes))
 
     @classmethod
-    def set_app(cls, app: "Redmage") -> None:  # type: ignore
+    def set_app(cls, app: "Redmage") -> None:
         cls.app = app
 
     @classmethod
@@ -34,38 +116,22 @@ class Component(ABC):
         for key, value in kwargs.items():
             cls.render_extensions[key] = value
 
+    @classmethod
+    def get_state_schema(cls) -> StateSchema:
+        # cached per class, subclasses get their own
+        if "_state_schema" not in cls.__dict__:
+            app = getattr(Component, "app", None)
+            codec = app.state_codec if app else None
+            stored = cls.state_store is not False
+            setattr(cls, "_state_schema", StateSchema(cls, codec, stored))
+        return cls.__dict__["_state_schema"]
+
     @classmethod
     def get_base_path(cls, instance: Optional["Component"] = None) -> str:
-        def get_uuid(instance: "Component") -> str:
-            parts = instance.id.split("-")
-            return "-".join(parts[1:])
-
-        uuid = get_uuid(instance) if instance else "{id:str}"
-        path = f"/{cls.__name__}/{uuid}"
-
-        if getattr(cls, "__annotations__", None):
-            annotations = cls.__annotations__
-            annotations.pop("app", None)
-            annotations.pop("render_extensions", None)
-
-            for field, field_type in annotations.items():
-                convertor = starlette_convertors[
-                    (
-                        field_type
-                        if (
-                            isinstance(field_type, str)
-                            or not hasattr(field_type, "__name__")
-                        )
-                        else field_type.__name__
-                    )
-                ]
-                value = (
-                    convertor.to_string(getattr(instance, field, None))
-                    if instance
-                    else f"{{{field}:{field_type.__name__}}}"
-                )
-                path += f"/{field}/{value}"
-        return path
+        schema = cls.get_state_schema()
+        if instance:
+            return schema.build_path(instance)
+        return schema.route_path
 
     @classmethod
     def get_target_path(
@@ -75,115 +141,293 @@ class Component(ABC):
         instance: Optional["Component"] = None,
         **kwargs: Any,
     ) -> str:
-        # TODO refactor
-        # This method behaves in two different ways
-        # depending on whether the instance is passed or not
-        # because once the method is bound the signature is different
-        # Nice to have it in one spot though
+        # This method behaves in two different ways depending on whether
+        # the instance is passed or not, because once the method is bound
+        # the signature is different. With an instance the target path
+        # builder generated when the target was registered is used.
         method_fn = getattr(cls, method_name)
-        path = f"/{method_name}"
 
         if instance:
-            # We want the developer to be able to pass the args as positional or keywords
-            # like a normal python function but still know if it's path param or query param
-            # it just depends on the order of the params in the signature
-            positional_or_keyword_params = list(args) + list(kwargs.values())
-            grouped_params = group_signature_param_by_kind(method_fn.target_signature)
-
-            # self could be position only or postion_or_keyword
-            # so set an offset to account for it
-            if grouped_params[Parameter.POSITIONAL_OR_KEYWORD]:
-                offset = (
-                    1
-                    if grouped_params[Parameter.POSITIONAL_OR_KEYWORD][0].name == "self"
-                    else 0
-                )
+            return method_fn.path_builder(args, kwargs)
 
-            for n, param_value in enumerate(
-                grouped_params[Parameter.POSITIONAL_OR_KEYWORD]
-            ):
-                if (
-                    param_value.default == Parameter.empty
-                    and param_value.name != "self"
-                    and len(positional_or_keyword_params) >= n
-                ):
-                    convertor = starlette_convertors[param_value.annotation.__name__]
-                    value = convertor.to_string(
-                        positional_or_keyword_params[n - offset]
-                    )
-                    path += f"/{value}"
-
-            path += "?"
-
-            for n, param_value in enumerate(
-                grouped_params[Parameter.POSITIONAL_OR_KEYWORD]
-                + grouped_params[Parameter.KEYWORD_ONLY]
+        path = f"/{method_name}"
+        params = signature(method_fn).parameters
+        for param_value in params.values():
+            if (
+                param_value.default == Parameter.empty
+                and param_value.kind != Parameter.POSITIONAL_ONLY
+                and param_value.name != "self"
             ):
-                if (
-                    param_value.default != Parameter.empty
-                    and param_value.kind != Parameter.POSITIONAL_ONLY
-                    and param_value.name != "self"
-                    and len(positional_or_keyword_params) >= n
-                ):
-                    ann = (
-                        param_value.annotation
-                        if isinstance(param_value.annotation, str)
-                        else param_value.annotation.__name__
-                    )
-                    convertor = starlette_convertors[ann]
-                    value = convertor.to_string(
-                        positional_or_keyword_params[n - offset]
-                    )
-                    path += f"{method_name}__{param_value.name}="
-                    path += f"{value}&"
-
-            path = path[:-1]  # Have to remove whatever the last character is
-
-        else:
-            params = signature(method_fn).parameters
-            for param_value in params.values():
-                if (
-                    param_value.default == Parameter.empty
-                    and param_value.kind != Parameter.POSITIONAL_ONLY
-                    and param_value.name != "self"
-                ):
-                    ann = (
-                        param_value.annotation
-                        if isinstance(param_value.annotation, str)
-                        else param_value.annotation.__name__
-                    )
-                    path += f"/{{{method_name}__{param_value.name}:{ann}}}"
+                ann = (
+                    param_value.annotation
+                    if isinstance(param_value.annotation, str)
+                    else param_value.annotation.__name__
+                )
+                path += f"/{{{method_name}__{param_value.name}:{ann}}}"
 
         return path
 
     @property
     def id(self) -> str:
         if not hasattr(self, "_id"):
-            self._id = f"{self.__class__.__name__}-{str(uuid1())}"
+            app = getattr(Component, "app", None)
+            # the id of a stored component is the key of its state, so it
+            # can't be guessed or shared
+            id_strategy = (
+                app.id_strategy if app and self.state_store is False else random_id
+            )
+            self._id = f"{self.__class__.__name__}-{id_strategy(self)}"
         return self._id
 
     @abstractmethod
-    async def render(self, **exts: Any) -> "Element":  # type: ignore
+    def render(self, **exts: Any) -> Union["Element", Awaitable["Element"]]:
+        # render can be a plain method when it doesn't need to await
+        # anything, the element is then rendered without any coroutines
         ...  # pragma: no cover
 
+    @classmethod
+    def get_render_params(cls) -> Tuple[Tuple[str, bool], ...]:
+        # cached per class, (name, is **kwargs) of each render param
+        if "_render_params" not in cls.__dict__:
+            # without self, like the signature of the bound method
+            params = list(signature(cls.render).parameters.values())[1:]
+            setattr(
+                cls,
+                "_render_params",
+                tuple((p.name, p.kind == Parameter.VAR_KEYWORD) for p in params),
+            )
+        return cls.__dict__["_render_params"]
+
     def _filter_render_extensions(self) -> OrderedDictType[str, Any]:
         args = OrderedDict()
-        params = signature(self.render).parameters
-        for param in params.values():
-            if param.name in self.render_extensions.keys():
-                args[param.name] = self.render_extensions[param.name]
-            if param.kind == Parameter.VAR_KEYWORD:
+        for name, var_keyword in self.get_render_params():
+            if name in self.render_extensions.keys():
+                args[name] = self.render_extensions[name]
+            if var_keyword:
                 args.update(self.render_extensions)
         return args
 
+    def _call_render(self) -> Union["Element", Awaitable["Element"]]:
+        return self.render(**self._filter_render_extensions())
+
+    @classmethod
+    def get_version(cls, request: Request) -> Union[Hashable, Awaitable[Hashable]]:
+        """
+        A version of the data the responses of the component are rendered
+        from, like the time the rows it shows were last updated. Along with
+        the URL it makes the ETag, so a request with a matching
+        If-None-Match gets 304 Not Modified without rendering at all.
+        None hashes the rendered body instead.
+        """
+        return None
+
     def set_element_id(self, el: "Element") -> None:  # type: ignore
         el.attrs(_id=self.id)
 
     def build_response(self, content: Any) -> HTMLResponse:
         return HTMLResponse(content)
 
+    def build_streaming_response(self, content: AsyncIterator[str]) -> Response:
+        return StreamingResponse(content, media_type="text/html")
+
+    async def _render_element(self) -> "Element":  # type: ignore
+        el = self._call_render()
+        if isawaitable(el):
+            el = await el
+        self.set_element_id(el)
+        return el
+
+    @classmethod
+    def get_render_cache(cls) -> Optional[LRUCache]:
+        if cls.memoize is True:
+            app = getattr(Component, "app", None)
+            return app.render_cache if app else None
+        return cls.memoize if isinstance(cls.memoize, LRUCache) else None
+
+    @classmethod
+    def has_targets(cls) -> bool:
+        has = _target_classes.get(cls)
+        if has is None:
+            # registered targets are replaced by the methods building them
+            has = _target_classes[cls] = any(
+                hasattr(fn, "is_target") or hasattr(fn, "target_signature")
+                for _, fn in getmembers(cls, predicate=isfunction)
+            )
+        return has
+
+    def check_memoized(self) -> None:
+        # called every time a component is rendered
+        scope = _memo_scope.get()
+        if scope is not None and (
+            self.state_store is not False or self.reads or self.has_targets()
+        ):
+            scope.reusable = False
+
+    @classmethod
+    def get_memo_tags(cls) -> Tuple[Hashable, ...]:
+        # the stores it reads are invalidated when a target writes them
+        return (cls, *cls.cache_tags, *cls.reads)
+
+    @classmethod
+    def clear_memoized(cls) -> int:
+        cache = cls.get_render_cache()
+        return cache.invalidate(cls) if cache is not None else 0
+
+    @classmethod
+    def get_state_store(cls) -> Optional[StateStore]:
+        if cls.state_store is True:
+            app = getattr(Component, "app", None)
+            return app.state_store if app else None
+        return cls.state_store if isinstance(cls.state_store, StateStore) else None
+
+    @classmethod
+    def has_unique_ids(cls) -> bool:
+        """
+        Whether the id of an instance is only ever the id of one instance on
+        one page, with the uuid id strategy or stored state. Not with the
+        deterministic id strategy or a custom id, nor the counter id
+        strategy, which starts over in every process and restart.
+        """
+        app = getattr(Component, "app", None)
+        if app is None:
+            return False
+        return cls.state_store is not False or (
+            cls.id is Component.id and app.id_strategy is uuid_id
+        )
+
+    @classmethod
+    def get_diff_cache(cls) -> Optional[LRUCache]:
+        """
+        Where the last render of each instance is kept to diff the next one
+        against, by id. None unless the ids are unique, it would be diffed
+        against the render of another client otherwise.
+        """
+        if cls.diff is False or not cls.has_unique_ids():
+            return None
+        return Component.app.diff_cache if cls.diff is True else cls.diff
+
+    def track(self) -> None:
+        # the page the component is rendered on, for the targets that write
+        # the stores the components on it read
+        app = getattr(Component, "app", None)
+        if app is not None and app.dependency_graph.enabled:
+            app.dependency_graph.track(self)
+
+    def save_state(self) -> None:
+        """
+        Save the state of a stored component, by its id, for the target
+        requests that come back with only the id. Called every time the
+        component is rendered.
+        """
+        store = self.get_state_store()
+        if store is not None:
+            names = (field.name for field in self.get_state_schema().fields)
+            store.save(self.id, dict(zip(names, self._get_state())))
+
+    def _get_state(self) -> Tuple[Any, ...]:
+        return tuple(
+            getattr(self, field.name, None) for field in self.get_state_schema().fields
+        )
+
+    @staticmethod
+    def _get_extension_key(extension: Any) -> Hashable:
+        # A target method of another component, like a router, is equal
+        # for every instance with the same id and state
+        owner = getattr(extension, "__self__", None)
+        if isinstance(owner, Component):
+            return (extension.__func__, owner.id, owner._get_state())
+        return extension
+
+    def _get_memo_key(self) -> Optional[Tuple[Hashable, ...]]:
+        cls = type(self)
+        state = self._get_state()
+        extensions = tuple(
+            (name, self._get_extension_key(extension))
+            for name, extension in self._filter_render_extensions().items()
+        )
+        # a custom id can't be patched in so it's part of the key
+        custom_id = None if cls.id is Component.id else self.id
+        key = (cls, state, extensions, custom_id)
+        try:
+            hash(key)
+        except TypeError:
+            # unhashable state is never memoized
+            return None
+        return key
+
+    def _get_memoized(self) -> Optional[str]:
+        cache = self.get_render_cache()
+        key = self._get_memo_key() if cache is not None else None
+        if cache is None or key is None:
+            return None
+        parts = cache.get(key, tags=self.get_memo_tags())
+        if parts is None:
+            return None
+        return self.id.partition("-")[2].join(parts)
+
+    async def _memoize(self) -> str:
+        """
+        Render the component and store the HTML for the instances with the
+        same state and render extensions. It's rendered with a placeholder
+        id which is split out so the id of each instance can be patched in,
+        the id of the element and the paths of its targets. It isn't stored
+        when it holds the placeholder of a memoized component it's in.
+        """
+        cache = self.get_render_cache()
+        key = self._get_memo_key() if cache is not None else None
+        if cache is None or key is None:
+            return await astr(await self._render_element())
+
+        patch = key[-1] is None
+        outer = _memo_scope.get()
+        scope = MemoScope(outer)
+        if patch:
+            id = self.id
+            self._id = f"{type(self).__name__}-{scope.placeholder}"
+        token = _memo_scope.set(scope)
+        try:
+            html = await astr(await self._render_element())
+        finally:
+            _memo_scope.reset(token)
+            if patch:
+                self._id = id
+
+        parts = html.split(scope.placeholder) if patch else [html]
+        if not scope.reusable:
+            # rendered every time, and so is a memoized component it's in
+            if outer is not None:
+                outer.reusable = False
+        elif not scope.has_outer_placeholders(html):
+            cache.set(key, tuple(parts), len(html), tags=self.get_memo_tags())
+        return self.id.partition("-")[2].join(parts)
+
     async def _astr_(self) -> str:
-        render_extentions = self._filter_render_extensions()
-        el = await self.render(**render_extentions)
+        self.track()
+        self.check_memoized()
+        if self.state_store is not False:
+            self.save_state()
+        if self.memoize is not False:
+            html = self._get_memoized()
+            return html if html is not None else await self._memoize()
+        return await astr(await self._render_element())
+
+    async def _astream_(self) -> AsyncIterator[str]:
+        self.track()
+        self.check_memoized()
+        if self.state_store is not False:
+            self.save_state()
+        if self.memoize is not False:
+            html = self._get_memoized()
+            if html is None:
+                yield ""
+                html = await self._memoize()
+            yield html
+            return
+        el = self._call_render()
+        if isawaitable(el):
+            # rendering may wait on I/O so let everything before it be sent
+            yield ""
+            el = await el
         self.set_element_id(el)
-        return await astr(el)
+        async for chunk in astream(el):
+            yield chunk
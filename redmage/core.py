@@ -1,36 +1,179 @@
+import asyncio
+import json
 import logging
-from inspect import Parameter, getmembers, iscoroutine, isfunction, signature
+from contextlib import asynccontextmanager
+from html import escape
+from inspect import getmembers, isawaitable, isfunction, signature
 from types import FunctionType
-from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+from urllib.parse import urlencode
 
 from starlette.applications import Starlette
-from starlette.convertors import CONVERTOR_TYPES as starlette_convertors
-from starlette.datastructures import FormData, QueryParams
+from starlette.datastructures import FormData
+from starlette.exceptions import HTTPException
 from starlette.middleware import Middleware
 from starlette.requests import Request
-from starlette.responses import HTMLResponse
-from starlette.routing import Route
+from starlette.responses import HTMLResponse, Response, StreamingResponse
+from starlette.routing import BaseRoute, Match, Route, WebSocketRoute
+from starlette.types import Message, Scope
+from starlette.websockets import WebSocket, WebSocketDisconnect
 
-from redmage.exceptions import RedmageError
+from redmage.exceptions import InvalidStateToken, RedmageError
 
+from .broadcast import SSE_PATH, Broadcaster, format_event
+from .cache import TAG_STATS, CachedResponse, CachePolicy, LRUCache, get_cache_policy
+from .coalescing import SingleFlight
 from .components import Component
-from .targets import Target
-from .types import HTTPMethod
-from .utils import astr
+from .diffing import (
+    DEFAULT_MAX_TREES,
+    enter_shared_render,
+    exit_shared_render,
+    forget_render,
+    record_shared,
+    render_diff,
+)
+from .dispatch import DispatchPlan, compile_dispatch_plan
+from .elements import DEFAULT_RENDER_CONCURRENCY
+from .etags import content_etag, etag_matches, not_modified, version_etag
+from .ids import IdOption, enter_id_scope, get_id_strategy
+from .paths import compile_target_path_builder
+from .reactive import DependencyGraph
+from .routing import TargetRouter
+from .stores import MemoryStateStore, StateStore
+from .targets import BATCH_PATH, SWAP_PARAM, WS_PATH, Target, parse_swap
+from .tokens import STATE_PARAM, StateCodec
+from .types import HTMXSwap, HTTPMethod
+from .utils import astr, astream, buffer_stream
+from .websockets import parse_message
 
 logger = logging.getLogger("redmage")
 
 
 ComponentClass = Type[Component]
+TargetCall = Callable[[Request], Awaitable[Tuple[Component, Tuple[Any, ...]]]]
+
+
+async def _receive_empty() -> Message:
+    # the body of a request rendered again in the background, after the
+    # original request is gone
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+def _receive(body: bytes) -> Callable[[], Awaitable[Message]]:
+    async def receive() -> Message:
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return receive
+
+
+def _swap_oob(html: str, swap: str = "true") -> str:
+    # marks the root element of a rendered component to be swapped in out
+    # of band, by its id unless swap has a selector
+    start = html.find("<")
+    if start == -1:
+        return html
+    end = start + 1
+    while end < len(html) and html[end] not in " \t\n/>":
+        end += 1
+    return f'{html[:end]} hx-swap-oob="{escape(swap)}"{html[end:]}'
 
 
 class Redmage:
     def __init__(
-        self, middleware: Optional[Sequence[Middleware]] = None, debug: bool = False
+        self,
+        middleware: Optional[Sequence[Middleware]] = None,
+        debug: bool = False,
+        compiled_router: bool = False,
+        concurrent_render: bool = False,
+        render_concurrency: int = DEFAULT_RENDER_CONCURRENCY,
+        streaming: bool = False,
+        response_cache: Optional[LRUCache] = None,
+        render_cache: Optional[LRUCache] = None,
+        id_strategy: IdOption = "uuid",
+        state_codec: Optional[StateCodec] = None,
+        state_store: Optional[StateStore] = None,
+        batch: bool = False,
+        broadcaster: Optional[Broadcaster] = None,
+        sse: bool = False,
+        sse_ping_interval: float = 15,
+        websocket: bool = False,
+        diff_cache: Optional[LRUCache] = None,
+        dependency_graph: Optional[DependencyGraph] = None,
     ):
         self.debug = debug
         self.middleware = middleware
-        self.routes: List[Route] = []
+        self.routes: List[BaseRoute] = []
+        # Match target routes with a prefix tree instead of one regex per route
+        self.target_router = TargetRouter() if compiled_router else None
+        # Render the children of each element concurrently, at most
+        # render_concurrency at a time
+        self.concurrent_render = concurrent_render
+        self.render_concurrency = render_concurrency
+        # Stream the HTML of routes registered with routes=(...)
+        self.streaming = streaming
+        # Responses of the GET targets with a cache policy
+        self.response_cache = (
+            response_cache if response_cache is not None else LRUCache()
+        )
+        # HTML of the components with memoize = True
+        self.render_cache = render_cache if render_cache is not None else LRUCache()
+        # Every cache the app uses, for invalidate
+        self.caches: List[LRUCache] = []
+        self._add_cache(self.response_cache)
+        self._add_cache(self.render_cache)
+        # Identical GET target requests in flight share one render
+        self.single_flight = SingleFlight()
+        # Builds the ids of the components, "uuid", "counter",
+        # "deterministic" or a function, see redmage.ids
+        self.id_strategy = get_id_strategy(id_strategy)
+        # Packs the state of the components into one token in their paths
+        self.state_codec = state_codec
+        # State of the components with state_store = True
+        self.state_store = (
+            state_store if state_store is not None else MemoryStateStore()
+        )
+        # Every state store the app uses, flushed and closed on shutdown
+        self.state_stores: List[StateStore] = [self.state_store]
+        self.dispatch_plans: Dict[Tuple[ComponentClass, str], DispatchPlan] = {}
+        # Register the endpoint Batch targets are posted to
+        self.batch = batch
+        # Every target, by its route function, to look up the targets of a
+        # batch request
+        self.batch_targets: Dict[Callable, Tuple[TargetCall, DispatchPlan]] = {}
+        self.batch_router = TargetRouter()
+        self.batch_routes: List[Route] = []
+        # Fans the components published on a topic out to the clients
+        # listening on it, over the SSE endpoint registered with sse=True
+        self.broadcaster = broadcaster if broadcaster is not None else Broadcaster()
+        self.sse = sse
+        # Seconds between the comments that keep idle SSE connections open
+        self.sse_ping_interval = sse_ping_interval
+        # Invoke the targets over one WebSocket connection per page instead
+        # of a request each
+        self.websocket = websocket
+        # The last render of each component with diff = True, by id
+        self.diff_cache = (
+            diff_cache
+            if diff_cache is not None
+            else LRUCache(max_entries=DEFAULT_MAX_TREES)
+        )
+        # The stores the components on each page read
+        self.dependency_graph = (
+            dependency_graph if dependency_graph is not None else DependencyGraph()
+        )
         # Could cause problems if multiple apps are created
         Component.set_app(self)
 
@@ -43,51 +186,162 @@ class Redmage:
                     debug=self.debug,
                     routes=self.routes,
                     middleware=self.middleware,
+                    lifespan=self.lifespan,
                 )
             else:
-                self._starlette = Starlette(debug=self.debug, routes=self.routes)
+                self._starlette = Starlette(
+                    debug=self.debug,
+                    routes=self.routes,
+                    lifespan=self.lifespan,
+                )
         return self._starlette
 
+    def _add_cache(self, cache: LRUCache) -> None:
+        if not any(cache is c for c in self.caches):
+            self.caches.append(cache)
+
+    @asynccontextmanager
+    async def lifespan(self, app: Starlette) -> AsyncIterator[None]:
+        yield
+        # write the states still queued on shutdown
+        for store in self.state_stores:
+            await store.close()
+        await self.broadcaster.disconnect()
+
+    def invalidate(self, *tags: Hashable) -> int:
+        """
+        Drop the memoized HTML and cached target responses of the
+        components with any of the tags, from every cache of the app.
+        Returns the number of entries dropped.
+        """
+        return sum(cache.invalidate(tag) for cache in self.caches for tag in tags)
+
+    def tag_stats(self, tag: Hashable) -> Dict[str, int]:
+        # hits, misses, evictions and invalidations of a tag in all caches
+        stats = dict.fromkeys(TAG_STATS, 0)
+        for cache in self.caches:
+            for name, n in cache.tag_stats.get(tag, {}).items():
+                stats[name] += n
+        return stats
+
+    async def publish(self, topic: str, content: Union[Component, str]) -> None:
+        """
+        Render a component once and push it to every client listening on
+        the topic, where it's swapped in out of band by its id. A string is
+        pushed as it is.
+        """
+        if isinstance(content, str):
+            html = content
+        else:
+            # every client gets the same render, it's never diffed
+            self._share_render(content)
+            token = enter_shared_render()
+            try:
+                html = _swap_oob(await astr(content))
+            finally:
+                exit_shared_render(token)
+        await self.broadcaster.publish(topic, html)
+
     def create_routes(self) -> None:
         for cls, routes in Component.components:
+            if isinstance(cls.memoize, LRUCache):
+                self._add_cache(cls.memoize)
+            store = cls.get_state_store()
+            if store is not None and not any(store is s for s in self.state_stores):
+                self.state_stores.append(store)
             if routes:
                 self._register_routes(cls, routes)
             self._register_targets(cls)
+        if self.target_router and self.target_router not in self.routes:
+            self.routes.insert(0, self.target_router)
+        if self.batch and not any(
+            getattr(r, "path", None) == BATCH_PATH for r in self.routes
+        ):
+            self.routes.append(
+                Route(BATCH_PATH, self._batch_route_function, methods=["POST"])
+            )
+        if self.sse and not any(
+            getattr(r, "path", None) == SSE_PATH for r in self.routes
+        ):
+            self.routes.append(Route(SSE_PATH, self._sse_route_function))
+        if self.websocket and not any(
+            getattr(r, "path", None) == WS_PATH for r in self.routes
+        ):
+            self.routes.append(WebSocketRoute(WS_PATH, self._websocket_endpoint))
 
     def _get_explicit_route_function(self, cls: ComponentClass) -> Callable:
-        async def route_function(request: Request) -> HTMLResponse:
+        policy = get_cache_policy(cls.cache_policy)
+        shared = bool(policy or cls.etag)
+
+        async def route_function(request: Request) -> Response:
+            enter_id_scope()
+            enter_shared_render(shared)
+            if self.dependency_graph.enabled:
+                self.dependency_graph.enter_page()
             attrs = {**request.path_params, **request.query_params}
             instance = cls(**attrs)
             instance.request = request  # type: ignore
+            if shared:
+                self._share_render(instance)
+            if self.streaming:
+                return instance.build_streaming_response(
+                    buffer_stream(astream(instance))
+                )
             return instance.build_response(await astr(instance))
 
+        if policy:
+            route_function = self._get_cached_route_function(
+                route_function, policy, cls.cache_tags
+            )
+        if cls.etag:
+            return self._get_conditional_route_function(cls, route_function)
         return route_function
 
-    def _get_route_function(
-        self, cls: ComponentClass, name: str, fn: Callable
-    ) -> Callable:
-        async def route_function(request: Request) -> HTMLResponse:
+    def _get_target_call(self, plan: DispatchPlan) -> TargetCall:
+        """
+        The function that builds the instance from a request and calls the
+        target method, it returns the instance and the components to
+        render, used by both the route function and the batch endpoint.
+        """
+        cls = plan.cls
+        fn = plan.fn
+        state_schema = cls.get_state_schema()
+        state_store = cls.get_state_store()
+
+        async def call_target(request: Request) -> Tuple[Component, Tuple[Any, ...]]:
             # Starlette should validate and convert the path params
-            instance_params, comp_params = self._split_params(
-                request.path_params,
-                name,
-                fn,
+            instance_params, comp_params = plan.split_params(
+                request.path_params, convert=False
             )
             # query params need to be validated and converted
             # to the correct type
-            instance_query_params, comp_query_params = self._split_params(
-                request.query_params,
-                name,
-                fn,
+            instance_query_params, comp_query_params = plan.split_params(
+                request.query_params
             )
             # body serializer object should validate the form data and
             # convert it to the correct type
             body = self._process_form(
-                await request.form(), fn
+                await request.form(), plan.body_serializer
             )  # always passed to the method
             instance = cls.__new__(cls)
             attrs = {**instance_params, **instance_query_params}
+            token = attrs.pop(STATE_PARAM, None)
+            if token is not None:
+                try:
+                    attrs.update(state_schema.decode_state(token))
+                except InvalidStateToken:
+                    raise HTTPException(status_code=400, detail="Invalid state")
+            # the same id the instance had, whatever the id strategy
             attrs["_id"] = f"{cls.__name__}-{attrs['id']}"
+            enter_id_scope(attrs["_id"])
+            if self.dependency_graph.enabled:
+                self.dependency_graph.enter_target(attrs["_id"])
+            if state_store is not None:
+                state = await state_store.load(attrs["_id"])
+                if state is None:
+                    # expired or evicted, the page has to be loaded again
+                    raise HTTPException(status_code=410, detail="State expired")
+                instance.__dict__.update(state)
             instance.__dict__.update(attrs)
             if body:
                 components = fn(
@@ -101,52 +355,399 @@ class Redmage:
                     **{**comp_params, **comp_query_params},
                 )
 
-            # If the target function is async we need to await it
-            if iscoroutine(components):
+            # If the target function is async we need to await it, an async
+            # function wrapped by a sync decorator returns a coroutine too
+            if plan.is_async or isawaitable(components):
                 components = await components
 
+            if plan.writes:
+                self.dependency_graph.write(plan.writes)
+                self.invalidate(*plan.writes)
+
             if isinstance(components, tuple):
-                return instance.build_response(
-                    "\n".join([await astr(c) for c in components])
-                )
-            elif components:
-                return instance.build_response(await astr(components))
-            return instance.build_response(await astr(instance))
+                return instance, components
+            return instance, (components if components else instance,)
 
-        return route_function
+        return call_target
 
-    def _convert_value(self, key: str, value: str, fn: Callable) -> Any:
-        params = signature(fn).parameters
-        if key in params:
-            ann = (
-                params[key].annotation
-                if isinstance(params[key].annotation, str)
-                else params[key].annotation.__name__
+    def _get_route_function(
+        self, plan: DispatchPlan, call_target: TargetCall
+    ) -> Callable:
+        cls = plan.cls
+
+        # a response shared by other requests can't be a diff or have the
+        # components of one page
+        shared = bool(plan.cache_policy or plan.coalesce or plan.etag)
+        diff = cls.diff is not False and not shared
+        writes = bool(plan.writes) and not shared
+
+        async def route_function(request: Request) -> HTMLResponse:
+            enter_shared_render(shared)
+            instance, components = await call_target(request)
+            if diff and len(components) == 1 and components[0] is instance:
+                html = await astr(instance)
+                fragments = self._render_diff(instance, html)
+                if fragments is None:
+                    fragments = [html]
+                    reswap = False
+                else:
+                    # the changed elements are swapped in out of band instead
+                    reswap = True
+            else:
+                if shared:
+                    self._share_render(instance)
+                elif diff:
+                    # something else is swapped in its place
+                    self._forget_render(instance)
+                fragments = [await astr(c) for c in components]
+                reswap = False
+            if writes:
+                fragments.extend(await self._render_dependents(instance, components))
+            response = instance.build_response("\n".join(fragments))
+            if reswap:
+                response.headers["HX-Reswap"] = "none"
+            return response
+
+        if plan.coalesce:
+            route_function = self._get_coalesced_route_function(route_function)
+        if plan.cache_policy:
+            route_function = self._get_cached_route_function(
+                route_function, plan.cache_policy, cls.cache_tags
             )
-            type_name = ann
-            value = starlette_convertors[type_name].convert(value)
-        return value
+        if plan.etag:
+            return self._get_conditional_route_function(cls, route_function)
+        return route_function
+
+    def _get_coalesced_route_function(self, route_function: Callable) -> Callable:
+        single_flight = self.single_flight
+
+        async def coalesced_route_function(request: Request) -> Response:
+            scope = request.scope
+            key = (scope["method"], scope["path"], scope["query_string"])
+            return await single_flight.run(key, lambda: route_function(request))
+
+        return coalesced_route_function
+
+    def _get_cached_route_function(
+        self, route_function: Callable, policy: CachePolicy, tags: Tuple[Hashable, ...]
+    ) -> Callable:
+        # The URL of a target holds the whole state of the component, so
+        # the response is looked up before the component is even built
+        cache = policy.cache if policy.cache is not None else self.response_cache
+        self._add_cache(cache)
+        ttl = policy.ttl
+        max_stale = policy.max_stale
+        revalidating: Dict[Hashable, "asyncio.Task[None]"] = {}
+
+        def store(key: Hashable, response: Response) -> None:
+            if response.status_code == 200 and hasattr(response, "body"):
+                cached = CachedResponse.from_response(response)
+                cache.set(
+                    key, cached, cached.size, ttl=ttl, tags=tags, max_stale=max_stale
+                )
 
-    def _split_params(
+        async def revalidate(key: Hashable, scope: Dict[str, Any]) -> None:
+            try:
+                store(key, await route_function(Request(scope, _receive_empty)))
+            except Exception:
+                logger.exception("Rendering %s again failed", scope["path"])
+            finally:
+                del revalidating[key]
+
+        async def cached_route_function(request: Request) -> Response:
+            key = (request.scope["path"], request.scope["query_string"])
+            if max_stale:
+                cached, stale = cache.get_stale(key, tags=tags)
+                # serve the stale response, one request renders it again
+                if stale and key not in revalidating:
+                    revalidating[key] = asyncio.create_task(
+                        revalidate(key, dict(request.scope))
+                    )
+            else:
+                cached = cache.get(key, tags=tags)
+            if cached is not None:
+                return cached.to_response()
+
+            response = await route_function(request)
+            store(key, response)
+            return response
+
+        return cached_route_function
+
+    def _get_conditional_route_function(
+        self, cls: ComponentClass, route_function: Callable
+    ) -> Callable:
+        async def conditional_route_function(request: Request) -> Response:
+            etag = None
+            version = cls.get_version(request)
+            if isawaitable(version):
+                version = await version
+            if version is not None:
+                # nothing is rendered if the client has this version
+                etag = version_etag(request, version)
+                if etag_matches(request, etag):
+                    return not_modified(etag)
+
+            response = await route_function(request)
+            if response.status_code != 200 or not hasattr(response, "body"):
+                return response
+            if etag is None:
+                etag = content_etag(response.body)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            response.headers["etag"] = etag
+            return response
+
+        return conditional_route_function
+
+    def _match_batch_target(
+        self, scope: Dict[str, Any]
+    ) -> Optional[Tuple[TargetCall, DispatchPlan]]:
+        # updates the scope with the path params of the target
+        for route in (self.batch_router, *self.batch_routes):
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                scope.update(child_scope)
+                return self.batch_targets[child_scope["endpoint"]]
+        return None
+
+    def _get_target_request(
+        self, scope: Scope, invocation: str, body: bytes
+    ) -> Optional[Tuple[TargetCall, Request, str]]:
+        """
+        The target of an invocation, "METHOD path", made within a batch or
+        WebSocket connection with the scope of it, and the request to call
+        it with. The body is only passed to targets that take one.
+        """
+        method, _, url = invocation.partition(" ")
+        path, _, query_string = url.partition("?")
+        scope = {
+            **scope,
+            "type": "http",
+            "method": method,
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query_string.encode(),
+            "path_params": {},
+        }
+        target = self._match_batch_target(scope)
+        if target is None:
+            return None
+        call_target, plan = target
+        if plan.body_serializer and body:
+            scope["headers"] = [
+                *[(k, v) for k, v in scope["headers"] if k != b"content-type"],
+                (b"content-type", b"application/x-www-form-urlencoded"),
+            ]
+            return call_target, Request(scope, _receive(body)), method
+        return call_target, Request(scope, _receive_empty), method
+
+    async def _invoke_target(
         self,
-        params: Union[Dict[str, Any], QueryParams],
-        method_name: str,
-        method_fn: Callable,
-    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
-        comp_params = {}
-        method_params = {}
-
-        for k, v in params.items():
-            if k.startswith(f"{method_name}__"):
-                k = k.replace(f"{method_name}__", "")
-                method_params[k] = self._convert_value(k, v, method_fn)
+        call_target: TargetCall,
+        request: Request,
+        swap: str = HTMXSwap.OUTER_HTML,
+    ) -> List[str]:
+        """
+        The components the target renders, to be swapped in out of band.
+        They replace the invoking component with the swap of its element,
+        like the response of the target would, whatever their ids.
+        """
+        try:
+            instance, components = await call_target(request)
+        except HTTPException as e:
+            logger.warning("Target %s failed: %s", request.url.path, e)
+            return []
+        # out of band htmx only takes the style, not the modifiers
+        style = swap.partition(" ")[0]
+        outer_html = style == HTMXSwap.OUTER_HTML
+        if (
+            outer_html
+            and instance.diff is not False
+            and (len(components) == 1 and components[0] is instance)
+        ):
+            html = await astr(instance)
+            fragments = self._render_diff(instance, html)
+            if fragments is None:
+                fragments = [_swap_oob(html)]
+        else:
+            if instance.diff is not False:
+                self._forget_render(instance)
+            htmls = [await astr(c) for c in components]
+            selector = f"#{instance.id}"
+            if not outer_html:
+                # the children of the element are swapped in
+                oob = escape(f"{style}:{selector}")
+                fragments = [f'<div hx-swap-oob="{oob}">{"".join(htmls)}</div>']
+            elif components[0] is instance:
+                fragments = [_swap_oob(html) for html in htmls]
             else:
-                comp_params[k] = self._convert_value(k, v, method_fn)
+                fragments = [
+                    _swap_oob(htmls[0], f"{HTMXSwap.OUTER_HTML}:{selector}"),
+                    *[_swap_oob(html) for html in htmls[1:]],
+                ]
+        fragments.extend(await self._render_dependents(instance, components))
+        return fragments
+
+    async def _render_dependents(
+        self, instance: Component, components: Tuple[Any, ...]
+    ) -> List[str]:
+        """
+        The components on the page of the request that read the stores the
+        target wrote, rendered again to be swapped in out of band, except
+        the instance, whose element the response replaces, and the
+        components the target renders itself.
+        """
+        rendered = {
+            instance.id,
+            *(c.id for c in components if isinstance(c, Component)),
+        }
+        fragments = []
+        for dependent in self.dependency_graph.get_dependents():
+            if dependent.id in rendered:
+                continue
+            html = await astr(dependent)
+            diffed = self._render_diff(dependent, html)
+            fragments.extend(diffed if diffed is not None else [_swap_oob(html)])
+        return fragments
+
+    def _render_diff(self, instance: Component, html: str) -> Optional[List[str]]:
+        """
+        The elements of a component with diff that changed since its last
+        render, to be swapped in out of band, or None to swap the whole
+        component. html is recorded as its last render.
+        """
+        cache = instance.get_diff_cache()
+        if cache is None:
+            return None
+        fragments = render_diff(cache, instance.id, html)
+        if fragments is None:
+            return None
+        return [_swap_oob(fragment) for fragment in fragments]
+
+    def _share_render(self, instance: Component) -> None:
+        # rendered in a response other requests get too, it's never diffed
+        cache = instance.get_diff_cache()
+        if cache is not None:
+            record_shared(cache, instance.id)
+
+    def _forget_render(self, instance: Component) -> None:
+        # the client no longer has the last render of the component
+        cache = instance.get_diff_cache()
+        if cache is not None:
+            forget_render(cache, instance.id)
+
+    async def _batch_route_function(self, request: Request) -> Response:
+        """
+        Run the targets of a Batch and respond with every component they
+        render, swapped in out of band. The other fields of the form are
+        the body of the targets that take one.
+        """
+        form = await request.form()
+        try:
+            invocations = json.loads(str(form.get("targets")))
+        except ValueError:
+            invocations = None
+        try:
+            swap = parse_swap(str(form.get(SWAP_PARAM, HTMXSwap.OUTER_HTML)))
+        except ValueError:
+            invocations = None
+        if not isinstance(invocations, list):
+            raise HTTPException(status_code=400, detail="Invalid batch")
+        fields = [
+            (k, v)
+            for k, v in form.multi_items()
+            if k not in ("targets", SWAP_PARAM) and isinstance(v, str)
+        ]
+        body = urlencode(fields).encode()
+
+        calls = []
+        for invocation in invocations:
+            call = self._get_target_request(request.scope, str(invocation), body)
+            if call is None:
+                raise HTTPException(
+                    status_code=400, detail=f"Unknown target {invocation}"
+                )
+            calls.append(call)
+
+        # targets that change something run in order before the GET targets
+        results: Dict[int, List[str]] = {}
+        for n, (call_target, sub_request, method) in enumerate(calls):
+            if method != HTTPMethod.GET:
+                results[n] = await self._invoke_target(call_target, sub_request, swap)
+        gets = [n for n, call in enumerate(calls) if call[2] == HTTPMethod.GET]
+        for n, fragments in zip(
+            gets,
+            await asyncio.gather(
+                *[self._invoke_target(*calls[n][:2], swap) for n in gets]
+            ),
+        ):
+            results[n] = fragments
+        return HTMLResponse("\n".join(f for n in range(len(calls)) for f in results[n]))
 
-        return comp_params, method_params
+    async def _websocket_endpoint(self, websocket: WebSocket) -> None:
+        """
+        Run the targets invoked over the connection of a page, one after
+        another in the order they're sent, and send back the components
+        they render, swapped in out of band.
+        """
+        await websocket.accept()
+        try:
+            while True:
+                message = parse_message(await websocket.receive_text())
+                if message is None:
+                    logger.warning("Invalid WebSocket message")
+                    continue
+                invocation, body, swap = message
+                call = self._get_target_request(websocket.scope, invocation, body)
+                if call is None:
+                    logger.warning("Unknown target %s", invocation)
+                    continue
+                try:
+                    fragments = await self._invoke_target(*call[:2], swap)
+                except Exception:
+                    # one failing target doesn't close the page's connection
+                    logger.exception("Target %s failed", invocation)
+                    continue
+                if fragments:
+                    await websocket.send_text("\n".join(fragments))
+        except WebSocketDisconnect:
+            pass
 
-    def _process_form(self, form_data: FormData, fn: Callable) -> Any:
-        serializer = self._get_body_serializer_class(fn)
+    async def _sse_route_function(self, request: Request) -> Response:
+        """
+        Stream what's published on the topics in the query string as
+        server-sent events, until the client disconnects.
+        """
+        topics = request.query_params.getlist("topic")
+        if not topics:
+            raise HTTPException(status_code=400, detail="No topic")
+        await self.broadcaster.connect()
+
+        async def events() -> AsyncIterator[str]:
+            subscription = self.broadcaster.subscribe(topics)
+            try:
+                # sent once subscribed, nothing published after it is missed
+                yield ": subscribed\n\n"
+                while True:
+                    try:
+                        message = await asyncio.wait_for(
+                            subscription.get(), self.sse_ping_interval
+                        )
+                    except asyncio.TimeoutError:
+                        yield ": ping\n\n"
+                        continue
+                    yield format_event(message)
+            finally:
+                self.broadcaster.unsubscribe(subscription)
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    def _process_form(self, form_data: FormData, serializer: Optional[Type]) -> Any:
         body = {}
         for k, v in form_data.items():
             body[k] = v
@@ -156,22 +757,17 @@ class Redmage:
             return serializer(**body) if body else None
         return body
 
-    def _get_body_serializer_class(self, fn: Callable) -> Optional[Type]:
-        params = signature(fn).parameters
-        for param_name, param_value in params.items():
-            if (
-                param_name != "self"
-                and param_value.default == Parameter.empty
-                and param_value.kind == Parameter.POSITIONAL_ONLY
-            ):
-                return param_value.annotation
-        return None
-
     def _get_target_method(self, name: str, fn: Callable) -> Callable[..., Target]:
         def target_method(instance: Component, *args: Any, **kwargs: Any) -> Target:
             return Target(instance, name, fn.target_method, *args, **kwargs)  # type: ignore
 
-        setattr(target_method, "target_signature", signature(fn))
+        target_signature = signature(fn)
+        setattr(target_method, "target_signature", target_signature)
+        setattr(
+            target_method,
+            "path_builder",
+            compile_target_path_builder(name, target_signature),
+        )
         return target_method
 
     def _register_routes(
@@ -204,19 +800,34 @@ class Redmage:
         self, cls: ComponentClass, method: Tuple[str, FunctionType]
     ) -> None:
         method_name, method_fn = method
+        # resolves the state of the class once, before any instance renders
         path = cls.get_base_path()
         path += cls.get_target_path(method_name)
         logger.debug(path)
-        route_function = self._get_route_function(cls, method_name, method_fn)
-
-        self.routes.append(
-            Route(
-                path,
-                route_function,
-                name=method_name,
-                methods=[method_fn.target_method],  # type: ignore
-            )
+        plan = compile_dispatch_plan(cls, method_name, method_fn)
+        # the target requests for the component come back to its page
+        self.dependency_graph.classes.add(cls)
+        if plan.writes:
+            self.dependency_graph.enabled = True
+        self.dispatch_plans[(cls, method_name)] = plan
+        call_target = self._get_target_call(plan)
+        route_function = self._get_route_function(plan, call_target)
+
+        route = Route(
+            path,
+            route_function,
+            name=method_name,
+            methods=[method_fn.target_method],  # type: ignore
         )
+        if self.target_router and self.target_router.can_add(route):
+            self.target_router.add(route)
+        else:
+            self.routes.append(route)
+        self.batch_targets[route_function] = (call_target, plan)
+        if self.batch_router.can_add(route):
+            self.batch_router.add(route)
+        else:
+            self.batch_routes.append(route)
 
         target_method = self._get_target_method(method_name, method_fn)
         setattr(cls, method_name, target_method)
@@ -0,0 +1,237 @@
+import re
+from contextvars import ContextVar, Token
+from hashlib import blake2b
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional, Pattern, Tuple
+
+from .cache import LRUCache
+
+# The ids in rendered HTML, and the name of a tag
+_ID = re.compile(r'\sid="([^"]*)"')
+_NAME = re.compile(r"<([a-zA-Z][^\s/>]*)")
+# The opening and closing tags of the elements of each name
+_NAME_TAGS: Dict[str, Pattern] = {}
+# HTML whose content isn't markup, it's never diffed
+_NOT_MARKUP = ("<!--", "<script", "<style")
+
+_VOID_ELEMENTS = frozenset(
+    (
+        "area",
+        "base",
+        "br",
+        "col",
+        "embed",
+        "hr",
+        "img",
+        "input",
+        "link",
+        "meta",
+        "source",
+        "track",
+        "wbr",
+    )
+)
+
+# Defaults of the app's diff cache
+DEFAULT_MAX_TREES = 10000
+
+# Roughly what a node costs in memory, the size of a tree in the cache
+NODE_SIZE = 120
+
+# Kept in place of the tree of a component rendered in a response shared by
+# other requests, the clients have different renders of it once one of them
+# swaps it, so it's never diffed
+SHARED = "shared"
+
+_shared_render: ContextVar[bool] = ContextVar("redmage_shared_render", default=False)
+
+
+class Node(NamedTuple):
+    """
+    An element with an id in rendered HTML, where it is in the HTML, and a
+    digest of its shell, its HTML with the elements with an id within it
+    replaced by their ids. Elements with the same shell only differ in the
+    elements with an id within them, which can be swapped in out of band.
+    """
+
+    id: str
+    digest: bytes
+    start: int
+    end: int
+    children: Tuple["Node", ...]
+
+
+def _finish(html: str, id: str, start: int, end: int, children: List[Any]) -> Node:
+    hasher = blake2b(digest_size=8)
+    position = start
+    for child in children:
+        child_start = child.start
+        hasher.update(html[position:child_start].encode())
+        hasher.update(f"\x00{child.id}\x00".encode())
+        position = child.end
+    hasher.update(html[position:end].encode())
+    return Node(id, hasher.digest(), start, end, tuple(children))
+
+
+def _find_end(html: str, name: str, position: int) -> int:
+    # the end of the element opened before position, -1 if it isn't closed
+    tags = _NAME_TAGS.get(name)
+    if tags is None:
+        tags = _NAME_TAGS[name] = re.compile(rf"<(/?){re.escape(name)}[\s/>]")
+    depth = 1
+    for match in tags.finditer(html, position):
+        if match.group(1):
+            depth -= 1
+            if depth == 0:
+                return html.find(">", match.end() - 1) + 1
+        elif html[html.find(">", match.start()) - 1] != "/":
+            depth += 1
+    return -1
+
+
+def index_html(html: str) -> Optional[Node]:
+    """
+    The tree of the elements with an id in the HTML of a component, the
+    root being the component's element. None if the HTML isn't a single
+    element with an id, the tags don't match or it has comments, scripts
+    or styles.
+    """
+    if any(text in html for text in _NOT_MARKUP):
+        return None
+    # id, start, end and children of each element with an id, in order
+    elements: List[Tuple[str, int, int, List[int]]] = []
+    roots: List[int] = []
+    open_elements: List[int] = []
+    for match in _ID.finditer(html):
+        # the tag the id is in
+        start = html.rfind("<", 0, match.start())
+        name_match = _NAME.match(html, start)
+        if name_match is None or html.find(">", start, match.start()) != -1:
+            continue
+        name = name_match.group(1).lower()
+        position = html.find(">", match.end()) + 1
+        if name in _VOID_ELEMENTS or html[position - 2] == "/":
+            end = position
+        else:
+            end = _find_end(html, name, position)
+            if end == -1:
+                return None
+        while open_elements and elements[open_elements[-1]][2] <= start:
+            open_elements.pop()
+        if open_elements:
+            parent = elements[open_elements[-1]]
+            if end > parent[2]:
+                return None
+            parent[3].append(len(elements))
+        else:
+            roots.append(len(elements))
+        open_elements.append(len(elements))
+        elements.append((match.group(1), start, end, []))
+
+    if len(roots) != 1:
+        return None
+    _, start, end, _ = elements[0]
+    if html[:start].strip() or html[end:].strip():
+        return None
+    # the children are finished before the elements they're in
+    nodes: List[Optional[Node]] = [None] * len(elements)
+    for n in range(len(elements) - 1, -1, -1):
+        id, start, end, children = elements[n]
+        nodes[n] = _finish(html, id, start, end, [nodes[c] for c in children])
+    return nodes[0]
+
+
+def count_nodes(node: Node) -> int:
+    n = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        n += 1
+        stack.extend(node.children)
+    return n
+
+
+def diff_html(old: Node, new: Node, html: str) -> Optional[List[str]]:
+    """
+    The HTML of the outermost elements with an id that changed from the
+    old tree to the new one, new being the tree of html. None if the root
+    element itself changed and the whole component has to be swapped.
+    """
+    if old.id != new.id or old.digest != new.digest:
+        return None
+    changed = []
+    stack = [(old, new)]
+    while stack:
+        old, new = stack.pop()
+        # the same shell, the same children in the same order
+        for old_child, new_child in zip(old.children, new.children):
+            if old_child.digest == new_child.digest:
+                stack.append((old_child, new_child))
+            else:
+                changed.append(new_child)
+    # in the order they're in the document
+    changed.sort(key=lambda node: node.start)
+    fragments = []
+    for node in changed:
+        start, end = node.start, node.end
+        fragments.append(html[start:end])
+    return fragments
+
+
+def enter_shared_render(shared: bool = True) -> "Token[bool]":
+    # called by the route functions at the start of every request, with
+    # whether the response is served to other requests too
+    return _shared_render.set(shared)
+
+
+def exit_shared_render(token: "Token[bool]") -> None:
+    _shared_render.reset(token)
+
+
+def in_shared_render() -> bool:
+    return _shared_render.get()
+
+
+def record_shared(cache: LRUCache, key: Hashable) -> None:
+    cache.set(key, SHARED, NODE_SIZE)
+
+
+def forget_render(cache: LRUCache, key: Hashable) -> None:
+    # the client no longer has the last render, a shared one is kept
+    if cache.get(key) is not SHARED:
+        cache.delete(key)
+
+
+def record_render(cache: LRUCache, key: Hashable, html: str) -> Optional[Node]:
+    # the tree of the HTML the client now has, for the next diff
+    if cache.get(key) is SHARED:
+        return None
+    return _record_tree(cache, key, html)
+
+
+def _record_tree(cache: LRUCache, key: Hashable, html: str) -> Optional[Node]:
+    tree = index_html(html)
+    if tree is None:
+        cache.delete(key)
+    else:
+        cache.set(key, tree, count_nodes(tree) * NODE_SIZE)
+    return tree
+
+
+def render_diff(cache: LRUCache, key: Hashable, html: str) -> Optional[List[str]]:
+    """
+    The elements that changed from the last render of a component to html,
+    which is recorded for the next one. None if the whole component has to
+    be swapped, because it wasn't rendered before, was rendered in a
+    shared response or its root element changed, or because the elements
+    would be as big as the component.
+    """
+    old = cache.get(key)
+    if old is SHARED:
+        return None
+    new = _record_tree(cache, key, html)
+    if old is None or new is None:
+        return None
+    fragments = diff_html(old, new, html)
+    if fragments is None or sum(map(len, fragments)) >= len(html):
+        return None
+    return fragments
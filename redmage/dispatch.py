@@ -0,0 +1,139 @@
+from inspect import Parameter, iscoroutinefunction, signature
+from types import MappingProxyType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+)
+
+from starlette.convertors import CONVERTOR_TYPES as starlette_convertors
+from starlette.convertors import Convertor
+
+from .cache import CachePolicy, get_cache_policy
+from .components import Component
+from .types import HTTPMethod
+
+
+class DispatchPlan(NamedTuple):
+    """
+    Everything the route function of a target needs to know about the target
+    method, resolved once when the target is registered so that handling a
+    request only does dictionary lookups.
+    """
+
+    cls: Type[Component]
+    method_name: str
+    fn: Callable
+    prefix: str
+    convertors: Mapping[str, Convertor]
+    body_serializer: Optional[Type]
+    is_async: bool
+    cache_policy: Optional[CachePolicy] = None
+    coalesce: bool = False
+    etag: bool = False
+    writes: Tuple[Hashable, ...] = ()
+
+    def split_params(
+        self, params: Mapping[str, Any], convert: bool = True
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        # Starlette has already converted the path params so only the
+        # query params need to go through the convertors
+        comp_params: Dict[str, Any] = {}
+        method_params: Dict[str, Any] = {}
+        prefix = self.prefix
+        prefix_len = len(prefix)
+        convertors = self.convertors
+
+        for k, v in params.items():
+            if k.startswith(prefix):
+                k = k[prefix_len:]
+                target = method_params
+            else:
+                target = comp_params
+            if convert and k in convertors:
+                v = convertors[k].convert(v)
+            target[k] = v
+
+        return comp_params, method_params
+
+
+def _get_annotation_name(annotation: Any) -> str:
+    return annotation if isinstance(annotation, str) else annotation.__name__
+
+
+def _get_convertors(fn: Callable) -> Mapping[str, Convertor]:
+    convertors = {}
+    for param in signature(fn).parameters.values():
+        if param.kind == Parameter.POSITIONAL_ONLY or param.name == "self":
+            continue
+        convertor = starlette_convertors.get(_get_annotation_name(param.annotation))
+        if convertor:
+            convertors[param.name] = convertor
+    return MappingProxyType(convertors)
+
+
+def _get_body_serializer_class(fn: Callable) -> Optional[Type]:
+    params = signature(fn).parameters
+    for param_name, param_value in params.items():
+        if (
+            param_name != "self"
+            and param_value.default == Parameter.empty
+            and param_value.kind == Parameter.POSITIONAL_ONLY
+        ):
+            return param_value.annotation
+    return None
+
+
+def _get_cache_policy(cls: Type[Component], fn: Callable) -> Optional[CachePolicy]:
+    # only GET targets are cached, the target's option wins over the
+    # component's so cache=False opts a target out. The URL of a stored
+    # component doesn't hold its state so it's never cached.
+    if (
+        getattr(fn, "target_method", None) != HTTPMethod.GET
+        or cls.state_store is not False
+    ):
+        return None
+    option = getattr(fn, "target_cache", None)
+    if option is None:
+        option = cls.cache_policy
+    return get_cache_policy(option)
+
+
+def _get_coalesce(cls: Type[Component], fn: Callable) -> bool:
+    # only GET targets are safe to share between requests
+    if getattr(fn, "target_method", None) != HTTPMethod.GET:
+        return False
+    option = getattr(fn, "target_coalesce", None)
+    return bool(cls.coalesce if option is None else option)
+
+
+def _get_etag(cls: Type[Component], fn: Callable) -> bool:
+    # only GET requests are conditional
+    if getattr(fn, "target_method", None) != HTTPMethod.GET:
+        return False
+    option = getattr(fn, "target_etag", None)
+    return bool(cls.etag if option is None else option)
+
+
+def compile_dispatch_plan(
+    cls: Type[Component], method_name: str, fn: Callable
+) -> DispatchPlan:
+    return DispatchPlan(
+        cls=cls,
+        method_name=method_name,
+        fn=fn,
+        prefix=f"{method_name}__",
+        convertors=_get_convertors(fn),
+        body_serializer=_get_body_serializer_class(fn),
+        is_async=iscoroutinefunction(fn),
+        cache_policy=_get_cache_policy(cls, fn),
+        coalesce=_get_coalesce(cls, fn),
+        etag=_get_etag(cls, fn),
+        writes=getattr(fn, "target_writes", ()),
+    )
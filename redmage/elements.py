@@ -1,25 +1,83 @@
 import html
-from typing import Optional, Tuple, Type, Union
+from contextvars import ContextVar
+from inspect import Parameter, isawaitable, iscoroutine, iscoroutinefunction, signature
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    FrozenSet,
+    Generator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
 import hype.asyncio as hype
 
 from . import Component
-from .targets import Target
+from .cache import LRUCache
+from .diffing import forget_render, in_shared_render, record_render, record_shared
+from .exceptions import RedmageError
+from .targets import Batch, Target
 from .triggers import Trigger
 from .types import HTMXClass, HTMXSwap, HTMXTrigger
-from .utils import astr
+from .utils import astr, gather_limited
 
+# How many children are rendered at once in concurrent mode, in the whole
+# render
+DEFAULT_RENDER_CONCURRENCY = 10
 
-class Element:
-    el: Type[hype.Element]
+
+class _RenderBudget:
+    """
+    How many more children a render can have rendering concurrently. It's
+    shared by the tasks rendering them so nested elements don't multiply
+    the limit, the children of an element are rendered one after another
+    once it's used up.
+    """
+
+    __slots__ = ("available",)
+
+    def __init__(self, limit: int):
+        self.available = limit
+
+
+_render_budget: ContextVar[Optional[_RenderBudget]] = ContextVar(
+    "redmage_render_budget", default=None
+)
+
+
+class _Options:
+    """
+    The options of an element that are rarely used. Elements without any
+    of them share DEFAULT_OPTIONS instead of each allocating their own.
+    """
+
+    __slots__ = (
+        "safe",
+        "swap",
+        "target",
+        "trigger",
+        "swap_oob",
+        "confirm",
+        "boost",
+        "push_url",
+        "indicator",
+        "on",
+        "concurrent",
+    )
 
     def __init__(
         self,
-        *content: Union[str, hype.Element, Component],
         safe: bool = False,
-        # hx-* attributes
         swap: str = HTMXSwap.OUTER_HTML,
-        target: Optional[Target] = None,
+        target: Optional[Union[Target, Batch]] = None,
         trigger: Union[Trigger, Tuple[Trigger, ...]] = (),
         swap_oob: bool = False,
         confirm: Optional[str] = None,
@@ -27,30 +85,9 @@ class Element:
         push_url: Optional[str] = None,
         indicator: bool = False,
         on: Optional[str] = None,
-        # helper target+trigger combos
-        click: Optional[Target] = None,
-        submit: Optional[Target] = None,
-        change: Optional[Target] = None,
-        mouse_over: Optional[Target] = None,
-        mouse_enter: Optional[Target] = None,
-        load: Optional[Target] = None,
-        intersect: Optional[Target] = None,
-        revealed: Optional[Target] = None,
-        **kwargs: str,
+        concurrent: Optional[bool] = None,
     ):
         self.safe = safe
-        # use the render method if it's component
-
-        self.content = list(
-            [
-                (
-                    self._async_helper(c)
-                    if isinstance(c, Element) or isinstance(c, Component)
-                    else self.escape(c)  # type: ignore
-                )
-                for c in content
-            ]
-        )
         self.swap = swap
         self.target = target
         self.trigger = trigger
@@ -60,31 +97,149 @@ class Element:
         self.push_url = push_url
         self.indicator = indicator
         self.on = on
+        self.concurrent = concurrent
+
+    def copy(self) -> "_Options":
+        return _Options(*[getattr(self, name) for name in self.__slots__])
+
+
+DEFAULT_OPTIONS = _Options()
+
+# The triggers of the click, submit, ... helper keywords, in order
+HELPER_TRIGGERS = (
+    HTMXTrigger.CLICK,
+    HTMXTrigger.SUBMIT,
+    HTMXTrigger.CHANGE,
+    HTMXTrigger.MOUSEOVER,
+    HTMXTrigger.MOUSEENTER,
+    HTMXTrigger.LOAD,
+    HTMXTrigger.INTERSECT,
+    HTMXTrigger.REVEALED,
+)
+
+
+def _option(name: str) -> Any:
+    def get(self: "Element") -> Any:
+        return getattr(self._options, name)
+
+    def set(self: "Element", value: Any) -> None:
+        if self._options is DEFAULT_OPTIONS:
+            self._options = DEFAULT_OPTIONS.copy()
+        setattr(self._options, name, value)
+
+    return property(get, set)
+
+
+class Element:
+    el: Type[hype.Element]
+
+    __slots__ = ("content", "kwargs", "_options")
+
+    safe = _option("safe")
+    swap = _option("swap")
+    target = _option("target")
+    trigger = _option("trigger")
+    swap_oob = _option("swap_oob")
+    confirm = _option("confirm")
+    boost = _option("boost")
+    push_url = _option("push_url")
+    indicator = _option("indicator")
+    on = _option("on")
+    concurrent = _option("concurrent")
+
+    def __init__(
+        self,
+        *content: Union[str, hype.Element, Component],
+        safe: bool = False,
+        # hx-* attributes
+        swap: str = HTMXSwap.OUTER_HTML,
+        target: Optional[Union[Target, Batch]] = None,
+        trigger: Union[Trigger, Tuple[Trigger, ...]] = (),
+        swap_oob: bool = False,
+        confirm: Optional[str] = None,
+        boost: bool = False,
+        push_url: Optional[str] = None,
+        indicator: bool = False,
+        on: Optional[str] = None,
+        # helper target+trigger combos
+        click: Optional[Union[Target, Batch]] = None,
+        submit: Optional[Union[Target, Batch]] = None,
+        change: Optional[Union[Target, Batch]] = None,
+        mouse_over: Optional[Union[Target, Batch]] = None,
+        mouse_enter: Optional[Union[Target, Batch]] = None,
+        load: Optional[Union[Target, Batch]] = None,
+        intersect: Optional[Union[Target, Batch]] = None,
+        revealed: Optional[Union[Target, Batch]] = None,
+        # render child elements and components concurrently,
+        # defaults to the app's concurrent_render setting
+        concurrent: Optional[bool] = None,
+        **kwargs: str,
+    ):
+        if (
+            click
+            or submit
+            or change
+            or mouse_over
+            or mouse_enter
+            or load
+            or intersect
+            or revealed
+        ):
+            helpers = (
+                click,
+                submit,
+                change,
+                mouse_over,
+                mouse_enter,
+                load,
+                intersect,
+                revealed,
+            )
+            for helper, event in zip(helpers, HELPER_TRIGGERS):
+                if helper:
+                    target = helper
+                    trigger = Trigger(event)
+
+        if (
+            safe
+            or target
+            or trigger
+            or swap_oob
+            or confirm
+            or boost
+            or push_url
+            or indicator
+            or on
+            or concurrent is not None
+            or swap != HTMXSwap.OUTER_HTML
+        ):
+            self._options = _Options(
+                safe,
+                swap,
+                target,
+                trigger,
+                swap_oob,
+                confirm,
+                boost,
+                push_url,
+                indicator,
+                on,
+                concurrent,
+            )
+        else:
+            self._options = DEFAULT_OPTIONS
+
+        # child elements and components are kept as is and rendered with
+        # the element, anything else is escaped now
+        self.content: List[Union[str, Element, Component]] = [
+            (
+                c
+                if isinstance(c, (Element, Component, Static))
+                else c if safe else html.escape(str(c))  # type: ignore
+            )
+            for c in content
+        ]
         self.kwargs = kwargs
-        self.click = click
-        self.submit = submit
-        self.change = change
-        self.mouse_over = mouse_over
-        self.mouse_enter = mouse_enter
-        self.load = load
-        self.intersect = intersect
-        self.revealed = revealed
-
-        helper_keywords = {
-            "click": HTMXTrigger.CLICK,
-            "submit": HTMXTrigger.SUBMIT,
-            "change": HTMXTrigger.CHANGE,
-            "mouse_over": HTMXTrigger.MOUSEOVER,
-            "mouse_enter": HTMXTrigger.MOUSEENTER,
-            "load": HTMXTrigger.LOAD,
-            "intersect": HTMXTrigger.INTERSECT,
-            "revealed": HTMXTrigger.REVEALED,
-        }
-
-        for k, v in helper_keywords.items():
-            if getattr(self, k, None):
-                self.target = getattr(self, k)
-                self.trigger = Trigger(v)
 
     def _async_helper(self, foo):  # type: ignore
         async def inner() -> str:
@@ -99,8 +254,8 @@ class Element:
 
     def append(self, el: Union[str, hype.Element]) -> None:
         self.content.append(
-            self._async_helper(el)
-            if isinstance(el, Element) or isinstance(el, Component)
+            el
+            if isinstance(el, (Element, Component, Static))
             else self.escape(el)  # type: ignore
         )
 
@@ -108,24 +263,32 @@ class Element:
         self.kwargs = {**self.kwargs, **kwargs}
 
     def render(self) -> hype.Element:
-        _class = self.kwargs.pop("_class", "")
+        # use the render method if it's component
+        return self._build(
+            [c if isinstance(c, str) else self._async_helper(c) for c in self.content]
+        )
+
+    def _build(self, content: List[Any]) -> hype.Element:
+        kwargs = dict(self.kwargs)
+        _class = kwargs.pop("_class", "")
         if self.indicator:
             _class += HTMXClass.Indicator
 
         el = self.el(
-            *self.content,
+            *content,
             # don't want hype to escape the content
             # we'll do it ourselves
             safe=True,
             _class=_class,
-            **self.kwargs,
+            **kwargs,
         )
 
         if self.target:
             el.attrs(
-                hx_swap=self.swap,
-                hx_target=f"#{self.target.instance.id}",
-                **{f"hx_{self.target.http_method.lower()}": self.target.path},
+                **{
+                    k.replace("-", "_"): v
+                    for k, v in self.target.get_hx_attributes(self.swap).items()
+                }
             )
 
         if self.push_url:
@@ -151,11 +314,154 @@ class Element:
 
         return el
 
+    @classmethod
+    def _get_tag(cls) -> "_Tag":
+        # cached per class, subclasses get their own
+        if "_tag" not in cls.__dict__:
+            setattr(cls, "_tag", _Tag.from_hype(cls.el))
+        return cls.__dict__["_tag"]
+
+    def _start_tag(self, tag: "_Tag") -> str:
+        # Builds the same attributes, in the same order, as the hype
+        # element from the render method would
+        kwargs = self.kwargs
+        options = self._options
+        _class = kwargs.get("_class", "")
+        if options.indicator:
+            _class += HTMXClass.Indicator
+
+        props: Dict[str, Any] = {}
+        if _class:
+            props["class"] = _class
+        if len(kwargs) > ("_class" in kwargs):
+            declared = tag.declared
+            for k, v in kwargs.items():
+                if k in declared and k != "_class":
+                    props[_attribute_name(k)] = v
+            for k, v in kwargs.items():
+                if k not in declared:
+                    props[_attribute_name(k)] = v
+            if len(props) > 1:
+                # sorted is stable, undeclared attributes keep their order
+                positions = tag.positions
+                last = len(positions)
+                order = sorted(props, key=lambda k: positions.get(k, last))
+                props = {k: props[k] for k in order}
+
+        if options is not DEFAULT_OPTIONS:
+            if options.target:
+                props.update(options.target.get_hx_attributes(options.swap))
+
+            if options.push_url:
+                props["hx-push-url"] = options.push_url
+
+            if options.trigger:
+                if isinstance(options.trigger, tuple):
+                    props["hx-trigger"] = ", ".join([str(t) for t in options.trigger])
+                else:
+                    props["hx-trigger"] = str(options.trigger)
+
+            if options.swap_oob:
+                props["hx-swap-oob"] = "true"
+
+            if options.confirm:
+                props["hx-confirm"] = options.confirm
+
+            if options.boost:
+                props["hx-boost"] = "true"
+
+            if options.on:
+                props["hx-on"] = options.on
+
+        attributes = " ".join(
+            [k if v is True else f'{k}="{v}"' for k, v in props.items() if v]
+        )
+        if attributes:
+            return f"{tag.open} {attributes}{tag.close}"
+        return f"{tag.open}{tag.close}"
+
+    async def _render_content_concurrently(
+        self, awaits: List[bool], limit: int
+    ) -> List[Any]:
+        # the children that wait on an async render, rendered concurrently,
+        # the others are serialized in place
+        def render(c: Any) -> Callable[[], Awaitable[str]]:
+            return lambda: astr(c)
+
+        budget = _render_budget.get()
+        token = None
+        if budget is None:
+            budget = _RenderBudget(limit)
+            token = _render_budget.set(budget)
+        try:
+            children = [render(c) for c, a in zip(self.content, awaits) if a]
+            workers = min(budget.available, len(children))
+            budget.available -= workers
+            try:
+                if workers:
+                    results = await gather_limited(children, workers)
+                else:
+                    results = [await fn() for fn in children]
+            finally:
+                budget.available += workers
+        finally:
+            if token is not None:
+                _render_budget.reset(token)
+        rendered = iter(results)
+        return [next(rendered) if a else c for c, a in zip(self.content, awaits)]
+
+    def freeze(self) -> "Static":
+        return Static(self)
+
     async def _astr_(self) -> str:
-        return await self.render().render()
+        return await _render(self)
+
+    def _astream_(self) -> AsyncIterator[str]:
+        return _stream(self)
+
+
+class Static(str):
+    """
+    HTML rendered once, when it's created, and embedded as is wherever
+    it's used. For the parts of a page that are the same on every request
+    like the head, a navbar or a footer.
+
+        HEAD = Static(Head(Title("Todo App")))
+        HEAD = Head(Title("Todo App")).freeze()
+
+    Targets and components belong to a single instance so they can't be
+    part of a static subtree, which is checked unless python runs with -O.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, *content: Union[str, Element], safe: bool = False) -> "Static":
+        out: List[str] = []
+        for c in content:
+            if isinstance(c, Element):
+                if __debug__:
+                    _check_static(c)
+                _render_static(c, out)
+            else:
+                out.append(c if safe or isinstance(c, Static) else html.escape(str(c)))
+        return super().__new__(cls, "".join(out))
+
+
+def _check_static(el: Element) -> None:
+    stack: List[Any] = [el]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Component):
+            raise RedmageError(f"A static subtree can't contain a component: {node}")
+        if isinstance(node, Element):
+            if node.target:
+                raise RedmageError(f"A static subtree can't contain a target: {node}")
+            stack.extend(node.content)
 
 
 class Doc:
+    __slots__ = ("el",)
+
     def __init__(self, el: Element):
         self.el = el
 
@@ -163,477 +469,813 @@ class Doc:
         self.el.attrs(**kwargs)
 
     async def _astr_(self) -> str:
-        doc = await hype.Doc(await astr(self.el)).render()
-        return str(doc)
+        return await _render(self)
+
+    def _astream_(self) -> AsyncIterator[str]:
+        return _stream(self)
+
+
+class _Tag(NamedTuple):
+    open: str
+    close: str
+    end: str
+    self_closing: bool
+    declared: FrozenSet[str]
+    # hype renders the attributes it declares first, in this order
+    positions: Dict[str, int]
+
+    @classmethod
+    def from_hype(cls, el: Type[hype.Element]) -> "_Tag":
+        declared = [
+            param.name
+            for param in signature(el.__init__).parameters.values()
+            if param.kind == Parameter.POSITIONAL_OR_KEYWORD
+            and param.name not in ("self", "safe")
+            or param.kind == Parameter.KEYWORD_ONLY
+        ]
+        return cls(
+            open=f"\n<{el.tag}",
+            close="/>" if el.self_closing else ">",
+            end="" if el.self_closing else f"</{el.tag}>",
+            self_closing=el.self_closing,
+            declared=frozenset(declared),
+            positions={_attribute_name(name): n for n, name in enumerate(declared)},
+        )
+
+
+# hype drops a leading underscore and uses dashes in attribute names
+_ATTRIBUTE_NAMES: Dict[str, str] = {}
+
+
+def _attribute_name(key: str) -> str:
+    name = _ATTRIBUTE_NAMES.get(key)
+    if name is None:
+        name = (key[1:] if key.startswith("_") else key).replace("_", "-")
+        _ATTRIBUTE_NAMES[key] = name
+    return name
+
+
+class _DiffMark(str):
+    # where the HTML of a component with diff starts in the output
+    __slots__ = ()
+
+
+class _RecordRender:
+    """
+    Popped once a component with diff is written, records its HTML for
+    the next render of its targets to be diffed against.
+    """
+
+    __slots__ = ("id", "cache", "mark")
+
+    def __init__(self, id: str, cache: LRUCache, mark: _DiffMark):
+        self.id = id
+        self.cache = cache
+        self.mark = mark
+
+    def record(self, out: List[str]) -> None:
+        for n in range(len(out) - 1, -1, -1):
+            if out[n] is self.mark:
+                start = n + 1
+                record_render(self.cache, self.id, "".join(out[start:]))
+                return
+        # already streamed, its targets respond with the whole component
+        forget_render(self.cache, self.id)
+
+
+def _awaits_render(root: Any, sync: Set[int]) -> bool:
+    """
+    Whether serializing root waits on the render of an async component
+    within its elements. The elements that don't are added to sync so
+    they aren't looked at again for each of their children. A component
+    with a sync render doesn't, the elements it renders are looked at when
+    they're serialized.
+    """
+    if id(root) in sync:
+        return False
+    visited = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Component):
+            if iscoroutinefunction(type(node).render):
+                return True
+        elif isinstance(node, Element) and id(node) not in sync:
+            visited.append(node)
+            stack.extend(node.content)
+    sync.update(map(id, visited))
+    return False
+
+
+def _serialize(
+    root: Any, out: List[str], static: bool = False
+) -> Generator[Awaitable, Any, None]:
+    """
+    Write the HTML of a tree of elements, components and docs into out.
+
+    The tree is walked with a stack rather than recursively and nothing is
+    awaited per node. The generator only yields an awaitable when there's
+    I/O to wait on, a component's render or children rendered
+    concurrently, and expects its result to be sent back. Static trees
+    never render children concurrently.
+    """
+    app = getattr(Component, "app", None)
+    concurrent_render = app.concurrent_render if app and not static else False
+    limit = app.render_concurrency if app else DEFAULT_RENDER_CONCURRENCY
+    graph = app.dependency_graph if app and app.dependency_graph.enabled else None
+    # the elements found not to wait on async renders, see _awaits_render
+    sync: Set[int] = set()
+
+    stack = [root]
+    pop = stack.pop
+    push = stack.append
+    write = out.append
+
+    while stack:
+        node = pop()
+        if isinstance(node, str):
+            write(node)
+        elif isinstance(node, Element):
+            tag = node._get_tag()
+            write(node._start_tag(tag))
+            if tag.self_closing:
+                # hype ignores the content of self closing elements
+                continue
+
+            content: List[Any] = node.content
+            concurrent = node._options.concurrent
+            if concurrent is None or static:
+                concurrent = concurrent_render
+            if concurrent and sum(not isinstance(c, str) for c in content) > 1:
+                awaits = [
+                    not isinstance(c, str) and _awaits_render(c, sync) for c in content
+                ]
+                if sum(awaits) > 1:
+                    content = yield node._render_content_concurrently(awaits, limit)
+
+            push(tag.end)
+            stack.extend(reversed(content))
+        elif isinstance(node, Component):
+            if graph is not None:
+                graph.track(node)
+            node.check_memoized()
+            if node.state_store is not False:
+                node.save_state()
+            if node.memoize is not False:
+                html = node._get_memoized()
+                if html is None:
+                    html = yield node._memoize()
+                write(html)
+                continue
+
+            el = node._call_render()
+            if isawaitable(el):
+                # only components with an async render are waited on
+                el = yield el
+            node.set_element_id(el)
+            if node.diff is not False:
+                cache = node.get_diff_cache()
+                if cache is not None and in_shared_render():
+                    record_shared(cache, node.id)
+                elif cache is not None:
+                    mark = _DiffMark()
+                    write(mark)
+                    push(_RecordRender(node.id, cache, mark))
+            push(el)
+        elif isinstance(node, _RecordRender):
+            node.record(out)
+        else:
+            write("<!DOCTYPE html>")
+            push(node.el)
+
+
+def _render_static(root: Any, out: List[str]) -> None:
+    serializer = _serialize(root, out, static=True)
+    try:
+        awaitable = next(serializer)
+    except StopIteration:
+        return
+    serializer.close()
+    if iscoroutine(awaitable):
+        awaitable.close()
+    raise RedmageError("A static subtree can't wait on a component's render")
+
+
+async def _render(root: Any) -> str:
+    out: List[str] = []
+    serializer = _serialize(root, out)
+    try:
+        awaitable = next(serializer)
+        while True:
+            awaitable = serializer.send(await awaitable)
+    except StopIteration:
+        pass
+    return "".join(out)
+
+
+async def _stream(root: Any) -> AsyncIterator[str]:
+    out: List[str] = []
+    serializer = _serialize(root, out)
+    try:
+        awaitable = next(serializer)
+        while True:
+            if out:
+                yield "".join(out)
+                out.clear()
+            # rendering waits on I/O here, see utils.astream
+            yield ""
+            awaitable = serializer.send(await awaitable)
+    except StopIteration:
+        pass
+    if out:
+        yield "".join(out)
 
 
 class A(Element):
+    __slots__ = ()
     el = hype.A
 
 
 class Abbr(Element):
+    __slots__ = ()
     el = hype.Abbr
 
 
 class Address(Element):
+    __slots__ = ()
     el = hype.Address
 
 
 class Area(Element):
+    __slots__ = ()
     el = hype.Area
 
 
 class Article(Element):
+    __slots__ = ()
     el = hype.Article
 
 
 class Aside(Element):
+    __slots__ = ()
     el = hype.Aside
 
 
 class Audio(Element):
+    __slots__ = ()
     el = hype.Audio
 
 
 class B(Element):
+    __slots__ = ()
     el = hype.B
 
 
 class Base(Element):
+    __slots__ = ()
     el = hype.Base
 
 
 class Bdi(Element):
+    __slots__ = ()
     el = hype.Bdi
 
 
 class Bdo(Element):
+    __slots__ = ()
     el = hype.Bdo
 
 
 class Blockquote(Element):
+    __slots__ = ()
     el = hype.Blockquote
 
 
 class Body(Element):
+    __slots__ = ()
     el = hype.Body
 
 
 class Br(Element):
+    __slots__ = ()
     el = hype.Br
 
 
 class Button(Element):
+    __slots__ = ()
     el = hype.Button
 
 
 class Canvas(Element):
+    __slots__ = ()
     el = hype.Canvas
 
 
 class Caption(Element):
+    __slots__ = ()
     el = hype.Caption
 
 
 class Cite(Element):
+    __slots__ = ()
     el = hype.Cite
 
 
 class Code(Element):
+    __slots__ = ()
     el = hype.Code
 
 
 class Col(Element):
+    __slots__ = ()
     el = hype.Col
 
 
 class Colgroup(Element):
+    __slots__ = ()
     el = hype.Colgroup
 
 
 class Data(Element):
+    __slots__ = ()
     el = hype.Data
 
 
 class Datalist(Element):
+    __slots__ = ()
     el = hype.Datalist
 
 
 class Dd(Element):
+    __slots__ = ()
     el = hype.Dd
 
 
 class Del(Element):
+    __slots__ = ()
     el = hype.Del
 
 
 class Details(Element):
+    __slots__ = ()
     el = hype.Details
 
 
 class Dfn(Element):
+    __slots__ = ()
     el = hype.Dfn
 
 
 class Dialog(Element):
+    __slots__ = ()
     el = hype.Dialog
 
 
 class Div(Element):
+    __slots__ = ()
     el = hype.Div
 
 
 class Dl(Element):
+    __slots__ = ()
     el = hype.Dl
 
 
 class Dt(Element):
+    __slots__ = ()
     el = hype.Dt
 
 
 class Em(Element):
+    __slots__ = ()
     el = hype.Em
 
 
 class Embed(Element):
+    __slots__ = ()
     el = hype.Embed
 
 
 class Fieldset(Element):
+    __slots__ = ()
     el = hype.Fieldset
 
 
 class Figcaption(Element):
+    __slots__ = ()
     el = hype.Figcaption
 
 
 class Figure(Element):
+    __slots__ = ()
     el = hype.Figure
 
 
 class Footer(Element):
+    __slots__ = ()
     el = hype.Footer
 
 
 class Form(Element):
+    __slots__ = ()
     el = hype.Form
 
 
 class H1(Element):
+    __slots__ = ()
     el = hype.H1
 
 
 class H2(Element):
+    __slots__ = ()
     el = hype.H2
 
 
 class H3(Element):
+    __slots__ = ()
     el = hype.H3
 
 
 class H4(Element):
+    __slots__ = ()
     el = hype.H4
 
 
 class H5(Element):
+    __slots__ = ()
     el = hype.H5
 
 
 class H6(Element):
+    __slots__ = ()
     el = hype.H6
 
 
 class Head(Element):
+    __slots__ = ()
     el = hype.Head
 
 
 class Header(Element):
+    __slots__ = ()
     el = hype.Header
 
 
 class Hgroup(Element):
+    __slots__ = ()
     el = hype.Hgroup
 
 
 class Hr(Element):
+    __slots__ = ()
     el = hype.Hr
 
 
 class Html(Element):
+    __slots__ = ()
     el = hype.Html
 
 
 class I(Element):
+    __slots__ = ()
     el = hype.I
 
 
 class Iframe(Element):
+    __slots__ = ()
     el = hype.Iframe
 
 
 class Img(Element):
+    __slots__ = ()
     el = hype.Img
 
 
 class Input(Element):
+    __slots__ = ()
     el = hype.Input
 
 
 class Ins(Element):
+    __slots__ = ()
     el = hype.Ins
 
 
 class Kbd(Element):
+    __slots__ = ()
     el = hype.Kbd
 
 
 class Label(Element):
+    __slots__ = ()
     el = hype.Label
 
 
 class Legend(Element):
+    __slots__ = ()
     el = hype.Legend
 
 
 class Li(Element):
+    __slots__ = ()
     el = hype.Li
 
 
 class Link(Element):
+    __slots__ = ()
     el = hype.Link
 
 
 class Main(Element):
+    __slots__ = ()
     el = hype.Main
 
 
 class Map(Element):
+    __slots__ = ()
     el = hype.Map
 
 
 class Mark(Element):
+    __slots__ = ()
     el = hype.Mark
 
 
 class Math(Element):
+    __slots__ = ()
     el = hype.Math
 
 
 class Menu(Element):
+    __slots__ = ()
     el = hype.Menu
 
 
 class Menuitem(Element):
+    __slots__ = ()
     el = hype.Menuitem
 
 
 class Meta(Element):
+    __slots__ = ()
     el = hype.Meta
 
 
 class Meter(Element):
+    __slots__ = ()
     el = hype.Meter
 
 
 class Nav(Element):
+    __slots__ = ()
     el = hype.Nav
 
 
 class Noscript(Element):
+    __slots__ = ()
     el = hype.Noscript
 
 
 class Object(Element):
+    __slots__ = ()
     el = hype.Object
 
 
 class Ol(Element):
+    __slots__ = ()
     el = hype.Ol
 
 
 class Optgroup(Element):
+    __slots__ = ()
     el = hype.Optgroup
 
 
 class Option(Element):
+    __slots__ = ()
     el = hype.Option
 
 
 class Output(Element):
+    __slots__ = ()
     el = hype.Output
 
 
 class P(Element):
+    __slots__ = ()
     el = hype.P
 
 
 class Param(Element):
+    __slots__ = ()
     el = hype.Param
 
 
 class Picture(Element):
+    __slots__ = ()
     el = hype.Picture
 
 
 class Pre(Element):
+    __slots__ = ()
     el = hype.Pre
 
 
 class Progress(Element):
+    __slots__ = ()
     el = hype.Progress
 
 
 class Q(Element):
+    __slots__ = ()
     el = hype.Q
 
 
 class Rb(Element):
+    __slots__ = ()
     el = hype.Rb
 
 
 class Rp(Element):
+    __slots__ = ()
     el = hype.Rp
 
 
 class Rt(Element):
+    __slots__ = ()
     el = hype.Rt
 
 
 class Rtc(Element):
+    __slots__ = ()
     el = hype.Rtc
 
 
 class Ruby(Element):
+    __slots__ = ()
     el = hype.Ruby
 
 
 class S(Element):
+    __slots__ = ()
     el = hype.S
 
 
 class Samp(Element):
+    __slots__ = ()
     el = hype.Samp
 
 
 class Script(Element):
+    __slots__ = ()
     el = hype.Script
 
 
 class Section(Element):
+    __slots__ = ()
     el = hype.Section
 
 
 class Select(Element):
+    __slots__ = ()
     el = hype.Select
 
 
 class SelfClosingElement(Element):
+    __slots__ = ()
     el = hype.SelfClosingElement
 
 
 class Slot(Element):
+    __slots__ = ()
     el = hype.Slot
 
 
 class Small(Element):
+    __slots__ = ()
     el = hype.Small
 
 
 class Source(Element):
+    __slots__ = ()
     el = hype.Source
 
 
 class Span(Element):
+    __slots__ = ()
     el = hype.Span
 
 
 class Strong(Element):
+    __slots__ = ()
     el = hype.Strong
 
 
 class Style(Element):
+    __slots__ = ()
     el = hype.Style
 
 
 class Sub(Element):
+    __slots__ = ()
     el = hype.Sub
 
 
 class Summary(Element):
+    __slots__ = ()
     el = hype.Summary
 
 
 class Sup(Element):
+    __slots__ = ()
     el = hype.Sup
 
 
 class Svg(Element):
+    __slots__ = ()
     el = hype.Svg
 
 
 class Table(Element):
+    __slots__ = ()
     el = hype.Table
 
 
 class Tbody(Element):
+    __slots__ = ()
     el = hype.Tbody
 
 
 class Td(Element):
+    __slots__ = ()
     el = hype.Td
 
 
 class Template(Element):
+    __slots__ = ()
     el = hype.Template
 
 
 class Textarea(Element):
+    __slots__ = ()
     el = hype.Textarea
 
 
 class Tfoot(Element):
+    __slots__ = ()
     el = hype.Tfoot
 
 
 class Th(Element):
+    __slots__ = ()
     el = hype.Th
 
 
 class Thead(Element):
+    __slots__ = ()
     el = hype.Thead
 
 
 class Time(Element):
+    __slots__ = ()
     el = hype.Time
 
 
 class Title(Element):
+    __slots__ = ()
     el = hype.Title
 
 
 class Tr(Element):
+    __slots__ = ()
     el = hype.Tr
 
 
 class Track(Element):
+    __slots__ = ()
     el = hype.Track
 
 
 class U(Element):
+    __slots__ = ()
     el = hype.U
 
 
 class Ul(Element):
+    __slots__ = ()
     el = hype.Ul
 
 
 class Var(Element):
+    __slots__ = ()
     el = hype.Var
 
 
 class Video(Element):
+    __slots__ = ()
     el = hype.Video
 
 
 class Wbr(Element):
+    __slots__ = ()
     el = hype.Wbr
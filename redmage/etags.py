@@ -0,0 +1,47 @@
+import re
+from hashlib import blake2b
+from typing import Hashable
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+# The uuids of the uuid and stored component ids, after the class name in
+# the ids of their elements and the paths of their targets, which are new in
+# every render
+_COMPONENT_UUID = re.compile(
+    rb"(?<=\w[-/])[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+)
+
+
+def content_etag(body: bytes) -> str:
+    # a weak ETag, the same body up to the ids of its components has the
+    # same one
+    normalized = _COMPONENT_UUID.sub(b"", body)
+    return f'W/"{blake2b(normalized, digest_size=16).hexdigest()}"'
+
+
+def version_etag(request: Request, version: Hashable) -> str:
+    # a weak ETag, the version only stands for the data the response is
+    # rendered from and the URL for the state of the component
+    scope = request.scope
+    key = repr((scope["path"], scope["query_string"], version)).encode()
+    return f'W/"{blake2b(key, digest_size=16).hexdigest()}"'
+
+
+def _opaque(etag: str) -> str:
+    # If-None-Match uses the weak comparison
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = _opaque(etag)
+    return any(_opaque(tag.strip()) == opaque for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"etag": etag})
@@ -1,2 +1,6 @@
 class RedmageError(Exception):
     pass
+
+
+class InvalidStateToken(RedmageError):
+    pass
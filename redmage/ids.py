@@ -0,0 +1,101 @@
+from contextvars import ContextVar
+from hashlib import blake2b
+from itertools import count
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple, Union
+from uuid import uuid4
+
+from .exceptions import RedmageError
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .components import Component
+
+# Builds the part of a component's id after its class name, which is also
+# the id in the paths of its targets so the route functions rebuild the
+# same id from the URL
+IdStrategy = Callable[["Component"], str]
+IdOption = Union[str, IdStrategy]
+
+
+class IdScope:
+    """
+    What deterministic ids are derived from within a request, the id of the
+    component the request targets, if any, and how many components of each
+    class and state have been given an id so far.
+    """
+
+    __slots__ = ("root", "counts")
+
+    def __init__(self, root: str = ""):
+        self.root = root
+        self.counts: Dict[Tuple[str, str], int] = {}
+
+
+_id_scope: ContextVar[Optional[IdScope]] = ContextVar("redmage_id_scope", default=None)
+
+
+def enter_id_scope(root: str = "") -> None:
+    # called by the route functions at the start of every request
+    _id_scope.set(IdScope(root))
+
+
+def uuid_id(component: "Component") -> str:
+    # random, the id of a component is what its target requests find its
+    # page and last render by, a uuid1 is a timestamp and a MAC address, one
+    # close to a known id can be guessed
+    return str(uuid4())
+
+
+def random_id(component: "Component") -> str:
+    # the id of a stored component is the only key to its state, random
+    # whatever the id strategy of the app
+    return str(uuid4())
+
+
+_counter = count(1)
+
+
+def counter_id(component: "Component") -> str:
+    # unique within the process, not between processes or restarts
+    return str(next(_counter))
+
+
+def deterministic_id(component: "Component") -> str:
+    """
+    A hash of the position of the component in the request, the component
+    the request targets and the order it's given an id in among the
+    components of the same class and state, and its state. The same page,
+    or the same target request, always gets the same ids, so the URLs of
+    its targets can be cached.
+
+    The order is the order the components are created in, not their place
+    in the tree, so the ids are only the same between renders that create
+    them in the same order. With concurrent rendering the children that
+    wait are built in whatever order they finish waiting in, and their ids
+    can differ from one render to the next.
+    """
+    scope = _id_scope.get()
+    if scope is None:
+        scope = IdScope()
+        _id_scope.set(scope)
+    name = type(component).__name__
+    state = repr(component._get_state())
+    n = scope.counts.get((name, state), 0)
+    scope.counts[(name, state)] = n + 1
+    key = repr((scope.root, name, state, n)).encode()
+    return blake2b(key, digest_size=8).hexdigest()
+
+
+ID_STRATEGIES: Dict[str, IdStrategy] = {
+    "uuid": uuid_id,
+    "counter": counter_id,
+    "deterministic": deterministic_id,
+}
+
+
+def get_id_strategy(option: IdOption) -> IdStrategy:
+    # id_strategy="uuid", "counter", "deterministic" or a function
+    if callable(option):
+        return option
+    if option not in ID_STRATEGIES:
+        raise RedmageError(f"Unknown id strategy {option!r}")
+    return ID_STRATEGIES[option]
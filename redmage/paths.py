@@ -0,0 +1,128 @@
+from inspect import Parameter, Signature
+from typing import Any, Callable, Dict, List, Tuple
+
+from starlette.convertors import CONVERTOR_TYPES as starlette_convertors
+
+from .utils import group_signature_param_by_kind
+
+BasePathBuilder = Callable[[Any], str]
+TargetPathBuilder = Callable[[Tuple[Any, ...], Dict[str, Any]], str]
+
+
+def get_annotation_name(annotation: Any) -> str:
+    return (
+        annotation
+        if isinstance(annotation, str) or not hasattr(annotation, "__name__")
+        else annotation.__name__
+    )
+
+
+def _escape(text: str) -> str:
+    # literal text inside of a generated f-string
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def _compile(name: str, source: str, namespace: Dict[str, Any]) -> Callable:
+    exec(compile(source, f"<redmage {name}>", "exec"), namespace)
+    return namespace[name]
+
+
+def _convertor_call(namespace: Dict[str, Any], type_name: str, value: str) -> str:
+    # Bind the convertor now if it's registered, otherwise look it up when the
+    # path is built so a missing convertor only fails if it's actually used
+    key = f"c{len(namespace)}"
+    convertor = starlette_convertors.get(type_name)
+    if convertor:
+        namespace[key] = convertor.to_string
+        return f"{key}({value})"
+    namespace[key] = type_name
+    return f"convertors[{key}].to_string({value})"
+
+
+def compile_base_path_builder(
+    class_name: str, fields: List[Tuple[str, str]]
+) -> BasePathBuilder:
+    """
+    Generate the function that builds the base path of a component
+    instance, one f-string with the convertor of each field already bound.
+    """
+    namespace: Dict[str, Any] = {"convertors": starlette_convertors}
+    template = f"/{_escape(class_name)}/{{instance.id.partition('-')[2]}}"
+    for field, type_name in fields:
+        value = _convertor_call(
+            namespace, type_name, f"getattr(instance, {field!r}, None)"
+        )
+        template += f"/{_escape(field)}/{{{value}}}"
+
+    source = f'def build_base_path(instance):\n    return f"{template}"\n'
+    return _compile("build_base_path", source, namespace)
+
+
+def compile_token_path_builder(
+    class_name: str, fields: List[str], encode: Callable[[Tuple[Any, ...]], str]
+) -> BasePathBuilder:
+    """
+    Generate the function that builds the base path of a component
+    instance with its state packed into a single token.
+    """
+    namespace: Dict[str, Any] = {"encode": encode}
+    values = "".join(f"getattr(instance, {field!r}, None), " for field in fields)
+    template = (
+        f"/{_escape(class_name)}/{{instance.id.partition('-')[2]}}"
+        f"/{{encode(({values}))}}"
+    )
+    source = f'def build_base_path(instance):\n    return f"{template}"\n'
+    return _compile("build_base_path", source, namespace)
+
+
+def compile_target_path_builder(method_name: str, sig: Signature) -> TargetPathBuilder:
+    """
+    Generate the function that builds the target part of the path from the
+    args and kwargs the target method was called with. Path params are
+    matched to args by position and added to the path, params with a
+    default are added to the query string.
+    """
+    namespace: Dict[str, Any] = {"convertors": starlette_convertors}
+    grouped_params = group_signature_param_by_kind(sig)
+    positional_or_keyword = grouped_params[Parameter.POSITIONAL_OR_KEYWORD]
+
+    # self could be position only or postion_or_keyword
+    # so set an offset to account for it
+    offset = (
+        1 if positional_or_keyword and positional_or_keyword[0].name == "self" else 0
+    )
+
+    lines = [
+        "def build_target_path(args, kwargs):",
+        "    params = args + tuple(kwargs.values())",
+        "    n_params = len(params)",
+        f"    path = [{'/' + method_name!r}]",
+    ]
+    for n, param in enumerate(positional_or_keyword):
+        if param.default == Parameter.empty and param.name != "self":
+            value = _convertor_call(
+                namespace,
+                get_annotation_name(param.annotation),
+                f"params[{n - offset}]",
+            )
+            lines.append(f"    if n_params >= {n}:")
+            lines.append(f"        path.append(f'/{{{value}}}')")
+
+    lines.append("    query = []")
+    for n, param in enumerate(
+        positional_or_keyword + grouped_params[Parameter.KEYWORD_ONLY]
+    ):
+        if param.default != Parameter.empty and param.name != "self":
+            value = _convertor_call(
+                namespace,
+                get_annotation_name(param.annotation),
+                f"params[{n - offset}]",
+            )
+            key = _escape(f"{method_name}__{param.name}")
+            lines.append(f"    if n_params >= {n}:")
+            lines.append(f"        query.append(f'{key}={{{value}}}')")
+
+    lines.append("    if query:")
+    lines.append("        path.append('?' + '&'.join(query))")
+    lines.append("    return ''.join(path)")
+    return _compile("build_target_path", "\n".join(lines) + "\n", namespace)
@@ -0,0 +1,119 @@
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Dict, Hashable, Iterable, List, Optional, Set
+from uuid import uuid4
+
+from .cache import LRUCache
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .components import Component
+
+# Defaults of the app's dependency graph
+DEFAULT_MAX_PAGES = 10000
+DEFAULT_MAX_COMPONENTS = 100000
+
+
+class Visit:
+    """
+    The page a request renders components on, a new one for a route or the
+    page of the component a target request is for, and the stores the
+    target wrote.
+    """
+
+    __slots__ = ("page", "written")
+
+    def __init__(self, page: str):
+        self.page = page
+        self.written: Set[Hashable] = set()
+
+
+_visit: ContextVar[Optional[Visit]] = ContextVar("redmage_visit", default=None)
+
+
+class DependencyGraph:
+    """
+    Which components on each page read which stores, so the components a
+    target's writes affect can be rendered again and swapped in out of
+    band. The pages are remembered as they're rendered: the components that
+    read stores, with their state and render_attrs, and the page of each component with
+    targets, which is the page of the target requests for it. Only
+    components whose id is unique to one page are tracked.
+
+    Like the MemoryStateStore it's in-process, the requests of a page are
+    expected to reach the process that rendered it.
+    """
+
+    def __init__(
+        self,
+        max_pages: int = DEFAULT_MAX_PAGES,
+        max_components: int = DEFAULT_MAX_COMPONENTS,
+    ):
+        # the components that read stores on each page, their class and
+        # state by id
+        self.pages = LRUCache(max_entries=max_pages)
+        # the page of each component, by id
+        self.component_pages = LRUCache(max_entries=max_components)
+        # the components with targets, the target requests come back for
+        self.classes: Set[type] = set()
+        # set once a target writes stores, nothing is tracked before
+        self.enabled = False
+
+    def enter_page(self) -> None:
+        # called by the route functions at the start of every page
+        _visit.set(Visit(uuid4().hex))
+
+    def enter_target(self, id: str) -> None:
+        """
+        Called by the target route functions with the id of the component
+        the request is for. A component that wasn't tracked, or was
+        forgotten, starts a page of its own with what the target renders.
+        """
+        page = self.component_pages.get(id)
+        _visit.set(Visit(page if page is not None else uuid4().hex))
+
+    def track(self, component: "Component") -> None:
+        # called every time a component is rendered
+        visit = _visit.get()
+        cls = type(component)
+        if visit is None or not (cls.reads or cls in self.classes):
+            return
+        if not cls.has_unique_ids():
+            return
+        id = component.id
+        self.component_pages.set(id, visit.page, 1)
+        if cls.reads:
+            readers = self.pages.get(visit.page)
+            if readers is None:
+                readers = {}
+                self.pages.set(visit.page, readers, 1)
+            names = (field.name for field in cls.get_state_schema().fields)
+            state = dict(zip(names, component._get_state()))
+            for name in cls.render_attrs:
+                state[name] = getattr(component, name)
+            readers[id] = (cls, state)
+
+    def write(self, stores: Iterable[Hashable]) -> None:
+        # the stores written by the target of the request
+        visit = _visit.get()
+        if visit is not None:
+            visit.written.update(stores)
+
+    def get_dependents(self) -> List["Component"]:
+        """
+        The components on the page of the request that read any of the
+        stores written since the last call, rebuilt with the state,
+        render_attrs and id they were last rendered with.
+        """
+        visit = _visit.get()
+        if visit is None or not visit.written:
+            return []
+        written = visit.written
+        visit.written = set()
+        readers: Dict[str, Any] = self.pages.get(visit.page) or {}
+        dependents = []
+        for id, (cls, state) in list(readers.items()):
+            if written.intersection(cls.reads):
+                instance = cls.__new__(cls)
+                instance.__dict__.update(state)
+                instance._id = id
+                dependents.append(instance)
+        return dependents
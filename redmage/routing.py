@@ -0,0 +1,149 @@
+import re
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+from starlette.convertors import Convertor
+from starlette.routing import BaseRoute, Match, NoMatchFound, Route
+from starlette.types import Receive, Scope, Send
+
+PARAM_SEGMENT_REGEX = re.compile(
+    r"^{([a-zA-Z_][a-zA-Z0-9_]*)(:[a-zA-Z_][a-zA-Z0-9_]*)?}$"
+)
+
+
+class _Node:
+    __slots__ = ("static", "params", "routes")
+
+    def __init__(self) -> None:
+        self.static: Dict[str, "_Node"] = {}
+        # (param name, convertor type, convertor, compiled regex, child)
+        self.params: List[Tuple[str, str, Convertor, Pattern, "_Node"]] = []
+        self.routes: List[Route] = []
+
+    def get_param_child(
+        self, name: str, type_name: str, convertor: Convertor
+    ) -> "_Node":
+        for param_name, param_type, _, _, child in self.params:
+            if param_name == name and param_type == type_name:
+                return child
+        child = _Node()
+        regex = re.compile(convertor.regex)
+        self.params.append((name, type_name, convertor, regex, child))
+        return child
+
+
+class TargetRouter(BaseRoute):
+    """
+    Matches the /{ClassName}/{id}/.../{method} routes of component targets
+    with a prefix tree over the path segments instead of trying the regex
+    of every route in turn. Static segments are looked up in a dict and
+    only the typed dynamic segments run their convertor regex.
+
+    It's added to the Starlette routes as a single route, any path it
+    doesn't know is left to the routes that follow it.
+    """
+
+    def __init__(self) -> None:
+        self.root = _Node()
+        self.routes: List[Route] = []
+
+    @staticmethod
+    def _parse_segments(route: Route) -> Optional[List[Tuple[str, Optional[str]]]]:
+        segments: List[Tuple[str, Optional[str]]] = []
+        for segment in route.path.split("/")[1:]:
+            match = PARAM_SEGMENT_REGEX.match(segment)
+            if match:
+                name, type_name = match.groups()
+                segments.append((name, type_name[1:] if type_name else "str"))
+            elif "{" in segment:
+                # params sharing a segment with static text aren't supported
+                return None
+            else:
+                segments.append((segment, None))
+        return segments
+
+    def can_add(self, route: Route) -> bool:
+        segments = self._parse_segments(route)
+        if segments is None:
+            return False
+        # convertors like path can match more than a single segment
+        return all(
+            re.fullmatch(route.param_convertors[name].regex, "a/b") is None
+            for name, type_name in segments
+            if type_name
+        )
+
+    def add(self, route: Route) -> None:
+        segments = self._parse_segments(route)
+        assert segments is not None and self.can_add(route)
+        node = self.root
+        for name, type_name in segments:
+            if type_name:
+                convertor = route.param_convertors[name]
+                node = node.get_param_child(name, type_name, convertor)
+            else:
+                node = node.static.setdefault(name, _Node())
+        # registering the same target again replaces it
+        for existing in [r for r in node.routes if r.methods == route.methods]:
+            node.routes.remove(existing)
+            self.routes.remove(existing)
+        node.routes.append(route)
+        self.routes.append(route)
+
+    def _lookup(
+        self, node: _Node, segments: List[str], index: int, params: Dict[str, Any]
+    ) -> Optional[_Node]:
+        if index == len(segments):
+            return node if node.routes else None
+
+        segment = segments[index]
+        child = node.static.get(segment)
+        if child is not None:
+            found = self._lookup(child, segments, index + 1, params)
+            if found is not None:
+                return found
+
+        for name, _, convertor, regex, child in node.params:
+            if regex.fullmatch(segment):
+                params[name] = convertor.convert(segment)
+                found = self._lookup(child, segments, index + 1, params)
+                if found is not None:
+                    return found
+                del params[name]
+        return None
+
+    def matches(self, scope: Scope) -> Tuple[Match, Scope]:
+        if scope["type"] != "http":
+            return Match.NONE, {}
+
+        matched_params: Dict[str, Any] = {}
+        node = self._lookup(self.root, scope["path"].split("/")[1:], 0, matched_params)
+        if node is None:
+            return Match.NONE, {}
+
+        path_params = dict(scope.get("path_params", {}))
+        path_params.update(matched_params)
+        for route in node.routes:
+            if not route.methods or scope["method"] in route.methods:
+                return Match.FULL, {
+                    "endpoint": route.endpoint,
+                    "path_params": path_params,
+                    "redmage.route": route,
+                }
+        # the route will respond with 405 Method Not Allowed
+        route = node.routes[0]
+        return Match.PARTIAL, {
+            "endpoint": route.endpoint,
+            "path_params": path_params,
+            "redmage.route": route,
+        }
+
+    def url_path_for(self, __name: str, **path_params: Any) -> Any:
+        for route in self.routes:
+            try:
+                return route.url_path_for(__name, **path_params)
+            except NoMatchFound:
+                pass
+        raise NoMatchFound(__name, path_params)
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await scope["redmage.route"].handle(scope, receive, send)
@@ -0,0 +1,110 @@
+from typing import (
+    Any,
+    ClassVar,
+    Dict,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    get_origin,
+    get_type_hints,
+)
+
+from starlette.convertors import CONVERTOR_TYPES as starlette_convertors
+from starlette.convertors import Convertor
+
+from .paths import (
+    BasePathBuilder,
+    compile_base_path_builder,
+    compile_token_path_builder,
+    get_annotation_name,
+)
+from .tokens import STATE_PARAM, StateCodec
+
+# Annotated attributes of Component itself that aren't component state
+COMPONENT_ATTRIBUTES = ("app", "render_extensions")
+
+
+class StateField(NamedTuple):
+    name: str
+    type_name: str
+    convertor: Optional[Convertor]
+
+
+def _get_annotations(cls: Type) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    raw: Dict[str, Any] = {}
+    for base in reversed(cls.__mro__):
+        raw.update(base.__dict__.get("__annotations__", {}))
+    try:
+        # resolves string annotations, e.g. from __future__ import annotations
+        hints = get_type_hints(cls)
+    except (NameError, TypeError):
+        # forward references that can't be resolved (yet) are looked up by
+        # their name like any other string annotation
+        hints = raw
+    return raw, hints
+
+
+class StateSchema:
+    """
+    The annotated fields of a component class that make up its state, in
+    order, with their convertors. Both the route pattern and the URLs of
+    instances are generated from it.
+
+    With a codec the state is packed into a single token in the path
+    instead of a segment for each field, and the state of a stored
+    component isn't in the path at all.
+    """
+
+    def __init__(
+        self, cls: Type, codec: Optional[StateCodec] = None, stored: bool = False
+    ) -> None:
+        raw, hints = _get_annotations(cls)
+        fields = []
+        for name, hint in hints.items():
+            if name in COMPONENT_ATTRIBUTES or get_origin(hint) is ClassVar:
+                continue
+            annotation = raw.get(name, hint)
+            # a string annotation that names a convertor is used as is,
+            # like "Optional[int]", since the resolved type has no name
+            if isinstance(annotation, str) and annotation in starlette_convertors:
+                type_name = annotation
+            else:
+                type_name = get_annotation_name(hint)
+            fields.append(
+                StateField(name, type_name, starlette_convertors.get(type_name))
+            )
+
+        self.class_name = cls.__name__
+        self.fields: Tuple[StateField, ...] = tuple(fields)
+        self.stored = stored
+        # a component without state has nothing to pack
+        self.codec = codec if self.fields and not stored else None
+        self.build_path: BasePathBuilder
+        if stored:
+            self.route_path = f"/{cls.__name__}/{{id:str}}"
+            self.build_path = compile_base_path_builder(cls.__name__, [])
+        elif self.codec:
+            self.route_path = f"/{cls.__name__}/{{id:str}}/{{{STATE_PARAM}:str}}"
+            self.build_path = compile_token_path_builder(
+                cls.__name__, [field.name for field in self.fields], self.encode_state
+            )
+        else:
+            self.route_path = f"/{cls.__name__}/{{id:str}}" + "".join(
+                f"/{field.name}/{{{field.name}:{field.type_name}}}"
+                for field in self.fields
+            )
+            self.build_path = compile_base_path_builder(
+                cls.__name__, [(field.name, field.type_name) for field in self.fields]
+            )
+        self._convertors = tuple(field.convertor for field in self.fields)
+
+    def encode_state(self, values: Tuple[Any, ...]) -> str:
+        assert self.codec is not None
+        return self.codec.encode(values, self._convertors)
+
+    def decode_state(self, token: str) -> Dict[str, Any]:
+        # raises InvalidStateToken if it wasn't encoded by the codec
+        assert self.codec is not None
+        values = self.codec.decode(token, self._convertors)
+        return {field.name: value for field, value in zip(self.fields, values)}
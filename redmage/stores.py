@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import pickle
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .cache import LRUCache
+
+logger = logging.getLogger("redmage")
+
+State = Dict[str, Any]
+
+# Defaults of the app's state store
+DEFAULT_MAX_STATES = 10000
+DEFAULT_STATE_TTL = 60 * 60
+
+
+class StateStore(ABC):
+    """
+    Where the state of the components with a state store is kept between
+    requests, by the id of the component. Only the id is in the paths of
+    their targets, the state is loaded from the store when a target is
+    requested and saved every time the component is rendered.
+
+    save is called while rendering so it can't wait, a store that does I/O
+    queues the state and writes it later, load still has to return it.
+    """
+
+    @abstractmethod
+    def save(self, key: str, state: State) -> None:
+        # queue the state if it can't be saved right away
+        ...  # pragma: no cover
+
+    @abstractmethod
+    async def load(self, key: str) -> Optional[State]:
+        # None if there's no state for the key or it expired
+        ...  # pragma: no cover
+
+    async def flush(self) -> None:
+        # write everything that's queued
+        pass
+
+    async def close(self) -> None:
+        await self.flush()
+
+
+class MemoryStateStore(StateStore):
+    """
+    Keeps the states in an LRUCache, the least recently used are dropped
+    once there are more than max_entries and they expire after ttl
+    seconds. Only for apps running in a single process.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_STATES,
+        ttl: Optional[float] = DEFAULT_STATE_TTL,
+    ):
+        # every state counts as one byte, only the number of them is limited
+        self.cache = LRUCache(max_entries=max_entries, max_bytes=max_entries, ttl=ttl)
+
+    def save(self, key: str, state: State) -> None:
+        self.cache.set(key, state, 1)
+
+    async def load(self, key: str) -> Optional[State]:
+        return self.cache.get(key)
+
+
+class SQLiteStateStore(StateStore):
+    """
+    Keeps the states in a local SQLite database, so they survive restarts
+    and are shared by the processes of the app on the same host. States
+    are queued when they're saved and written together every
+    flush_interval seconds, in a thread so the event loop never waits on
+    the disk. Queued states are loaded from the queue.
+
+    States are serialized with pickle unless dumps and loads are given.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = DEFAULT_STATE_TTL,
+        flush_interval: float = 0.05,
+        dumps: Callable[[State], bytes] = pickle.dumps,
+        loads: Callable[[bytes], State] = pickle.loads,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.dumps = dumps
+        self.loads = loads
+        self.pending: Dict[str, State] = {}
+        self.writes = 0
+        self.flushes = 0
+        self._flush_task: Optional["asyncio.Task[None]"] = None
+        # the connection is only ever used by this thread
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path)
+            self._connection.executescript(
+                "CREATE TABLE IF NOT EXISTS redmage_state "
+                "(key TEXT PRIMARY KEY, state BLOB NOT NULL, expires REAL);"
+                "CREATE INDEX IF NOT EXISTS redmage_state_expires "
+                "ON redmage_state (expires);"
+            )
+        return self._connection
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, fn, *args
+        )
+
+    def save(self, key: str, state: State) -> None:
+        self.pending[key] = state
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(
+                self._flush_later()
+            )
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._flush_task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Writing the state of components to %s failed", self.path)
+
+    async def flush(self) -> None:
+        if not self.pending:
+            return
+        pending = dict(self.pending)
+        expires = time.time() + self.ttl if self.ttl is not None else None
+        rows = [(key, self.dumps(state), expires) for key, state in pending.items()]
+        await self._run(self._write, rows)
+        self.writes += len(rows)
+        self.flushes += 1
+        for key, state in pending.items():
+            # unless it was saved again while it was written
+            if self.pending.get(key) is state:
+                del self.pending[key]
+
+    def _write(self, rows: Any) -> None:
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO redmage_state VALUES (?, ?, ?)", rows
+            )
+            connection.execute(
+                "DELETE FROM redmage_state WHERE expires < ?", (time.time(),)
+            )
+
+    async def load(self, key: str) -> Optional[State]:
+        state = self.pending.get(key)
+        if state is not None:
+            return state
+        data = await self._run(self._read, key)
+        return self.loads(data) if data is not None else None
+
+    def _read(self, key: str) -> Optional[bytes]:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT state FROM redmage_state "
+                "WHERE key = ? AND (expires IS NULL OR expires >= ?)",
+                (key, time.time()),
+            )
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        await self._run(self._close)
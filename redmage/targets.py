@@ -1,39 +1,104 @@
+import html
+import json
 import logging
-from typing import Any, Callable
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
 
 from redmage.components import Component
 
-from .types import HTTPMethod
+from .cache import CacheOption
+from .types import HTMXSwap, HTTPMethod
 
 logger = logging.getLogger("redmage")
 
+# The endpoint batches of targets are posted to
+BATCH_PATH = "/_redmage/batch"
+# The endpoint pages invoke targets over with the htmx ws extension, and the
+# field of the messages with the target invoked
+WS_PATH = "/_redmage/ws"
+TARGET_PARAM = "__target"
+# The field of the messages and batches with the swap of the element, the
+# components that replace the invoking one are swapped in with it
+SWAP_PARAM = "__swap"
+
+
+def parse_swap(value: str) -> str:
+    """
+    The swap of an element sent with a target invocation, its style and
+    the modifiers after it, like "innerHTML swap:1s". Raises ValueError if
+    the style isn't one of htmx's.
+    """
+    style, _, modifiers = value.strip().partition(" ")
+    HTMXSwap(style)
+    return f"{style} {modifiers.strip()}" if modifiers.strip() else style
+
 
 class Target:
     @staticmethod
-    def _decorator(fn: Callable, method: str = HTTPMethod.GET) -> Callable:
+    def _decorator(
+        fn: Callable, method: str = HTTPMethod.GET, writes: Iterable[Hashable] = ()
+    ) -> Callable:
         setattr(fn, "is_target", True)
         setattr(fn, "target_method", method)
+        setattr(fn, "target_writes", tuple(writes))
         return fn
 
     @classmethod
-    def get(cls, fn: Callable) -> Callable:
-        return cls._decorator(fn, HTTPMethod.GET)
+    def get(
+        cls,
+        fn: Optional[Callable] = None,
+        *,
+        cache: CacheOption = None,
+        coalesce: Optional[bool] = None,
+        etag: Optional[bool] = None,
+        writes: Iterable[Hashable] = (),
+    ) -> Any:
+        # both @Target.get and @Target.get(cache=..., coalesce=..., etag=...)
+        if fn is None:
+            return lambda fn: cls.get(
+                fn, cache=cache, coalesce=coalesce, etag=etag, writes=writes
+            )
+        setattr(fn, "target_cache", cache)
+        setattr(fn, "target_coalesce", coalesce)
+        setattr(fn, "target_etag", etag)
+        return cls._decorator(fn, HTTPMethod.GET, writes)
 
     @classmethod
-    def post(cls, fn: Callable) -> Callable:
-        return cls._decorator(fn, HTTPMethod.POST)
+    def post(
+        cls, fn: Optional[Callable] = None, *, writes: Iterable[Hashable] = ()
+    ) -> Any:
+        """
+        Both @Target.post and @Target.post(writes=(...)), the stores the
+        target writes. The components on the page that read any of them
+        are rendered again and swapped in out of band after it runs, and
+        the memoized HTML and cached responses tagged with them dropped.
+        """
+        if fn is None:
+            return lambda fn: cls.post(fn, writes=writes)
+        return cls._decorator(fn, HTTPMethod.POST, writes)
 
     @classmethod
-    def put(cls, fn: Callable) -> Callable:
-        return cls._decorator(fn, HTTPMethod.PUT)
+    def put(
+        cls, fn: Optional[Callable] = None, *, writes: Iterable[Hashable] = ()
+    ) -> Any:
+        if fn is None:
+            return lambda fn: cls.put(fn, writes=writes)
+        return cls._decorator(fn, HTTPMethod.PUT, writes)
 
     @classmethod
-    def delete(cls, fn: Callable) -> Callable:
-        return cls._decorator(fn, HTTPMethod.DELETE)
+    def delete(
+        cls, fn: Optional[Callable] = None, *, writes: Iterable[Hashable] = ()
+    ) -> Any:
+        if fn is None:
+            return lambda fn: cls.delete(fn, writes=writes)
+        return cls._decorator(fn, HTTPMethod.DELETE, writes)
 
     @classmethod
-    def patch(cls, fn: Callable) -> Callable:
-        return cls._decorator(fn, HTTPMethod.PATCH)
+    def patch(
+        cls, fn: Optional[Callable] = None, *, writes: Iterable[Hashable] = ()
+    ) -> Any:
+        if fn is None:
+            return lambda fn: cls.patch(fn, writes=writes)
+        return cls._decorator(fn, HTTPMethod.PATCH, writes)
 
     def __init__(
         self,
@@ -41,21 +106,71 @@ class Target:
         method_name: str,
         http_method: HTTPMethod,
         *args: Any,
-        **kwargs: Any
+        **kwargs: Any,
     ):
         self.instance = instance
         self.method_name = method_name
         self.http_method = http_method
         self.args = args
         self.kwargs = kwargs
+        self._path: Optional[str] = None
 
     @property
     def path(self) -> str:
-        path = self.instance.get_base_path(instance=self.instance)
-        path += self.instance.get_target_path(
-            self.method_name,
-            *self.args,
-            instance=self.instance,
-            **self.kwargs,
+        # built once, the element reads it for every hx-* attribute
+        if self._path is None:
+            self._path = self.instance.get_base_path(
+                instance=self.instance
+            ) + self.instance.get_target_path(
+                self.method_name,
+                *self.args,
+                instance=self.instance,
+                **self.kwargs,
+            )
+        return self._path
+
+    def get_hx_attributes(self, swap: str) -> Dict[str, Any]:
+        # the hx-* attributes of an element with the target
+        app = getattr(Component, "app", None)
+        if app and app.websocket:
+            # sent over the connection of the page, the component it renders
+            # is swapped in out of band
+            message = {TARGET_PARAM: f"{self.http_method} {self.path}"}
+            if swap != HTMXSwap.OUTER_HTML:
+                message[SWAP_PARAM] = swap
+            return {"ws-send": True, "hx-vals": html.escape(json.dumps(message))}
+        return {
+            "hx-swap": swap,
+            "hx-target": f"#{self.instance.id}",
+            f"hx-{self.http_method.lower()}": self.path,
+        }
+
+
+class Batch:
+    """
+    Several targets invoked with a single request to the batch endpoint,
+    which swaps the components they render in out of band. The targets
+    that aren't GET targets run first, one after another, then the GET
+    targets run concurrently.
+    """
+
+    def __init__(self, *targets: Target):
+        self.targets = targets
+
+    @property
+    def invocations(self) -> str:
+        return json.dumps(
+            [f"{target.http_method} {target.path}" for target in self.targets]
         )
-        return path
+
+    def get_hx_attributes(self, swap: str) -> Dict[str, str]:
+        # every component is swapped in out of band, the response itself
+        # isn't swapped anywhere
+        vals = {"targets": self.invocations}
+        if swap != HTMXSwap.OUTER_HTML:
+            vals[SWAP_PARAM] = swap
+        return {
+            "hx-swap": HTMXSwap.NONE,
+            "hx-post": BATCH_PATH,
+            "hx-vals": html.escape(json.dumps(vals)),
+        }
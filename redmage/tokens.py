@@ -0,0 +1,224 @@
+import hmac
+import zlib
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from functools import lru_cache
+from struct import Struct
+from struct import error as StructError
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from starlette.convertors import (
+    Convertor,
+    FloatConvertor,
+    IntegerConvertor,
+    PathConvertor,
+    StringConvertor,
+    UUIDConvertor,
+)
+
+from .convertors import BoolConvertor, StringConverter
+from .exceptions import InvalidStateToken
+
+# The path param the state token of a component is matched as, a private
+# name can't be a field since it would be mangled
+STATE_PARAM = "__state"
+
+# Payloads shorter than this aren't worth compressing
+COMPRESS_MIN_SIZE = 32
+
+_COMPRESSED = 1
+
+# Tags of the packed values
+_NONE = 0
+_FALSE = 1
+_TRUE = 2
+_INT = 3
+_FLOAT = 4
+_STR = 5
+# any other value, as its convertor's string
+_CONVERTED = 6
+
+_DOUBLE = Struct(">d")
+
+# The tags the values of the fields with each convertor are packed with,
+# besides None. The type of the others isn't known so they aren't checked.
+_CONVERTOR_TAGS: Dict[type, Tuple[int, ...]] = {
+    IntegerConvertor: (_INT,),
+    FloatConvertor: (_FLOAT, _INT),
+    StringConvertor: (_STR,),
+    StringConverter: (_STR,),
+    PathConvertor: (_STR,),
+    BoolConvertor: (_FALSE, _TRUE),
+    UUIDConvertor: (_CONVERTED,),
+}
+
+
+def _pack_varint(out: bytearray, n: int) -> None:
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _unpack_varint(data: bytes, i: int) -> Tuple[int, int]:
+    # the number and the index after it
+    n = shift = 0
+    while True:
+        byte = data[i]
+        i += 1
+        n |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return n, i
+
+
+def _pack_str(out: bytearray, tag: int, value: str) -> None:
+    data = value.encode()
+    out.append(tag)
+    _pack_varint(out, len(data))
+    out += data
+
+
+def _pack(out: bytearray, value: Any, convertor: Optional[Convertor]) -> None:
+    if value is None:
+        out.append(_NONE)
+    elif value is True or value is False:
+        out.append(_TRUE if value else _FALSE)
+    elif type(value) is int:
+        out.append(_INT)
+        # zigzag, small negative numbers stay short
+        _pack_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+    elif type(value) is float:
+        out.append(_FLOAT)
+        out += _DOUBLE.pack(value)
+    elif type(value) is str:
+        _pack_str(out, _STR, value)
+    else:
+        _pack_str(
+            out,
+            _CONVERTED,
+            convertor.to_string(value) if convertor else str(value),
+        )
+
+
+class StateCodec:
+    """
+    Packs the state of a component into one base64url token, the path of
+    its targets then has a single segment for the state instead of one
+    pair of segments per field. The values are packed in the order of the
+    fields, so the names aren't part of it, with a tag byte and a varint
+    length or the binary value.
+
+    With compress the payload is zlib compressed when it's smaller that
+    way. With a secret the token is signed with an HMAC and a token that
+    doesn't match is rejected, so the state can't be tampered with.
+
+    The values of the last cache_size tokens decoded are kept.
+    """
+
+    def __init__(
+        self,
+        secret: Union[str, bytes, None] = None,
+        compress: bool = False,
+        digest_size: int = 16,
+        cache_size: int = 1024,
+    ):
+        self.secret = secret.encode() if isinstance(secret, str) else secret
+        self.compress = compress
+        self.digest_size = digest_size
+        self._decode_cached = lru_cache(maxsize=cache_size)(self._decode)
+
+    def _sign(self, secret: bytes, data: bytes) -> bytes:
+        return hmac.new(secret, data, "sha256").digest()[: self.digest_size]
+
+    def encode(
+        self, values: Sequence[Any], convertors: Sequence[Optional[Convertor]]
+    ) -> str:
+        payload = bytearray()
+        for value, convertor in zip(values, convertors):
+            _pack(payload, value, convertor)
+
+        flags = 0
+        data = bytes(payload)
+        if self.compress and len(data) >= COMPRESS_MIN_SIZE:
+            compressed = zlib.compress(data)
+            if len(compressed) < len(data):
+                flags |= _COMPRESSED
+                data = compressed
+
+        data = bytes((flags,)) + data
+        if self.secret is not None:
+            data += self._sign(self.secret, data)
+        return urlsafe_b64encode(data).rstrip(b"=").decode()
+
+    def decode(
+        self, token: str, convertors: Tuple[Optional[Convertor], ...]
+    ) -> Tuple[Any, ...]:
+        # the same URLs are requested again and again, like a polled
+        # target, so the values of the most recent tokens are kept
+        return self._decode_cached(token, convertors)
+
+    def _decode(
+        self, token: str, convertors: Tuple[Optional[Convertor], ...]
+    ) -> Tuple[Any, ...]:
+        try:
+            data = urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        except (BinasciiError, ValueError):
+            raise InvalidStateToken(token)
+
+        if self.secret is not None:
+            # checked before it's decompressed or parsed
+            split = len(data) - self.digest_size
+            data, mac = data[:split], data[split:]
+            if not hmac.compare_digest(mac, self._sign(self.secret, data)):
+                raise InvalidStateToken(token)
+
+        try:
+            if data[0] & _COMPRESSED:
+                data = zlib.decompress(data[1:])
+                i = 0
+            else:
+                i = 1
+            values: List[Any] = []
+            for convertor in convertors:
+                tag = data[i]
+                # a value of another type than the field's would only
+                # fail once it's rendered
+                tags = _CONVERTOR_TAGS.get(type(convertor))
+                if tags is not None and tag != _NONE and tag not in tags:
+                    raise ValueError(tag)
+                if tag == _STR or tag == _CONVERTED or tag == _INT:
+                    # a varint, most are a single byte
+                    n = data[i + 1]
+                    i += 2
+                    if n > 0x7F:
+                        n, i = _unpack_varint(data, i - 1)
+                    if tag == _INT:
+                        values.append(-((n + 1) >> 1) if n & 1 else n >> 1)
+                        continue
+                    end = i + n
+                    if end > len(data):
+                        raise IndexError(end)
+                    value = data[i:end].decode()
+                    i = end
+                    if tag == _CONVERTED and convertor:
+                        value = convertor.convert(value)
+                    values.append(value)
+                    continue
+                i += 1
+                if tag == _NONE:
+                    values.append(None)
+                elif tag == _FALSE or tag == _TRUE:
+                    values.append(tag == _TRUE)
+                elif tag == _FLOAT:
+                    values.append(_DOUBLE.unpack_from(data, i)[0])
+                    i += 8
+                else:
+                    raise ValueError(tag)
+        except (IndexError, ValueError, StructError, zlib.error):
+            # UnicodeDecodeError and bad converted values are ValueErrors
+            raise InvalidStateToken(token)
+
+        if i != len(data):
+            raise InvalidStateToken(token)
+        return tuple(values)
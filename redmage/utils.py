@@ -1,6 +1,18 @@
+import asyncio
 import inspect
 from inspect import Parameter, _ParameterKind
-from typing import Any, Dict, List
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Sequence,
+    TypeVar,
+)
+
+T = TypeVar("T")
 
 
 def group_signature_param_by_kind(
@@ -20,3 +32,49 @@ def group_signature_param_by_kind(
 
 async def astr(astringable: Any) -> str:
     return await astringable._astr_()
+
+
+def astream(astreamable: Any) -> AsyncIterator[str]:
+    """
+    Render in chunks. An empty chunk marks a point where rendering may
+    wait on I/O, everything before it can be sent to the client.
+    """
+    return astreamable._astream_()
+
+
+async def buffer_stream(stream: AsyncIterator[str]) -> AsyncIterator[str]:
+    # join the chunks in between the points where rendering may wait
+    buffer: List[str] = []
+    async for chunk in stream:
+        if chunk:
+            buffer.append(chunk)
+        elif buffer:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+
+async def gather_limited(
+    fns: Sequence[Callable[[], Awaitable[T]]], limit: int
+) -> List[T]:
+    """
+    Await the result of each function with at most limit running at a
+    time. Results are in the same order as the functions no matter which
+    finishes first.
+    """
+    results: List[Any] = [None] * len(fns)
+    pending = iter(enumerate(fns))
+
+    async def worker() -> None:
+        for n, fn in pending:
+            results[n] = await fn()
+
+    tasks = [asyncio.ensure_future(worker()) for _ in range(min(limit, len(fns)))]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    return results
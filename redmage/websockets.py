@@ -0,0 +1,40 @@
+import json
+from typing import Any, Optional, Tuple
+from urllib.parse import urlencode
+
+from .elements import Div
+from .targets import SWAP_PARAM, TARGET_PARAM, WS_PATH, parse_swap
+from .types import HTMXSwap
+
+
+def parse_message(text: str) -> Optional[Tuple[str, bytes, str]]:
+    """
+    The target invoked by a message of the htmx ws extension, "METHOD
+    path", the values of the message urlencoded as the body of the target
+    and the swap of the element. None if the message isn't a target
+    invocation.
+    """
+    try:
+        values = json.loads(text)
+        invocation = values.pop(TARGET_PARAM)
+        swap = parse_swap(values.pop(SWAP_PARAM, HTMXSwap.OUTER_HTML))
+    except (ValueError, KeyError, AttributeError, TypeError):
+        return None
+    # the headers htmx would have sent with a request
+    values.pop("HEADERS", None)
+    fields = [
+        (name, value)
+        for name, value_or_values in values.items()
+        for value in (
+            value_or_values if isinstance(value_or_values, list) else [value_or_values]
+        )
+    ]
+    return str(invocation), urlencode(fields).encode(), swap
+
+
+def connect(*children: Any, **kwargs: Any) -> Div:
+    """
+    The element holding the WebSocket connection of the page, the targets
+    of the elements within it are invoked over the connection.
+    """
+    return Div(*children, hx_ext="ws", ws_connect=WS_PATH, **kwargs)
@@ -6,6 +6,7 @@ from jinja2 import Template
 if __name__ == "__main__":
     # generate the source code for all the Element classes
     template_string = """class {{ name }}(Element):
+    __slots__ = ()
     el = hype.element.{{ name }}"""
 
     template = Template(template_string)
@@ -0,0 +1,15 @@
+import pytest
+
+from redmage import Component
+
+
+@pytest.fixture(autouse=True)
+def redmage_app():
+    # every test builds its own app and components, the app of another
+    # test would turn the targets of its elements into WebSocket targets
+    # and register its pages' routes again
+    Component.app = None
+    Component.components = []
+    yield
+    Component.app = None
+    Component.components = []
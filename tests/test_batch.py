@@ -0,0 +1,225 @@
+import asyncio
+import html
+import json
+from dataclasses import dataclass
+
+import pytest
+from starlette.exceptions import HTTPException
+from starlette.testclient import TestClient
+
+from redmage import Batch, Component, Redmage, Target
+from redmage.core import _swap_oob
+from redmage.elements import Button, Div
+from redmage.targets import BATCH_PATH, SWAP_PARAM
+from redmage.types import HTMXSwap
+from redmage.utils import astr
+
+
+def test_swap_oob():
+    assert _swap_oob('\n<div id="a">b</div>') == (
+        '\n<div hx-swap-oob="true" id="a">b</div>'
+    )
+    assert _swap_oob("<br/>") == '<br hx-swap-oob="true"/>'
+    assert _swap_oob("<p>") == '<p hx-swap-oob="true">'
+    assert _swap_oob("text") == "text"
+    assert _swap_oob("<p>", "outerHTML:#a") == '<p hx-swap-oob="outerHTML:#a">'
+
+
+def create_app():
+    app = Redmage(batch=True)
+    log = []
+
+    @dataclass
+    class Message:
+        message: str
+
+    class CounterComponent(Component):
+        count: int
+
+        def __init__(self, count: int = 0):
+            self.count = count
+
+        def render(self):
+            return Div(self.count)
+
+        @Target.post
+        async def add(self, n: int):
+            log.append(("add", self.count, n))
+            await asyncio.sleep(0)
+            self.count += n
+
+        @Target.get
+        async def refresh(self):
+            log.append(("refresh", self.count))
+            await asyncio.sleep(0)
+
+    class MessageComponent(Component):
+        message: str
+
+        def __init__(self, message: str = ""):
+            self.message = message
+
+        def render(self):
+            return Div(self.message)
+
+        @Target.put
+        def set_message(self, message: Message, /):
+            log.append(("set_message", message.message))
+            self.message = message.message
+
+        @Target.get
+        def both(self):
+            # several components from one target
+            return (self, CounterComponent(7))
+
+        @Target.get
+        def missing(self):
+            raise HTTPException(status_code=404)
+
+        @Target.get
+        def replace(self):
+            # in place of the component, with another id
+            return Div("replaced")
+
+    return app, log, CounterComponent, MessageComponent
+
+
+def post_batch(client, *targets, **fields):
+    invocations = Batch(*targets).invocations
+    return client.post(BATCH_PATH, data={"targets": invocations, **fields})
+
+
+@pytest.mark.asyncio
+async def test_batch_attributes():
+    app, log, CounterComponent, MessageComponent = create_app()
+    app.create_routes()
+    counter = CounterComponent(1)
+    batch = Batch(counter.add(2), counter.refresh())
+    button = await astr(Button("Add", click=batch))
+    vals = {"targets": batch.invocations}
+    assert f'hx-vals="{html.escape(json.dumps(vals))}"' in button
+    assert f'hx-post="{BATCH_PATH}"' in button
+    assert 'hx-swap="none"' in button
+    assert "hx-target" not in button
+    assert json.loads(batch.invocations) == [
+        f"POST {counter.add(2).path}",
+        f"GET {counter.refresh().path}",
+    ]
+
+    button = await astr(Button("Add", click=batch, swap=HTMXSwap.BEFORE_END))
+    vals = {"targets": batch.invocations, SWAP_PARAM: "beforeend"}
+    assert f'hx-vals="{html.escape(json.dumps(vals))}"' in button
+    assert 'hx-swap="none"' in button
+
+
+def test_batch():
+    app, log, CounterComponent, MessageComponent = create_app()
+    client = TestClient(app.starlette)
+    counter = CounterComponent(1)
+    other = CounterComponent(10)
+    message = MessageComponent("a")
+
+    response = post_batch(
+        client,
+        counter.refresh(),
+        counter.add(2),
+        message.set_message(),
+        other.refresh(),
+        message.both(),
+        message="b",
+    )
+    assert response.status_code == 200
+    # the targets that change something first, in order
+    assert log[:2] == [("add", 1, 2), ("set_message", "b")]
+    assert sorted(log[2:]) == [("refresh", 1), ("refresh", 10)]
+
+    # in the order of the batch
+    fragments = response.text.strip().split("\n\n")
+    assert fragments == [
+        f'<div hx-swap-oob="true" id="{counter.id}">1</div>',
+        f'<div hx-swap-oob="true" id="{counter.id}">3</div>',
+        f'<div hx-swap-oob="true" id="{message.id}">b</div>',
+        f'<div hx-swap-oob="true" id="{other.id}">10</div>',
+        f'<div hx-swap-oob="true" id="{message.id}">a</div>',
+        fragments[-1],
+    ]
+    assert fragments[-1].endswith(">7</div>")
+    assert 'hx-swap-oob="true"' in fragments[-1]
+
+
+def test_batch_swap():
+    app, log, CounterComponent, MessageComponent = create_app()
+    client = TestClient(app.starlette)
+    message = MessageComponent("a")
+
+    # the element with the invoking component's id is replaced
+    response = post_batch(client, message.replace())
+    assert response.text == (
+        f'\n<div hx-swap-oob="outerHTML:#{message.id}">replaced</div>'
+    )
+    # with the swap of the element
+    response = post_batch(client, message.both(), **{SWAP_PARAM: "afterend"})
+    assert response.text.startswith(
+        f'<div hx-swap-oob="afterend:#{message.id}">'
+        f'\n<div id="{message.id}">a</div>\n<div id="CounterComponent-'
+    )
+    response = post_batch(client, message.replace(), **{SWAP_PARAM: "delete"})
+    assert response.text == (
+        f'<div hx-swap-oob="delete:#{message.id}">\n<div>replaced</div></div>'
+    )
+    # out of band swaps only take the style, the modifiers are dropped
+    swap = "outerHTML transition:true"
+    response = post_batch(client, message.replace(), **{SWAP_PARAM: swap})
+    assert response.text == (
+        f'\n<div hx-swap-oob="outerHTML:#{message.id}">replaced</div>'
+    )
+    swap = "delete swap:1s"
+    response = post_batch(client, message.replace(), **{SWAP_PARAM: swap})
+    assert response.text.startswith(f'<div hx-swap-oob="delete:#{message.id}">')
+    response = post_batch(client, message.replace(), **{SWAP_PARAM: "sideways"})
+    assert response.status_code == 400
+
+
+def test_batch_path_param():
+    app = Redmage(batch=True)
+
+    class PathComponent(Component):
+        def render(self):
+            return Div(self.rest)
+
+        @Target.get
+        def go(self, rest: "path"):  # noqa: F821
+            self.rest = rest
+
+    client = TestClient(app.starlette)
+    component = PathComponent()
+    # matched one route at a time, the path convertor spans segments
+    assert app.batch_routes
+    response = post_batch(client, component.go("a/b"))
+    assert response.text == f'\n<div hx-swap-oob="true" id="{component.id}">a/b</div>'
+
+
+def test_batch_invalid():
+    app, log, CounterComponent, MessageComponent = create_app()
+    client = TestClient(app.starlette)
+    message = MessageComponent("a")
+
+    assert client.post(BATCH_PATH).status_code == 400
+    assert client.post(BATCH_PATH, data={"targets": "{}"}).status_code == 400
+    response = client.post(BATCH_PATH, data={"targets": '["GET /unknown"]'})
+    assert response.status_code == 400
+
+    # a target that fails is left out
+    targets = json.dumps(
+        [f"GET {message.missing().path}", f"GET {message.both().path}"]
+    )
+    response = client.post(BATCH_PATH, data={"targets": targets})
+    assert response.status_code == 200
+    assert log == []
+    assert ">a</div>" in response.text
+
+
+def test_batch_disabled():
+    app = Redmage()
+    client = TestClient(app.starlette)
+    assert client.post(BATCH_PATH, data={"targets": "[]"}).status_code == 404
@@ -0,0 +1,362 @@
+import asyncio
+import fcntl
+import socket
+import sys
+
+import pytest
+from starlette.testclient import TestClient
+
+from redmage import Component, Redmage
+from redmage.broadcast import (
+    SSE_PATH,
+    Broadcaster,
+    MemoryBackend,
+    Subscription,
+    UnixSocketBackend,
+    format_event,
+    listen,
+    pack_frame,
+    unpack_frame,
+)
+from redmage.elements import Div
+from redmage.utils import astr
+
+
+class EventStream:
+    """
+    Drives the SSE endpoint of an app directly, a test client would wait
+    for the end of the response which never comes.
+    """
+
+    def __init__(self, app, query_string):
+        self.app = app
+        self.query_string = query_string
+        self.messages = asyncio.Queue()
+        self.disconnected = asyncio.Event()
+
+    async def receive(self):
+        await self.disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        await self.messages.put(message)
+
+    async def __aenter__(self):
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": SSE_PATH,
+            "raw_path": SSE_PATH.encode(),
+            "query_string": self.query_string.encode(),
+            "headers": [],
+            "app": self.app.starlette,
+        }
+        self.task = asyncio.create_task(self.app.starlette(scope, self.receive, self.send))
+        self.start = await self.messages.get()
+        return self
+
+    async def read(self):
+        message = await asyncio.wait_for(self.messages.get(), 1)
+        return message["body"].decode()
+
+    async def __aexit__(self, *args):
+        self.disconnected.set()
+        await asyncio.wait_for(self.task, 1)
+
+
+@pytest.mark.asyncio
+async def test_subscription_drops_oldest():
+    subscription = Subscription(("a",), max_queued=2)
+    for message in ("1", "2", "3"):
+        subscription.put(message)
+    assert subscription.dropped == 1
+    assert await subscription.get() == "2"
+    assert await subscription.get() == "3"
+
+    get = asyncio.create_task(subscription.get())
+    await asyncio.sleep(0)
+    assert not get.done()
+    subscription.put("4")
+    assert await get == "4"
+
+
+@pytest.mark.asyncio
+async def test_broadcaster():
+    broadcaster = Broadcaster(max_queued=10)
+    a = broadcaster.subscribe(["a"])
+    ab = broadcaster.subscribe(["a", "b"])
+    await broadcaster.publish("a", "x")
+    await broadcaster.publish("b", "y")
+    await broadcaster.publish("c", "z")
+    assert list(a.messages) == ["x"]
+    assert list(ab.messages) == ["x", "y"]
+    assert (broadcaster.published, broadcaster.delivered) == (3, 3)
+
+    broadcaster.unsubscribe(ab)
+    broadcaster.unsubscribe(ab)
+    assert broadcaster.subscriptions == {"a": {a}}
+    await broadcaster.disconnect()
+    await broadcaster.disconnect()
+    # not connected, nothing is delivered
+    await MemoryBackend().publish("a", "x")
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_connect_retry():
+    class FailingBackend(MemoryBackend):
+        failures = 1
+
+        async def connect(self, deliver):
+            if self.failures:
+                self.failures -= 1
+                raise OSError("unavailable")
+            await super().connect(deliver)
+
+    broadcaster = Broadcaster(FailingBackend())
+    a = broadcaster.subscribe(["a"])
+    with pytest.raises(OSError):
+        await broadcaster.publish("a", "x")
+    # the failed connect isn't kept, the next call connects
+    await broadcaster.publish("a", "y")
+    assert list(a.messages) == ["y"]
+
+
+def test_format_event():
+    assert format_event("<div>\n</div>") == (
+        "event: redmage\ndata: <div>\ndata: </div>\n\n"
+    )
+    assert format_event("") == "event: redmage\ndata: \n\n"
+    assert format_event("a\r\nb\rc\x0bd\u2028e\n") == (
+        "event: redmage\ndata: a\ndata: b\ndata: c\x0bd\u2028e\ndata: \n\n"
+    )
+
+
+@pytest.mark.asyncio
+async def test_listen():
+    html = await astr(listen("a", "b c"))
+    assert 'hx-ext="sse"' in html
+    assert f'sse-connect="{SSE_PATH}?topic=a&topic=b+c"' in html
+    assert 'sse-swap="redmage"' in html
+    assert 'hx-swap="none"' in html
+
+
+def create_app(**kwargs):
+    app = Redmage(sse=True, **kwargs)
+
+    class Clock(Component):
+        def __init__(self, time: int = 0):
+            self.time = time
+
+        @property
+        def id(self):
+            return "clock"
+
+        def render(self):
+            return Div(self.time)
+
+    return app, Clock
+
+
+@pytest.mark.asyncio
+async def test_publish():
+    app, Clock = create_app()
+    async with EventStream(app, "topic=clock") as stream:
+        assert stream.start["status"] == 200
+        assert (b"content-type", b"text/event-stream; charset=utf-8") in stream.start[
+            "headers"
+        ]
+        assert await stream.read() == ": subscribed\n\n"
+        assert app.broadcaster.subscriptions["clock"]
+
+        await app.publish("clock", Clock(1))
+        await app.publish("other", Clock(2))
+        await app.publish("clock", "<p>text</p>")
+        assert await stream.read() == (
+            'event: redmage\ndata: \ndata: <div hx-swap-oob="true" id="clock">1</div>\n\n'
+        )
+        assert await stream.read() == "event: redmage\ndata: <p>text</p>\n\n"
+    # unsubscribed once the client is gone
+    assert app.broadcaster.subscriptions == {}
+
+
+@pytest.mark.asyncio
+async def test_publish_renders_once():
+    app, Clock = create_app()
+    renders = []
+
+    class CountedClock(Clock):
+        def render(self):
+            renders.append(self.time)
+            return super().render()
+
+    async with EventStream(app, "topic=clock") as a, EventStream(
+        app, "topic=clock"
+    ) as b:
+        await a.read()
+        await b.read()
+        await app.publish("clock", CountedClock(1))
+        assert await a.read() == await b.read()
+    assert renders == [1]
+
+
+@pytest.mark.asyncio
+async def test_sse_ping():
+    app, Clock = create_app(sse_ping_interval=0.01)
+    async with EventStream(app, "topic=clock") as stream:
+        await stream.read()
+        assert await stream.read() == ": ping\n\n"
+
+
+def test_sse_routes():
+    app, Clock = create_app()
+    client = TestClient(app.starlette)
+    assert client.get(SSE_PATH).status_code == 400
+    app.create_routes()
+    assert [getattr(r, "path", None) for r in app.routes].count(SSE_PATH) == 1
+
+    app = Redmage()
+    client = TestClient(app.starlette)
+    assert client.get(f"{SSE_PATH}?topic=a").status_code == 404
+
+
+def test_frames():
+    frame = pack_frame("tópic", "<p>message</p>")
+    assert len(frame) == 6 + len("tópic".encode()) + 14
+    assert unpack_frame(frame) == ("tópic", "<p>message</p>")
+    assert unpack_frame(pack_frame("", "")) == ("", "")
+
+
+async def get(subscription):
+    return await asyncio.wait_for(subscription.get(), 1)
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_backend(tmp_path):
+    path = str(tmp_path / "hub.sock")
+    a = Broadcaster(UnixSocketBackend(path, reconnect_interval=0.01))
+    b = Broadcaster(UnixSocketBackend(path, reconnect_interval=0.01))
+    a_subscription = a.subscribe(["t"])
+    b_subscription = b.subscribe(["t"])
+    await a.connect()
+    await b.connect()
+    assert a.backend.hub is not None
+    assert b.backend.hub is None
+
+    # published once, received by every process
+    await b.publish("t", "x" * 100000)
+    await a.publish("t", "y")
+    assert await get(a_subscription) == "x" * 100000
+    assert await get(a_subscription) == "y"
+    assert await get(b_subscription) == "x" * 100000
+    assert await get(b_subscription) == "y"
+
+    # the process running the hub exits, another one takes over
+    await a.disconnect()
+    await asyncio.sleep(0)
+    await b.publish("t", "only here")
+    assert await get(b_subscription) == "only here"
+    while b.backend.hub is None:
+        await asyncio.sleep(0.01)
+    c = Broadcaster(UnixSocketBackend(path))
+    c_subscription = c.subscribe(["t"])
+    await c.connect()
+    await c.publish("t", "z")
+    assert await get(b_subscription) == "z"
+    assert await get(c_subscription) == "z"
+    await c.disconnect()
+    await b.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_backend_stale_socket(tmp_path, monkeypatch, caplog):
+    path = str(tmp_path / "hub.sock")
+    # left by a process that's gone
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(path)
+    stale.close()
+    a = Broadcaster(UnixSocketBackend(path, reconnect_interval=0.01))
+    await a.connect()
+    assert a.backend.hub is not None
+
+    b = Broadcaster(UnixSocketBackend(path, reconnect_interval=0.01))
+    subscription = b.subscribe(["t"])
+    await b.connect()
+    failed = []
+    open_hub = b.backend._open
+
+    async def fail_once():
+        if not failed:
+            failed.append(True)
+            raise OSError("no hub")
+        return await open_hub()
+
+    monkeypatch.setattr(b.backend, "_open", fail_once)
+    await a.disconnect()
+    while b.backend.hub is None:
+        await asyncio.sleep(0.01)
+    assert "Connecting to the broadcast hub failed" in caplog.text
+    await b.publish("t", "x")
+    assert await get(subscription) == "x"
+    await b.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_backend_lock(tmp_path):
+    path = str(tmp_path / "hub.sock")
+    broadcaster = Broadcaster(UnixSocketBackend(path))
+    with open(f"{path}.lock", "a") as lock:
+        # another process is looking for the hub
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        connect = asyncio.create_task(broadcaster.connect())
+        await asyncio.sleep(0.02)
+        assert not connect.done()
+    await connect
+    assert broadcaster.backend.hub is not None
+    await broadcaster.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_backend_stuck_peer(tmp_path, caplog):
+    path = str(tmp_path / "hub.sock")
+    broadcaster = Broadcaster(UnixSocketBackend(path, drain_timeout=0.01))
+    subscription = broadcaster.subscribe(["t"])
+    await broadcaster.connect()
+    # a process that stopped reading
+    _, stuck = await asyncio.open_unix_connection(path)
+    while len(broadcaster.backend.peers) < 2:
+        await asyncio.sleep(0.01)
+
+    await broadcaster.publish("t", "x" * 10000000)
+    assert await get(subscription) == "x" * 10000000
+    while len(broadcaster.backend.peers) > 1:
+        await asyncio.sleep(0.01)
+    assert "Dropped a process from the broadcast hub" in caplog.text
+    await broadcaster.publish("t", "y")
+    assert await get(subscription) == "y"
+    stuck.close()
+    await broadcaster.disconnect()
+
+
+WORKER = """
+import asyncio, sys
+from redmage.broadcast import Broadcaster, UnixSocketBackend
+
+async def main():
+    broadcaster = Broadcaster(UnixSocketBackend(sys.argv[1]))
+    await broadcaster.publish("t", "from the worker")
+    await broadcaster.disconnect()
+
+asyncio.run(main())
+"""
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_backend_processes(tmp_path):
+    path = str(tmp_path / "hub.sock")
+    broadcaster = Broadcaster(UnixSocketBackend(path))
+    subscription = broadcaster.subscribe(["t"])
+    await broadcaster.connect()
+    worker = await asyncio.create_subprocess_exec(sys.executable, "-c", WORKER, path)
+    assert await worker.wait() == 0
+    assert await get(subscription) == "from the worker"
+    await broadcaster.disconnect()
@@ -0,0 +1,603 @@
+import asyncio
+import re
+
+import httpx
+import pytest
+from starlette.responses import HTMLResponse
+from starlette.testclient import TestClient
+
+from redmage import Batch, Component, Redmage, Target
+from redmage.cache import CachedResponse, CachePolicy, LRUCache, get_cache_policy
+from redmage.core import _receive_empty
+from redmage.elements import Button, Div, Li, Ul
+from redmage.utils import astr, astream
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("redmage.cache.monotonic", lambda: now[0])
+    return now
+
+
+def test_lru_cache():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1, 1)
+    cache.set("b", 2, 1)
+    assert cache.get("a") == 1
+    # b is the least recently used
+    cache.set("c", 3, 1)
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert len(cache) == 2
+    assert cache.stats() == {
+        "hits": 1,
+        "stale_hits": 0,
+        "misses": 1,
+        "evictions": 1,
+        "entries": 2,
+        "bytes": 2,
+    }
+
+    assert cache.delete("a")
+    assert not cache.delete("a")
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.nbytes == 0
+
+
+def test_lru_cache_max_bytes():
+    cache = LRUCache(max_bytes=10)
+    cache.set("a", "a", 4)
+    cache.set("b", "b", 4)
+    cache.set("c", "c", 4)
+    assert "a" not in cache
+    assert cache.nbytes == 8
+
+    # too large to ever fit
+    cache.set("d", "d", 11)
+    assert "d" not in cache
+    assert cache.nbytes == 8
+
+    # replacing an entry replaces its size
+    cache.set("b", "b", 1)
+    assert cache.nbytes == 5
+
+
+def test_lru_cache_ttl(clock):
+    cache = LRUCache(ttl=10)
+    cache.set("a", 1, 1)
+    cache.set("b", 2, 1, ttl=20)
+    clock[0] = 10
+    assert cache.get("a") is None
+    assert "a" not in cache
+    assert cache.get("b") == 2
+    clock[0] = 20
+    assert "b" not in cache
+
+
+def test_get_cache_policy():
+    cache = LRUCache()
+    assert get_cache_policy(None) is None
+    assert get_cache_policy(False) is None
+    assert get_cache_policy(True) == CachePolicy()
+    assert get_cache_policy(5) == CachePolicy(ttl=5)
+    assert get_cache_policy(CachePolicy(cache=cache)).cache is cache
+
+
+def test_cached_response():
+    response = HTMLResponse("<div></div>", headers={"HX-Trigger": "test"})
+    cached = CachedResponse.from_response(response)
+    assert cached.size > len(response.body)
+
+    copy = cached.to_response()
+    assert copy.body == response.body
+    assert copy.headers == response.headers
+    assert copy.raw_headers is not response.raw_headers
+
+
+def test_redmage_cached_target():
+    app = Redmage()
+    renders = []
+
+    class TestComponent(Component):
+        n: int
+
+        def __init__(self, n: int = 0):
+            self.n = n
+
+        def render(self):
+            renders.append(self.n)
+            return Div(f"count={self.n}")
+
+        @Target.get(cache=True)
+        def iterate(self, n: int):
+            self.n = n
+
+        @Target.get
+        def not_cached(self): ...
+
+    client = TestClient(app.starlette)
+    for _ in range(3):
+        response = client.get("/TestComponent/1/n/0/iterate/1")
+        assert response.status_code == 200
+        assert response.text == '\n<div id="TestComponent-1">count=1</div>'
+    response = client.get("/TestComponent/1/n/0/iterate/2")
+    assert response.text == '\n<div id="TestComponent-1">count=2</div>'
+
+    client.get("/TestComponent/1/n/0/not_cached")
+    client.get("/TestComponent/1/n/0/not_cached")
+
+    assert renders == [1, 2, 0, 0]
+    assert app.response_cache.hits == 2
+    assert app.response_cache.misses == 2
+
+
+def test_redmage_cached_component(clock):
+    cache = LRUCache()
+    app = Redmage()
+    renders = []
+
+    class TestComponent(Component):
+        cache_policy = CachePolicy(ttl=10, cache=cache)
+
+        def render(self):
+            renders.append(self.id)
+            return Div("Hello World")
+
+        @Target.get
+        def cached(self): ...
+
+        @Target.get(cache=False)
+        def not_cached(self): ...
+
+        @Target.get
+        def not_found(self):
+            return Div("Not found")
+
+        @Target.post
+        def post(self): ...
+
+        @staticmethod
+        def build_response(content):
+            status_code = 404 if "Not found" in content else 200
+            return HTMLResponse(content, status_code=status_code)
+
+    client = TestClient(app.starlette)
+    for path in ("cached", "not_cached", "not_found", "post", "cached"):
+        method = client.post if path == "post" else client.get
+        method(f"/TestComponent/1/{path}")
+        method(f"/TestComponent/1/{path}")
+
+    assert len(renders) == 5
+    assert len(cache) == 1
+    assert len(app.response_cache) == 0
+
+    clock[0] = 10
+    client.get("/TestComponent/1/cached")
+    assert len(renders) == 6
+
+
+def test_lru_cache_tags():
+    cache = LRUCache(max_entries=3)
+    cache.set("a", 1, 1, tags=("x",))
+    cache.set("b", 2, 1, tags=("x", "y"))
+    cache.set("c", 3, 1, tags=("y",))
+    assert cache.invalidate("x") == 2
+    assert list(cache.entries) == ["c"]
+    assert cache.tags == {"y": {"c"}}
+    assert cache.invalidate("x") == 0
+    cache.delete("c")
+    assert cache.tags == {}
+
+    cache.set("d", 4, 1, tags=("z",))
+    cache.clear()
+    assert cache.tags == {}
+
+
+@pytest.mark.asyncio
+async def test_memoized_component():
+    app = Redmage()
+    renders = []
+
+    class ItemComponent(Component):
+        memoize = True
+        name: str
+
+        def __init__(self, name: str):
+            self.name = name
+
+        def render(self):
+            renders.append(self.name)
+            return Li(self.name, click=self.select())
+
+        @Target.get
+        def select(self): ...
+
+    app.starlette
+    items = [ItemComponent("a"), ItemComponent("b"), ItemComponent("a")]
+    html = await astr(Ul(*items))
+    assert renders == ["a", "b"]
+    for item in items:
+        id = item.id.partition("-")[2]
+        assert (
+            f'\n<li id="{item.id}" hx-swap="outerHTML" hx-target="#{item.id}" '
+            f'hx-get="/ItemComponent/{id}/name/{item.name}/select" '
+            f'hx-trigger="click">{item.name}</li>'
+        ) in html
+
+    # rendered on its own
+    item = ItemComponent("a")
+    assert (await astr(item)).startswith(f'\n<li id="{item.id}"')
+    chunks = [chunk async for chunk in astream(item)]
+    assert chunks == [await astr(item)]
+    assert renders == ["a", "b"]
+
+    assert ItemComponent.clear_memoized() == 2
+    chunks = [chunk async for chunk in astream(item)]
+    assert chunks == ["", await astr(item)]
+    assert renders == ["a", "b", "a"]
+    assert app.render_cache.hits == 5
+
+
+@pytest.mark.asyncio
+async def test_memoized_component_not_memoizable():
+    cache = LRUCache()
+    renders = []
+
+    class CustomIdComponent(Component):
+        memoize = cache
+
+        def render(self):
+            renders.append(self.id)
+            return Div("custom")
+
+        @property
+        def id(self):
+            return "CustomIdComponent-1"
+
+    class UnhashableComponent(Component):
+        memoize = cache
+        items: list
+
+        def __init__(self):
+            self.items = []
+
+        def render(self):
+            renders.append(self.id)
+            return Div("unhashable")
+
+    await astr(Div(CustomIdComponent(), CustomIdComponent()))
+    assert renders == ["CustomIdComponent-1"]
+
+    await astr(Div(UnhashableComponent(), UnhashableComponent()))
+    assert len(renders) == 3
+    assert len(cache) == 1
+
+    # memoize = True needs an app
+    class NoAppComponent(Component):
+        memoize = True
+
+        def render(self):
+            renders.append(self.id)
+            return Div("no app")
+
+    assert (await astr(NoAppComponent())).startswith('\n<div id="NoAppComponent-')
+    assert NoAppComponent.clear_memoized() == 0
+    assert len(renders) == 4
+
+
+@pytest.mark.asyncio
+async def test_memoized_component_with_nested_components():
+    app = Redmage()
+    renders = []
+
+    class Child(Component):
+        def render(self):
+            return Div("child", click=self.select())
+
+        @Target.get
+        def select(self): ...
+
+    class Stored(Component):
+        state_store = True
+
+        def render(self):
+            return Div("stored")
+
+    class Reader(Component):
+        reads = ("rows",)
+
+        def render(self):
+            return Div("reader")
+
+    class Plain(Component):
+        def render(self):
+            return Div("plain")
+
+    class Row(Component):
+        memoize = True
+        n: int
+
+        def __init__(self, n: int, child: type):
+            self.n = n
+            self.child = child
+
+        def render(self):
+            renders.append(self.n)
+            return Div(self.child())
+
+    class Table(Component):
+        memoize = True
+
+        def render(self):
+            return Div(Row(1, Child))
+
+    app.starlette
+    # the ids of the nested components would be reused with the HTML
+    for child in (Child, Stored, Reader):
+        renders.clear()
+        html = await astr(Div(Row(1, child), Row(1, child)))
+        ids = re.findall(rf'id="({child.__name__}-[^"]+)"', html)
+        assert len(set(ids)) == 2
+        assert renders == [1, 1]
+    # and the state of each stored one is saved
+    assert len(app.state_store.cache) == 2
+
+    renders.clear()
+    await astr(Div(Row(2, Plain), Row(2, Plain)))
+    assert renders == [2]
+
+    # nor is the HTML of a memoized component they're in
+    html = await astr(Div(Table(), Table()))
+    assert len(set(re.findall(r'id="(Child-[^"]+)"', html))) == 2
+
+
+@pytest.mark.asyncio
+async def test_memoized_component_with_outer_target():
+    app = Redmage()
+
+    class Inner(Component):
+        memoize = True
+
+        def __init__(self, target: Target):
+            self.target = target
+
+        def render(self):
+            return Button("+", click=self.target)
+
+    class Outer(Component):
+        memoize = True
+        n: int
+
+        def __init__(self, n: int):
+            self.n = n
+
+        def render(self):
+            return Div(Inner(self.inc()))
+
+        @Target.post
+        def inc(self): ...
+
+    app.starlette
+    outers = [Outer(1), Outer(1)]
+    html = await astr(Div(*outers))
+    # the target of each outer component, not the id of the inner one
+    for outer in outers:
+        id = outer.id.partition("-")[2]
+        assert f'hx-target="#{outer.id}" hx-post="/Outer/{id}/n/1/inc"' in html
+    assert "memo" not in html
+    # only the outer component's HTML, which patches its own id
+    assert len(app.render_cache) == 1
+
+    class Label(Component):
+        memoize = True
+
+        def render(self):
+            return Div("label")
+
+    class Card(Component):
+        memoize = True
+
+        def render(self):
+            return Div(Label())
+
+    await astr(Card())
+    assert len(app.render_cache) == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["websocket", "batch"])
+async def test_memoized_component_escaped_ids(mode):
+    app = Redmage(**{mode: True})
+
+    class ItemComponent(Component):
+        memoize = True
+        name: str
+
+        def __init__(self, name: str):
+            self.name = name
+
+        def render(self):
+            target = self.select()
+            return Li(self.name, click=target if mode == "websocket" else Batch(target))
+
+        @Target.post
+        def select(self): ...
+
+    app.starlette
+    items = [ItemComponent("a"), ItemComponent("a")]
+    html = await astr(Ul(*items))
+    # the ids are in the JSON of hx-vals
+    for item in items:
+        id = item.id.partition("-")[2]
+        assert f"/ItemComponent/{id}/name/a/select" in html
+    assert "memo" not in html
+
+
+def test_lru_cache_tag_stats():
+    cache = LRUCache(max_entries=1)
+    cache.get("a", tags=("x",))
+    cache.set("a", 1, 1, tags=("x",))
+    cache.get("a", tags=("x",))
+    cache.set("b", 2, 1, tags=("x", "y"))
+    cache.invalidate("y")
+    assert cache.tag_stats == {
+        "x": {"hits": 1, "misses": 1, "evictions": 1, "invalidations": 0},
+        "y": {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 1},
+    }
+
+
+def test_redmage_invalidate():
+    memo_cache = LRUCache()
+    target_cache = LRUCache()
+    app = Redmage()
+    todos = ["a"]
+    renders = []
+
+    class ListComponent(Component):
+        memoize = memo_cache
+        cache_tags = ("todos",)
+
+        def render(self, router):
+            renders.append("list")
+            return Ul(*[Li(todo, click=router()) for todo in todos])
+
+        @Target.get(cache=CachePolicy(cache=target_cache))
+        def refresh(self): ...
+
+        @Target.post
+        def add(self):
+            todos.append("b")
+            app.invalidate("todos")
+
+    class RouterComponent(Component, routes=("/",)):
+        def __init__(self):
+            Component.add_render_extension(router=self.router)
+
+        def render(self):
+            return Div(ListComponent())
+
+        @property
+        def id(self):
+            return "RouterComponent-main"
+
+        @Target.get
+        def router(self): ...
+
+    client = TestClient(app.starlette)
+    # the router extension is a different bound method every request
+    client.get("/")
+    assert 'hx-target="#RouterComponent-main"' in client.get("/").text
+    assert renders == ["list"]
+
+    # memoized HTML of the same state and router
+    client.get("/ListComponent/1/refresh")
+    client.get("/ListComponent/1/refresh")
+    assert renders == ["list"]
+
+    response = client.post("/ListComponent/1/add")
+    assert response.text.count("<li") == 2
+    assert client.get("/ListComponent/1/refresh").text.count("<li") == 2
+    assert "<li" in client.get("/").text
+    assert renders == ["list", "list"]
+
+    assert app.tag_stats("todos") == {
+        "hits": 5,
+        "misses": 4,
+        "evictions": 0,
+        "invalidations": 2,
+    }
+    assert app.invalidate("todos", "other") == 2
+    assert app.tag_stats("other")["invalidations"] == 0
+    assert Component._get_extension_key(len) is len
+
+
+def test_lru_cache_stale(clock):
+    cache = LRUCache(ttl=10)
+    cache.set("a", 1, 1, max_stale=5)
+    cache.set("b", 2, 1)
+    assert cache.get_stale("a") == (1, False)
+    clock[0] = 10
+    assert cache.get("a") is None
+    assert cache.get_stale("a") == (1, True)
+    assert cache.get_stale("b") == (None, False)
+    assert "b" not in cache.entries
+    clock[0] = 15
+    assert cache.get("a") is None
+    assert "a" not in cache.entries
+    assert cache.stale_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_redmage_stale_while_revalidate(clock):
+    app = Redmage()
+    renders = []
+    rendered = asyncio.Event()
+
+    class TestComponent(Component, routes=("/",)):
+        cache_policy = CachePolicy(ttl=10, max_stale=20)
+
+        async def render(self):
+            renders.append(len(renders))
+            rendered.set()
+            return Div(f"render {len(renders)}")
+
+        @Target.get
+        def target(self): ...
+
+        @property
+        def id(self):
+            return "TestComponent-1"
+
+    transport = httpx.ASGITransport(app=app.starlette)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for path in ("/", "/TestComponent/1/target"):
+            renders.clear()
+            assert "render 1" in (await client.get(path)).text
+
+            clock[0] += 10
+            rendered.clear()
+            # both served stale, rendered once in the background
+            responses = await asyncio.gather(client.get(path), client.get(path))
+            assert ["render 1" in r.text for r in responses] == [True, True]
+            await rendered.wait()
+            await asyncio.sleep(0)
+            assert renders == [0, 1]
+            assert "render 2" in (await client.get(path)).text
+
+            # too stale to serve
+            clock[0] += 30
+            assert "render 3" in (await client.get(path)).text
+
+    assert app.response_cache.stale_hits == 4
+
+
+@pytest.mark.asyncio
+async def test_redmage_stale_while_revalidate_error(clock, caplog):
+    app = Redmage()
+    fail = False
+
+    class TestComponent(Component):
+        cache_policy = CachePolicy(ttl=10, max_stale=20)
+
+        async def render(self):
+            if fail:
+                raise ValueError("fail")
+            return Div("ok")
+
+        @Target.get
+        def target(self): ...
+
+    transport = httpx.ASGITransport(app=app.starlette)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.get("/TestComponent/1/target")
+        clock[0] = 10
+        fail = True
+        assert "ok" in (await client.get("/TestComponent/1/target")).text
+        for _ in range(3):
+            await asyncio.sleep(0)
+
+    assert "Rendering /TestComponent/1/target again failed" in caplog.text
+    # the request rendered again has no body
+    assert (await _receive_empty())["body"] == b""
@@ -0,0 +1,106 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.responses import HTMLResponse, StreamingResponse
+
+from redmage import Component, Redmage, Target
+from redmage.coalescing import SingleFlight
+from redmage.elements import Div
+
+
+@pytest.mark.asyncio
+async def test_single_flight():
+    single_flight = SingleFlight()
+    release = asyncio.Event()
+    calls = []
+
+    async def route_function():
+        calls.append(1)
+        n = len(calls)
+        await release.wait()
+        return HTMLResponse(f"call {n}")
+
+    tasks = [
+        asyncio.create_task(single_flight.run("key", route_function)) for _ in range(4)
+    ]
+    other = asyncio.create_task(single_flight.run("other", route_function))
+    await asyncio.sleep(0)
+    release.set()
+    responses = await asyncio.gather(*tasks)
+    await other
+
+    assert len(calls) == 2
+    assert {r.body for r in responses} == {b"call 1"}
+    assert len({id(r) for r in responses}) == 4
+    assert single_flight.in_flight == {}
+    assert single_flight.stats() == {"requests": 5, "coalesced": 3, "ratio": 0.6}
+
+
+@pytest.mark.asyncio
+async def test_single_flight_not_shared():
+    single_flight = SingleFlight()
+    assert single_flight.stats()["ratio"] == 0.0
+    release = asyncio.Event()
+    calls = []
+
+    async def failing():
+        calls.append("failing")
+        await release.wait()
+        raise ValueError("fail")
+
+    async def streaming():
+        calls.append("streaming")
+        await release.wait()
+        return StreamingResponse(iter([b"a"]))
+
+    for route_function in (failing, streaming):
+        first = asyncio.create_task(single_flight.run("key", route_function))
+        await asyncio.sleep(0)
+        # waits on the first and then calls its own
+        second = asyncio.create_task(single_flight.run("key", streaming))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, second, return_exceptions=True)
+        release.clear()
+
+    assert calls == ["failing", "streaming", "streaming", "streaming"]
+    assert single_flight.coalesced == 0
+
+
+@pytest.mark.asyncio
+async def test_redmage_coalesce():
+    app = Redmage()
+    release = asyncio.Event()
+    renders = []
+
+    class TestComponent(Component):
+        async def render(self):
+            renders.append(1)
+            await release.wait()
+            return Div("Hello World")
+
+        @Target.get(coalesce=True)
+        def poll(self): ...
+
+        @Target.get
+        def not_coalesced(self): ...
+
+    transport = httpx.ASGITransport(app=app.starlette)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for path in ("poll", "not_coalesced"):
+            requests = [
+                asyncio.create_task(client.get(f"/TestComponent/1/{path}"))
+                for _ in range(5)
+            ]
+            while len(renders) < 1:
+                await asyncio.sleep(0)
+            release.set()
+            responses = await asyncio.gather(*requests)
+            release.clear()
+            assert {r.text for r in responses} == {
+                '\n<div id="TestComponent-1">Hello World</div>'
+            }
+
+    assert len(renders) == 6
+    assert app.single_flight.stats() == {"requests": 5, "coalesced": 4, "ratio": 0.8}
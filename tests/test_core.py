@@ -1,3 +1,5 @@
+import asyncio
+import functools
 from dataclasses import dataclass
 from typing import Any, Optional
 
@@ -7,17 +9,10 @@ from starlette.responses import HTMLResponse
 from starlette.testclient import TestClient
 
 from redmage import Component, Redmage, Target
-from redmage.elements import Div, Form, Input
+from redmage.elements import Body, Div, Doc, Form, Head, Html, Input, Title
 from redmage.exceptions import RedmageError
 from redmage.types import HTMXClass, HTMXHeaders, HTMXSwap
-
-
-@pytest.fixture(autouse=True)
-def redmage_app():
-    yield
-    # Reset app after each test
-    Component.app = None
-    Component.components = []
+from redmage.utils import astr, astream, buffer_stream
 
 
 def test_sanity():
@@ -737,3 +732,240 @@ def test_redamge_component_with_render_extenstion_var_keyword():
         response.text.strip()
         == '<div id="TestComponent-1" test="test">Hello World</div>'
     )
+
+
+def test_redmage_target_dispatch_plan():
+    app = Redmage()
+
+    @dataclass
+    class TestSerializer:
+        param1: int
+
+    class TestComponent(Component):
+        async def render(self):
+            return Div("Hello World")
+
+        @Target.post
+        def test_target(
+            self, form: TestSerializer, /, param1: int, param2: bool = False
+        ): ...
+
+    app.create_routes()
+    plan = app.dispatch_plans[(TestComponent, "test_target")]
+    assert plan.prefix == "test_target__"
+    assert set(plan.convertors) == {"param1", "param2"}
+    assert plan.body_serializer is TestSerializer
+    assert plan.is_async is False
+    assert plan.split_params(
+        {"id": "1", "test_target__param1": "2", "test_target__param2": "True"}
+    ) == ({"id": "1"}, {"param1": 2, "param2": True})
+
+
+def test_redmage_target_wrapped_by_sync_decorator():
+    app = Redmage()
+
+    def logged(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    class TestComponent(Component):
+        count: int
+
+        def __init__(self, count: int = 0):
+            self.count = count
+
+        async def render(self):
+            return Div(self.count)
+
+        @Target.post
+        @logged
+        async def add(self):
+            self.count += 1
+
+    client = TestClient(app.starlette)
+    assert app.dispatch_plans[(TestComponent, "add")].is_async is False
+    response = client.post(TestComponent(1).add().path)
+    assert response.status_code == 200
+    assert ">2</div>" in response.text
+
+
+def test_redmage_register_component_with_bool_path_param():
+    app = Redmage()
+
+    class TestComponent(Component):
+        async def render(self):
+            return Div(f"Hello World {self.flag}")
+
+        @Target.get
+        def test_target(self, flag: bool):
+            self.flag = flag
+
+    client = TestClient(app.starlette)
+    response = client.get("/TestComponent/1/test_target/True")
+    assert response.status_code == 200
+    assert response.text.strip() == '<div id="TestComponent-1">Hello World True</div>'
+
+
+def test_redmage_concurrent_render():
+    app = Redmage(concurrent_render=True, render_concurrency=2)
+    running = 0
+    max_running = 0
+
+    class ChildComponent(Component):
+        def __init__(self, n: int):
+            self.n = n
+
+        async def render(self):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.001 * (5 - self.n))
+            running -= 1
+            return Div(f"Child {self.n}")
+
+        @property
+        def id(self) -> str:
+            return f"ChildComponent-{self.n}"
+
+    class TestComponent(Component, routes=("/",)):
+        async def render(self):
+            return Div("Children", *[ChildComponent(n) for n in range(5)])
+
+        @property
+        def id(self) -> str:
+            return "TestComponent-1"
+
+    class NestedComponent(Component, routes=("/nested",)):
+        async def render(self):
+            return Div(
+                *[Div(*[ChildComponent(n) for n in range(3)]) for _ in range(3)]
+            )
+
+    client = TestClient(app.starlette)
+    response = client.get("/")
+    assert response.status_code == 200
+    assert response.text.strip() == (
+        '<div id="TestComponent-1">Children'
+        + "".join(f'\n<div id="ChildComponent-{n}">Child {n}</div>' for n in range(5))
+        + "</div>"
+    )
+    assert max_running == 2
+
+    # the limit is for the whole render, not each element
+    max_running = 0
+
+    class NestedComponent(Component, routes=("/nested",)):
+        async def render(self):
+            return Div(*[Div(*[ChildComponent(n) for n in range(3)]) for _ in range(3)])
+
+    app.create_routes()
+    assert client.get("/nested").text.count("Child 2") == 3
+    assert max_running == 2
+
+
+def test_redmage_streaming_route():
+    app = Redmage(streaming=True)
+
+    class ChildComponent(Component):
+        async def render(self):
+            await asyncio.sleep(0)
+            return Div("Child", Input(name="test"), indicator=True)
+
+        @property
+        def id(self) -> str:
+            return "ChildComponent-1"
+
+    class TestComponent(Component, routes=("/",)):
+        async def render(self):
+            return Doc(
+                Html(
+                    Head(Title("Test")),
+                    Body(ChildComponent(), "<after>"),
+                )
+            )
+
+        @property
+        def id(self) -> str:
+            return "TestComponent-1"
+
+    client = TestClient(app.starlette)
+    response = client.get("/")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/html")
+
+    expected = asyncio.run(astr(TestComponent()))
+    assert response.text == expected
+
+    async def chunks():
+        return [chunk async for chunk in buffer_stream(astream(TestComponent()))]
+
+    first, second = asyncio.run(chunks())
+    assert (
+        first
+        == '<!DOCTYPE html>\n<html id="TestComponent-1">\n<head>\n<title>Test</title></head>\n<body>'
+    )
+    assert "".join([first, second]) == expected
+
+
+def test_redmage_sync_render():
+    app = Redmage()
+
+    class ChildComponent(Component):
+        def render(self):
+            return Div("Child")
+
+        @property
+        def id(self) -> str:
+            return "ChildComponent-1"
+
+    class AsyncChildComponent(Component):
+        async def render(self):
+            await asyncio.sleep(0)
+            return Div("Async child")
+
+        @property
+        def id(self) -> str:
+            return "AsyncChildComponent-1"
+
+    class TestComponent(Component, routes=("/",)):
+        def render(self, **exts):
+            return Div(ChildComponent(), AsyncChildComponent())
+
+        @Target.get
+        def test_target(self): ...
+
+    expected = (
+        '\n<div id="TestComponent-1">'
+        '\n<div id="ChildComponent-1">Child</div>'
+        '\n<div id="AsyncChildComponent-1">Async child</div></div>'
+    )
+    client = TestClient(app.starlette)
+    response = client.get("/TestComponent/1/test_target")
+    assert response.status_code == 200
+    assert response.text == expected
+
+    response = client.get("/")
+    assert response.status_code == 200
+    assert response.text.startswith('\n<div id="TestComponent-')
+
+
+def test_redmage_sync_render_stream():
+    class TestComponent(Component):
+        def render(self):
+            return Div("Test", Input(name="test"))
+
+        @property
+        def id(self) -> str:
+            return "TestComponent-1"
+
+    async def chunks():
+        return [chunk async for chunk in astream(TestComponent())]
+
+    # nothing is awaited so it's never flushed early
+    assert asyncio.run(chunks()) == [
+        '\n<div id="TestComponent-1">Test\n<input name="test"/></div>'
+    ]
+    assert TestComponent.get_render_params() == ()
@@ -0,0 +1,341 @@
+import re
+
+import pytest
+from starlette.testclient import TestClient
+
+from redmage import Component, Redmage, Target
+from redmage.cache import LRUCache
+from redmage.diffing import (
+    SHARED,
+    count_nodes,
+    diff_html,
+    forget_render,
+    in_shared_render,
+    index_html,
+    record_render,
+    record_shared,
+    render_diff,
+)
+from redmage.elements import Div, Table, Tbody, Td, Tr
+from redmage.targets import BATCH_PATH, TARGET_PARAM, WS_PATH
+from redmage.utils import astr, astream
+
+
+def test_index_html():
+    html = (
+        '\n<div id="a" class="x">'
+        '<p id="b">1<br/><img id="i" src="x"><p>2</p><p/></p>'
+        '<ul><li data-id="x">a > b id="x"</li><li id="c">2</li></ul></div>'
+    )
+    tree = index_html(html)
+    assert tree.id == "a"
+    assert [child.id for child in tree.children] == ["b", "c"]
+    assert [child.id for child in tree.children[0].children] == ["i"]
+    b = tree.children[0]
+    assert html[b.start : b.end] == '<p id="b">1<br/><img id="i" src="x"><p>2</p><p/></p>'
+    assert count_nodes(tree) == 4
+
+    # not a single element with an id
+    assert index_html('<div id="a"></div><div id="b"></div>') is None
+    assert index_html('text<div id="a"></div>') is None
+    assert index_html("<div></div>") is None
+    assert index_html("text") is None
+    # the tags don't match
+    assert index_html('<div id="a"><p id="b"></div></p>') is None
+    assert index_html('<div id="a"></p>') is None
+    assert index_html('<div id="a">') is None
+    # the content of comments and scripts isn't markup
+    assert index_html('<div id="a"><!-- <p id="b"> --></div>') is None
+    assert index_html('<div id="a"><script>"<p>"</script></div>') is None
+
+
+def test_diff_html():
+    def diff(old, new):
+        return diff_html(index_html(old), index_html(new), new)
+
+    old = '<div id="a"><p id="b">1</p><p id="c"><i id="d">2</i></p></div>'
+    assert diff(old, old) == []
+    assert diff(
+        old, '<div id="a"><p id="b">3</p><p id="c"><i id="d">4</i></p></div>'
+    ) == ['<p id="b">3</p>', '<i id="d">4</i>']
+    # the shell of c changed, it's swapped with its children
+    assert diff(
+        old, '<div id="a"><p id="b">1</p><p id="c">!<i id="d">4</i></p></div>'
+    ) == ['<p id="c">!<i id="d">4</i></p>']
+    # the root changed
+    assert diff(old, '<div id="a"><p id="b">1</p></div>') is None
+    assert diff(old, '<div id="z"><p id="b">1</p><p id="c"></p></div>') is None
+
+
+def test_render_diff():
+    cache = LRUCache()
+    old = '<div id="a"><p id="b">1</p>' + "x" * 20 + "</div>"
+    assert render_diff(cache, "a", old) is None
+    assert cache.nbytes > 0
+    new = old.replace(">1<", ">2<")
+    assert render_diff(cache, "a", new) == ['<p id="b">2</p>']
+    # as big as the whole component
+    new = '<div id="a"><p id="b">' + "y" * 40 + "</p></div>"
+    assert render_diff(cache, "a", new) is None
+    # can't be diffed, the last render is forgotten
+    assert record_render(cache, "a", "<p>") is None
+    assert "a" not in cache
+
+    # rendered in a shared response, it's never diffed
+    record_shared(cache, "a")
+    assert render_diff(cache, "a", old) is None
+    assert record_render(cache, "a", old) is None
+    forget_render(cache, "a")
+    assert cache.get("a") is SHARED
+    record_render(cache, "b", old)
+    forget_render(cache, "b")
+    assert "b" not in cache
+
+
+def create_app(**kwargs):
+    app = Redmage(**kwargs)
+
+    class Rows(Component):
+        diff = True
+        # only the id is in the paths of the targets, the rows don't change
+        # with the state
+        state_store = True
+        selected: int
+
+        def __init__(self, selected: int = 0):
+            self.selected = selected
+
+        def render(self):
+            return Table(
+                Tbody(
+                    *[
+                        Tr(
+                            Td(n, click=self.select(n)),
+                            Td("selected" if n == self.selected else ""),
+                            _id=f"{self.id}-row-{n}",
+                        )
+                        for n in range(20)
+                    ],
+                ),
+            )
+
+        @Target.post
+        def select(self, n: int):
+            self.selected = n
+
+        @Target.post
+        def replace(self, n: int):
+            return Div(n, _id=self.id)
+
+    class Page(Component, routes=("/",)):
+        def render(self):
+            return Div(Rows(1))
+
+    return app, Rows, Page
+
+
+def get_rows_id(html):
+    start = html.index('id="Rows-') + 4
+    return html[start : html.index('"', start)]
+
+
+def get_swapped(html):
+    return re.findall(r'<(\w+) hx-swap-oob="true" id="([^"]+)"', html)
+
+
+def test_diff_targets():
+    app, Rows, Page = create_app()
+    client = TestClient(app.starlette)
+    page = client.get("/").text
+    id = get_rows_id(page)
+    assert id in app.diff_cache
+
+    rows = Rows(1)
+    rows._id = id
+    response = client.post(rows.select(2).path)
+    assert response.headers["HX-Reswap"] == "none"
+    assert get_swapped(response.text) == [("tr", f"{id}-row-1"), ("tr", f"{id}-row-2")]
+    assert response.text.endswith("<td>selected</td></tr>")
+    assert len(response.content) < len(page) / 5
+
+    # nothing changed
+    response = client.post(rows.select(2).path)
+    assert response.text == ""
+    assert response.headers["HX-Reswap"] == "none"
+
+    # something else is swapped in its place, the next response is whole
+    response = client.post(rows.replace(3).path)
+    assert response.text == f'\n<div id="{id}">3</div>'
+    assert id not in app.diff_cache
+    response = client.post(rows.select(4).path)
+    assert "HX-Reswap" not in response.headers
+    assert response.text.startswith(f'\n<table id="{id}"')
+
+
+@pytest.mark.asyncio
+async def test_diff_streamed():
+    app, Rows, Page = create_app()
+
+    class Selected(Component):
+        def __init__(self, selected: int):
+            self.selected = selected
+
+        async def render(self):
+            return Div(self.selected)
+
+    class AsyncRows(Rows):
+        def render(self):
+            return Div(Selected(self.selected))
+
+    rows = AsyncRows(1)
+    app.diff_cache.set(rows.id, index_html(await astr(rows)), 1)
+    async for _ in astream(Div(rows)):
+        pass
+    # sent before it was written, the next response is the whole component
+    assert rows.id not in app.diff_cache
+    await astr(Div(rows))
+    assert rows.id in app.diff_cache
+
+
+@pytest.mark.asyncio
+async def test_diff_needs_unique_ids():
+    app, Rows, Page = create_app(id_strategy="deterministic")
+
+    class Plain(Rows):
+        state_store = False
+
+    class Custom(Rows):
+        state_store = False
+
+        @property
+        def id(self):
+            return "custom"
+
+    # stored components always have a uuid
+    assert Rows.get_diff_cache() is app.diff_cache
+    assert Plain.get_diff_cache() is None
+    assert Custom.get_diff_cache() is None
+    await astr(Div(Plain(1)))
+    assert len(app.diff_cache) == 0
+
+    Component.app = None
+    assert Rows.get_diff_cache() is None
+    # unique in one process only
+    Redmage(id_strategy="counter")
+    assert Plain.get_diff_cache() is None
+
+
+def test_diff_target_needs_unique_ids():
+    app = Redmage(id_strategy="deterministic")
+
+    class Counter(Component):
+        diff = True
+        count: int
+
+        def __init__(self, count: int):
+            self.count = count
+
+        def render(self):
+            return Div(Div(self.count, _id=f"{self.id}-count"))
+
+        @Target.post
+        def add(self):
+            self.count += 1
+
+    client = TestClient(app.starlette)
+    counter = Counter(1)
+    for _ in range(2):
+        response = client.post(counter.add().path)
+        assert "HX-Reswap" not in response.headers
+
+
+def test_diff_cache_option():
+    cache = LRUCache(max_entries=1)
+    app, Rows, Page = create_app(id_strategy="counter", diff_cache=cache)
+    assert Rows.get_diff_cache() is cache
+
+    class Own(Rows):
+        diff = LRUCache()
+
+    assert Own.get_diff_cache() is Own.diff
+
+
+def test_diff_skips_shared_responses():
+    app = Redmage()
+
+    class Cached(Component):
+        diff = True
+
+        def render(self):
+            return Div(Div("a", _id=f"{self.id}-a"), Div("b", _id=f"{self.id}-b"))
+
+        @Target.get(cache=60)
+        def refresh(self):
+            pass
+
+        @Target.post
+        def update(self):
+            pass
+
+    client = TestClient(app.starlette)
+    component = Cached()
+    client.get(component.refresh().path)
+    response = client.get(component.refresh().path)
+    assert "HX-Reswap" not in response.headers
+    # the clients served the cached response have it, not the last render
+    for _ in range(2):
+        response = client.post(component.update().path)
+        assert "HX-Reswap" not in response.headers
+
+
+def test_diff_skips_shared_pages():
+    app, Rows, Page = create_app()
+    Page.cache_policy = 60
+    Page.diff = True
+    client = TestClient(app.starlette)
+    page = client.get("/").text
+    # every client gets the same rows, they're swapped whole
+    assert client.get("/").text == page
+    id = get_rows_id(page)
+    assert app.diff_cache.get(id) is SHARED
+    [page_id] = re.findall(r'id="(Page-[^"]+)"', page)
+    assert app.diff_cache.get(page_id) is SHARED
+    rows = Rows(1)
+    rows._id = id
+    for n in (2, 3):
+        response = client.post(rows.select(n).path)
+        assert "HX-Reswap" not in response.headers
+        assert response.text.startswith(f'\n<table id="{id}"')
+
+
+@pytest.mark.asyncio
+async def test_diff_skips_published():
+    app, Rows, Page = create_app()
+    rows = Rows(1)
+    await app.publish("rows", rows)
+    assert not in_shared_render()
+    assert app.diff_cache.get(rows.id) is SHARED
+    await astr(Div(rows))
+    assert app.diff_cache.get(rows.id) is SHARED
+
+
+def test_diff_batch_and_websocket():
+    app, Rows, Page = create_app(batch=True, websocket=True)
+    client = TestClient(app.starlette)
+    id = get_rows_id(client.get("/").text)
+    rows = Rows(1)
+    rows._id = id
+
+    targets = f'["POST {rows.select(2).path}"]'
+    response = client.post(BATCH_PATH, data={"targets": targets})
+    assert get_swapped(response.text) == [("tr", f"{id}-row-1"), ("tr", f"{id}-row-2")]
+
+    with client.websocket_connect(WS_PATH) as websocket:
+        websocket.send_json({TARGET_PARAM: f"POST {rows.replace(1).path}"})
+        assert websocket.receive_text() == (
+            f'\n<div hx-swap-oob="outerHTML:#{id}" id="{id}">1</div>'
+        )
+        websocket.send_json({TARGET_PARAM: f"POST {rows.select(3).path}"})
+        assert websocket.receive_text().startswith(
+            f'\n<table hx-swap-oob="true" id="{id}"'
+        )
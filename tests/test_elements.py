@@ -1,8 +1,26 @@
 import pytest
 
-from redmage import Component, Redmage, Target
-from redmage.elements import Div, Doc
-from redmage.utils import astr
+from redmage import Batch, Component, Redmage, Target
+from redmage.elements import (
+    DEFAULT_OPTIONS,
+    A,
+    Body,
+    Br,
+    Button,
+    Div,
+    Doc,
+    Head,
+    Html,
+    Img,
+    Input,
+    Link,
+    Static,
+    Title,
+    _render_static,
+)
+from redmage.exceptions import RedmageError
+from redmage.types import HTMXSwap, HTMXTrigger
+from redmage.utils import astr, astream
 
 app = Redmage()
 
@@ -94,3 +112,147 @@ async def test_doc_attrs():
     doc = Doc(Div("test"))
     doc.attrs(test="test")
     assert (await astr(doc)).strip() == '<!DOCTYPE html>\n<div test="test">test</div>'
+
+
+@pytest.mark.asyncio
+async def test_element_concurrent():
+    div = Div("a", Div("b"), "c", Div("d"), concurrent=True)
+    assert (await astr(div)).strip() == "<div>a\n<div>b</div>c\n<div>d</div></div>"
+
+
+@pytest.mark.asyncio
+async def test_element_concurrent_only_async(monkeypatch):
+    gathered = []
+
+    async def gather_limited(fns, limit):
+        gathered.append(len(fns))
+        return [await fn() for fn in fns]
+
+    monkeypatch.setattr("redmage.elements.gather_limited", gather_limited)
+
+    class SyncComponent(Component):
+        def render(self):
+            return Div("sync")
+
+    class AsyncComponent(Component):
+        async def render(self):
+            return Div("async")
+
+    # nothing waits, it's all written in place
+    inner = Div(Div("d"), Div("e"), concurrent=True)
+    await astr(Div(Div("b"), SyncComponent(), inner, concurrent=True))
+    assert gathered == []
+    html = await astr(
+        Div(Div(AsyncComponent()), SyncComponent(), AsyncComponent(), concurrent=True)
+    )
+    assert gathered == [2]
+    assert html.count(">async<") == 2 and html.count(">sync<") == 1
+
+
+@pytest.mark.asyncio
+async def test_element_stream():
+    el = Doc(Div("a", Div("b", _class="c"), "", Input(name="d"), boost=True))
+    chunks = [chunk async for chunk in astream(el)]
+    assert "".join(chunks) == await astr(el)
+    # nothing to wait on so it's written in one go
+    assert chunks == [await astr(el)]
+
+
+@pytest.mark.asyncio
+async def test_element_stream_component():
+    el = Div("a", TestComponent(), Br())
+    chunks = [chunk async for chunk in astream(el)]
+    assert "".join(chunks) == await astr(el)
+    assert "" in chunks
+    assert chunks[0] == "\n<div>a"
+
+
+@pytest.mark.asyncio
+async def test_element_matches_hype():
+    component = TestComponent()
+    elements = [
+        Div("a < b", Br(), component),
+        Div("c", trigger=HTMXTrigger.LOAD),
+        Div("b", _class="c", id="x", data_value=1, hidden=True, title=""),
+        Input(name="d", disabled=True),
+        Img("ignored", src="e.png"),
+        A("f", href="/", target=component.target_method(), swap_oob=True),
+        Button(
+            "g",
+            target=component.target_method(),
+            swap=HTMXSwap.OUTER_HTML,
+            trigger=(HTMXTrigger.CLICK, HTMXTrigger.LOAD),
+            push_url="/g",
+            confirm="sure?",
+            indicator=True,
+            boost=True,
+            on="click: alert()",
+            _class="h",
+        ),
+        Button("i", click=Batch(component.target_method(), component.target_method())),
+    ]
+    for el in elements:
+        # the hype element built by render is the reference
+        assert await astr(el) == await el.render().render()
+
+
+@pytest.mark.asyncio
+async def test_element_options():
+    div = Div("a")
+    # elements without any options share the defaults
+    assert div._options is DEFAULT_OPTIONS
+    assert not hasattr(div, "__dict__")
+
+    div.boost = True
+    div.safe = True
+    div.append("<b>")
+    assert div._options is not DEFAULT_OPTIONS
+    assert DEFAULT_OPTIONS.boost is False
+    assert (await astr(div)) == '\n<div hx-boost="true">a<b></div>'
+
+    div = Div("<b>", safe=True, click=TestComponent().target_method())
+    assert div.safe
+    assert str(div.trigger) == "click"
+    assert div.target is not None
+
+
+@pytest.mark.asyncio
+async def test_static():
+    head = Head(Title("a < b"), Link(rel="stylesheet", href="/style.css"))
+    expected = await astr(head)
+
+    static = head.freeze()
+    assert static == expected
+    assert (
+        Static(head, "<br>", Static("<hr>", safe=True)) == expected + "&lt;br&gt;<hr>"
+    )
+
+    # embedded as is, not escaped again
+    html = Html(static, Body("c"))
+    html.append(Static(Div("d")))
+    assert await astr(html) == (
+        f"\n<html>{expected}\n<body>c</body>\n<div>d</div></html>"
+    )
+
+
+def test_static_check():
+    component = TestComponent()
+    with pytest.raises(RedmageError):
+        Div(Div(component)).freeze()
+
+    with pytest.raises(RedmageError):
+        Static(Div(Button(click=component.target_method())))
+
+
+def test_static_component():
+    class SyncComponent(Component):
+        def render(self):
+            return Div("sync")
+
+    # without the debug check a component is rendered if it doesn't wait
+    out = []
+    _render_static(Div(SyncComponent(), concurrent=True), out)
+    assert "".join(out).startswith('\n<div>\n<div id="SyncComponent-')
+
+    with pytest.raises(RedmageError):
+        _render_static(Div(TestComponent(), TestComponent(), concurrent=True), [])
@@ -0,0 +1,147 @@
+from starlette.requests import Request
+from starlette.testclient import TestClient
+
+from redmage import Component, Redmage, Target
+from redmage.elements import Div
+from redmage.etags import content_etag, etag_matches
+
+
+def test_etag_matches():
+    def request(if_none_match):
+        headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+        return Request({"type": "http", "headers": headers})
+
+    etag = content_etag(b"body")
+    assert etag.startswith('W/"') and etag.endswith('"')
+    assert etag_matches(request(etag), etag)
+    assert etag_matches(request(f'"other", {etag[2:]}'), etag)
+    assert etag_matches(request("*"), etag)
+    assert not etag_matches(request('"other"'), etag)
+    assert not etag_matches(request(None), etag)
+
+
+def test_target_content_etag():
+    app = Redmage()
+    renders = []
+
+    class TestComponent(Component):
+        async def render(self):
+            renders.append(1)
+            return Div("Hello World")
+
+        @Target.get(etag=True)
+        def get(self): ...
+
+        @Target.get
+        def no_etag(self): ...
+
+        @Target.post
+        def post(self): ...
+
+    client = TestClient(app.starlette)
+    response = client.get("/TestComponent/1/get")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert etag == content_etag(response.content)
+
+    response = client.get("/TestComponent/1/get", headers={"if-none-match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    # the body is hashed so it's still rendered
+    assert len(renders) == 2
+
+    assert "etag" not in client.get("/TestComponent/1/no_etag").headers
+    assert "etag" not in client.post("/TestComponent/1/post").headers
+
+
+def test_content_etag_component_ids():
+    uuids = (
+        "ae9bfd5e-3f6c-11ef-9454-0242ac120002",
+        "0f8b0e0c-9d6e-4f7a-8d33-6d3c1b1c2f10",
+    )
+    a, b = [f'<div id="A-{id}" hx-get="/A/{id}/get">x</div>'.encode() for id in uuids]
+    # the same up to the ids
+    assert content_etag(a) == content_etag(b)
+    # a uuid in the content isn't an id
+    a, b = [f"<p>{id}</p>".encode() for id in uuids]
+    assert content_etag(a) != content_etag(b)
+
+    app = Redmage()
+    text = ["Hello"]
+
+    class Child(Component):
+        def render(self):
+            return Div(text[0])
+
+    class TestComponent(Component, routes=("/",)):
+        etag = True
+
+        def render(self):
+            return Div(Child())
+
+    client = TestClient(app.starlette)
+    response = client.get("/")
+    etag = response.headers["etag"]
+    response = client.get("/", headers={"if-none-match": etag})
+    assert response.status_code == 304
+    text[0] = "World"
+    response = client.get("/", headers={"if-none-match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_version_etag():
+    app = Redmage()
+    renders = []
+    version = [1]
+
+    class TestComponent(Component, routes=("/",)):
+        etag = True
+
+        @classmethod
+        async def get_version(cls, request):
+            return version[0]
+
+        def render(self):
+            renders.append(1)
+            return Div("Hello World")
+
+        @Target.get
+        def get(self): ...
+
+        @Target.get(etag=False)
+        def no_etag(self): ...
+
+    client = TestClient(app.starlette)
+    for path in ("/", "/TestComponent/1/get"):
+        etag = client.get(path).headers["etag"]
+        assert etag.startswith('W/"')
+        response = client.get(path, headers={"if-none-match": etag})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+    assert len(renders) == 2
+
+    # a new version, and other URLs, have another ETag
+    version[0] = 2
+    response = client.get("/TestComponent/1/get", headers={"if-none-match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert client.get("/TestComponent/2/get").headers["etag"] != etag
+    assert "etag" not in client.get("/TestComponent/1/no_etag").headers
+
+
+def test_etag_streaming_response():
+    app = Redmage(streaming=True)
+
+    class TestComponent(Component, routes=("/",)):
+        etag = True
+
+        def render(self):
+            return Div("Hello World")
+
+    client = TestClient(app.starlette)
+    response = client.get("/")
+    assert "Hello World</div>" in response.text
+    # a streamed body isn't known before it's sent
+    assert "etag" not in response.headers
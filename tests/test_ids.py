@@ -0,0 +1,86 @@
+import re
+import uuid
+
+import pytest
+from starlette.testclient import TestClient
+
+from redmage import Component, Redmage, Target
+from redmage.elements import Div
+from redmage.exceptions import RedmageError
+from redmage.utils import astr
+
+
+def create_app(**kwargs):
+    app = Redmage(**kwargs)
+
+    class ChildComponent(Component):
+        n: int
+
+        def __init__(self, n: int):
+            self.n = n
+
+        def render(self):
+            return Div(self.n, click=self.set_n(self.n + 1))
+
+        @Target.get
+        def set_n(self, n: int):
+            self.n = n
+
+    class PageComponent(Component, routes=("/",)):
+        def render(self):
+            return Div(ChildComponent(1), ChildComponent(1), ChildComponent(2))
+
+    return app, ChildComponent
+
+
+def get_ids(html):
+    return re.findall(r'id="([^"]+)"', html)
+
+
+def test_uuid_id_strategy():
+    app, ChildComponent = create_app()
+    # random, the ids of other components can't be guessed from one
+    assert uuid.UUID(ChildComponent(1).id.partition("-")[2]).version == 4
+
+
+def test_counter_id_strategy():
+    app, ChildComponent = create_app(id_strategy="counter")
+    first = int(ChildComponent(1).id.partition("-")[2])
+    assert ChildComponent(1).id == f"ChildComponent-{first + 1}"
+
+
+def test_custom_id_strategy():
+    app, ChildComponent = create_app(id_strategy=lambda component: f"n{component.n}")
+    assert ChildComponent(3).id == "ChildComponent-n3"
+
+
+def test_unknown_id_strategy():
+    with pytest.raises(RedmageError):
+        Redmage(id_strategy="unknown")
+
+
+def test_deterministic_id_strategy():
+    app, ChildComponent = create_app(id_strategy="deterministic")
+    client = TestClient(app.starlette)
+
+    html = client.get("/").text
+    ids = get_ids(html)
+    assert len(set(ids)) == 4
+    # the same page always gets the same ids and target paths
+    assert client.get("/").text == html
+
+    # the target route rebuilds the id so hx-target still matches
+    child_id = ids[1]
+    path = f"/ChildComponent/{child_id.partition('-')[2]}/n/1/set_n/2"
+    assert f'hx-get="{path}"' in html
+    assert f'hx-target="#{child_id}"' in html
+    response = client.get(path)
+    assert get_ids(response.text) == [child_id]
+    assert client.get(path).text == response.text
+
+
+@pytest.mark.asyncio
+async def test_deterministic_id_outside_request():
+    app, ChildComponent = create_app(id_strategy="deterministic")
+    assert ChildComponent(1).id != ChildComponent(1).id
+    assert "ChildComponent-" in await astr(ChildComponent(1))
@@ -0,0 +1,61 @@
+import inspect
+
+import pytest
+
+from redmage import Component, Redmage, Target
+from redmage.paths import compile_base_path_builder, compile_target_path_builder
+
+
+def test_compile_base_path_builder():
+    class Instance:
+        id = "TestComponent-a-b"
+        count = 1
+        name = ""
+
+    build = compile_base_path_builder(
+        "TestComponent", [("count", "int"), ("name", "str")]
+    )
+    assert build(Instance()) == "/TestComponent/a-b/count/1/name/__empty__"
+
+
+def test_compile_target_path_builder():
+    def method(self, a: int, b: str = "b", *, c: bool = False): ...
+
+    build = compile_target_path_builder("method", inspect.signature(method))
+    assert build((1,), {}) == "/method/1"
+    assert build((1, "x"), {}) == "/method/1?method__b=x"
+    assert build((1,), {"b": "x", "c": True}) == "/method/1?method__b=x&method__c=True"
+
+
+def test_compile_target_path_builder_missing_convertor():
+    class Unknown: ...
+
+    def method(self, a: int, b: Unknown = None): ...
+
+    build = compile_target_path_builder("method", inspect.signature(method))
+    assert build((1,), {}) == "/method/1"
+    with pytest.raises(KeyError):
+        build((1, Unknown()), {})
+
+
+def test_target_path_is_memoized():
+    app = Redmage()
+
+    class TestComponent(Component):
+        count: int
+
+        def __init__(self, count: int):
+            self.count = count
+
+        async def render(self): ...
+
+        @Target.get
+        def test_target(self, count: int, step: int = 1): ...
+
+    app.create_routes()
+    component = TestComponent(1)
+    component._id = "TestComponent-1"
+    target = component.test_target(2, step=3)
+    assert target.path == "/TestComponent/1/count/1/test_target/2?test_target__step=3"
+    component.count = 5
+    assert target.path == "/TestComponent/1/count/1/test_target/2?test_target__step=3"
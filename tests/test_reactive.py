@@ -0,0 +1,287 @@
+import re
+
+import pytest
+from starlette.testclient import TestClient
+
+from redmage import Component, Redmage, Target
+from redmage.elements import Div, Li, Ul
+from redmage.reactive import DependencyGraph
+from redmage.targets import BATCH_PATH, TARGET_PARAM, WS_PATH
+from redmage.utils import astr, astream
+
+
+def get_ids(html, name):
+    return re.findall(rf'id="({name}-[^"]+)"', html)
+
+
+def create_app(**kwargs):
+    app = Redmage(**kwargs)
+    todos = []
+
+    class Count(Component):
+        reads = ("todos",)
+
+        def render(self):
+            return Div(f"{len(todos)} todos")
+
+    class Item(Component):
+        n: int
+
+        def __init__(self, n: int):
+            self.n = n
+
+        def render(self):
+            return Li(todos[self.n])
+
+        @Target.put(writes=("todos",))
+        def rename(self, name: str):
+            todos[self.n] = name
+
+        @Target.patch(writes=())
+        def refresh(self):
+            pass
+
+    class Todos(Component):
+        reads = ("todos",)
+
+        def render(self):
+            return Ul(*[Item(n) for n in range(len(todos))])
+
+        @Target.post(writes=("todos",))
+        def add(self, name: str):
+            todos.append(name)
+
+        @Target.delete(writes=("todos",))
+        def clear(self):
+            todos.clear()
+            return Div(_id=self.id)
+
+    class Page(Component, routes=("/",)):
+        def render(self):
+            return Div(Count(), Todos())
+
+    return app, todos, Count, Item, Todos
+
+
+def test_dependents():
+    app, todos, Count, Item, Todos = create_app()
+    client = TestClient(app.starlette)
+    page = client.get("/").text
+    [count_id] = get_ids(page, "Count")
+    [todos_id] = get_ids(page, "Todos")
+    other_page = client.get("/").text
+
+    todos_ = Todos()
+    todos_._id = todos_id
+    response = client.post(todos_.add("a").path)
+    # the list the target returns, then the count on its page out of band
+    assert response.text == (
+        f'\n<ul id="{todos_id}">\n<li id="{get_ids(response.text, "Item")[0]}">a</li></ul>'
+        f'\n\n<div hx-swap-oob="true" id="{count_id}">1 todos</div>'
+    )
+    assert get_ids(other_page, "Count")[0] not in response.text
+
+    # the items rendered by the target are on the same page
+    item = Item(0)
+    item._id = get_ids(response.text, "Item")[0]
+    response = client.put(item.rename("b").path)
+    assert get_ids(response.text, "Todos") == [todos_id]
+    assert get_ids(response.text, "Count") == [count_id]
+    assert todos == ["b"]
+
+    # targets that don't write render only what they return
+    response = client.patch(item.refresh().path)
+    assert response.text == f'\n<li id="{item.id}">b</li>'
+
+    response = client.delete(todos_.clear().path)
+    assert response.text == (
+        f'\n<div id="{todos_id}"></div>'
+        f'\n\n<div hx-swap-oob="true" id="{count_id}">0 todos</div>'
+    )
+
+
+def test_dependents_of_untracked_pages():
+    app, todos, Count, Item, Todos = create_app()
+    client = TestClient(app.starlette)
+    # a target request for a component that wasn't rendered on a page
+    response = client.post(Todos().add("a").path)
+    assert "Count" not in response.text
+    assert todos == ["a"]
+
+
+def test_dependents_need_unique_ids():
+    app, todos, Count, Item, Todos = create_app(id_strategy="deterministic")
+    client = TestClient(app.starlette)
+    page = client.get("/").text
+    todos_ = Todos()
+    todos_._id = get_ids(page, "Todos")[0]
+    # the same ids are on every page, the count on this one isn't known
+    assert "Count" not in client.post(todos_.add("a").path).text
+
+
+def test_dependents_not_enabled():
+    app = Redmage()
+
+    class Count(Component):
+        reads = ("todos",)
+
+        def render(self):
+            return Div()
+
+        @Target.post
+        def add(self):
+            pass
+
+    client = TestClient(app.starlette)
+    client.get("/")
+    assert not app.dependency_graph.enabled
+    assert len(app.dependency_graph.component_pages) == 0
+
+
+@pytest.mark.asyncio
+async def test_dependency_graph():
+    app, todos, Count, Item, Todos = create_app()
+    app.create_routes()
+    graph = app.dependency_graph
+    # rendered outside of a page
+    await astr(Div(Count()))
+    assert len(graph.component_pages) == 0
+    graph.write(["todos"])
+    assert graph.get_dependents() == []
+
+    graph.enter_page()
+    count = Count()
+    todos_ = Todos()
+    await astr(Div(count))
+    async for _ in astream(todos_):
+        pass
+    assert len(graph.component_pages) == 2
+    # nothing written
+    assert graph.get_dependents() == []
+    graph.write(["other"])
+    assert graph.get_dependents() == []
+    graph.write(["todos"])
+    assert [c.id for c in graph.get_dependents()] == [count.id, todos_.id]
+    # only once
+    assert graph.get_dependents() == []
+
+
+def test_dependency_graph_option():
+    graph = DependencyGraph(max_pages=1)
+    app, *_ = create_app(dependency_graph=graph)
+    assert app.dependency_graph is graph
+    client = TestClient(app.starlette)
+    client.get("/")
+    client.get("/")
+    assert len(graph.pages) == 1
+
+
+def test_dependents_memoized_and_diffed():
+    app, todos, Count, Item, Todos = create_app()
+    Count.memoize = True
+    Count.diff = True
+    client = TestClient(app.starlette)
+    page = client.get("/").text
+    [count_id] = get_ids(page, "Count")
+    todos_ = Todos()
+    todos_._id = get_ids(page, "Todos")[0]
+
+    # the memoized count is invalidated by the write
+    response = client.post(todos_.add("a").path)
+    assert f'<div hx-swap-oob="true" id="{count_id}">1 todos</div>' in response.text
+
+    # the items have targets, so the list isn't memoized and they're on the page
+    Todos.memoize = True
+    page = client.get("/").text
+    [item_id] = get_ids(page, "Item")
+    assert item_id in app.dependency_graph.component_pages
+    assert get_ids(page, "Todos")[0] in app.dependency_graph.component_pages
+
+
+def test_dependents_skip_shared_responses():
+    app = Redmage()
+    todos = []
+
+    class Count(Component):
+        reads = ("todos",)
+
+        def render(self):
+            return Div(len(todos))
+
+    class Todos(Component):
+        def render(self):
+            return Div(Count(), self.add())
+
+        @Target.get(cache=60, writes=("todos",))
+        def add(self):
+            todos.append(1)
+
+    class Page(Component, routes=("/",)):
+        def render(self):
+            return Div(Todos())
+
+    client = TestClient(app.starlette)
+    page = client.get("/").text
+    todos_ = Todos()
+    todos_._id = get_ids(page, "Todos")[0]
+    response = client.get(todos_.add().path)
+    assert response.text.count("Count-") == 1
+    assert "hx-swap-oob" not in response.text
+
+
+def test_dependents_unannotated_attributes():
+    app = Redmage()
+    todos = []
+
+    class Count(Component):
+        reads = ("todos",)
+        render_attrs = ("label",)
+
+        def __init__(self, label: str):
+            # not annotated, it's not in the state
+            self.label = label
+            self.loaded = "not kept"
+
+        def render(self):
+            return Div(f"{len(todos)} {self.label}")
+
+    class Todos(Component):
+        def render(self):
+            return Div(Count("todos"))
+
+        @Target.post(writes=("todos",))
+        def add(self):
+            todos.append(1)
+
+    class Page(Component, routes=("/",)):
+        def render(self):
+            return Div(Todos())
+
+    client = TestClient(app.starlette)
+    page = client.get("/").text
+    todos_ = Todos()
+    todos_._id = get_ids(page, "Todos")[0]
+    [count_id] = get_ids(page, "Count")
+    response = client.post(todos_.add().path)
+    assert f'<div hx-swap-oob="true" id="{count_id}">1 todos</div>' in response.text
+    [readers] = app.dependency_graph.pages.entries.values()
+    assert readers.value[count_id] == (Count, {"label": "todos"})
+
+
+def test_dependents_batch_and_websocket():
+    app, todos, Count, Item, Todos = create_app(batch=True, websocket=True)
+    client = TestClient(app.starlette)
+    page = client.get("/").text
+    [count_id] = get_ids(page, "Count")
+    todos_ = Todos()
+    todos_._id = get_ids(page, "Todos")[0]
+
+    targets = f'["POST {todos_.add("a").path}"]'
+    response = client.post(BATCH_PATH, data={"targets": targets})
+    assert f'<div hx-swap-oob="true" id="{count_id}">1 todos</div>' in response.text
+
+    with client.websocket_connect(WS_PATH) as websocket:
+        websocket.send_json({TARGET_PARAM: f"POST {todos_.add('b').path}"})
+        assert websocket.receive_text().endswith(
+            f'<div hx-swap-oob="true" id="{count_id}">2 todos</div>'
+        )
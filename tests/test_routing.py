@@ -0,0 +1,146 @@
+import pytest
+from starlette.routing import Match, NoMatchFound, Route
+from starlette.testclient import TestClient
+
+from redmage import Component, Redmage, Target
+from redmage.elements import Div
+from redmage.routing import TargetRouter
+
+
+async def endpoint(request): ...
+
+
+def test_compiled_router_registers_single_route():
+    app = Redmage(compiled_router=True)
+
+    class TestComponent(Component, routes=("/",)):
+        count: int = 0
+
+        async def render(self):
+            return Div(f"Hello World {self.count}")
+
+        @Target.get
+        def first(self, count: int):
+            self.count = count
+
+        @Target.post
+        def second(self, count: int = 0):
+            self.count = count
+
+    app.create_routes()
+    assert app.routes[0] is app.target_router
+    assert len(app.routes) == 2
+    assert len(app.target_router.routes) == 2
+
+    client = TestClient(app.starlette)
+    assert client.get("/").status_code == 200
+    response = client.get("/TestComponent/1/count/0/first/2")
+    assert response.status_code == 200
+    assert response.text.strip() == '<div id="TestComponent-1">Hello World 2</div>'
+    response = client.post("/TestComponent/1/count/0/second?second__count=3")
+    assert response.status_code == 200
+    assert response.text.strip() == '<div id="TestComponent-1">Hello World 3</div>'
+
+
+def test_compiled_router_not_found_and_method_not_allowed():
+    app = Redmage(compiled_router=True)
+
+    class TestComponent(Component):
+        async def render(self):
+            return Div("Hello World")
+
+        @Target.get
+        def test_target(self, count: int): ...
+
+    client = TestClient(app.starlette)
+    assert client.get("/TestComponent/1/test_target/a").status_code == 404
+    assert client.get("/TestComponent/1/other/1").status_code == 404
+    assert client.get("/TestComponent/1/test_target/1/2").status_code == 404
+    response = client.post("/TestComponent/1/test_target/1")
+    assert response.status_code == 405
+    assert set(response.headers["Allow"].split(", ")) == {"GET", "HEAD"}
+
+
+def test_compiled_router_trailing_slash_redirect():
+    app = Redmage(compiled_router=True)
+
+    class TestComponent(Component):
+        async def render(self):
+            return Div("Hello World")
+
+        @Target.get
+        def test_target(self, count: int): ...
+
+    client = TestClient(app.starlette)
+    response = client.get("/TestComponent/1/test_target/1/")
+    assert response.status_code == 200
+    assert response.url.path == "/TestComponent/1/test_target/1"
+
+
+def test_target_router_prefers_static_segments():
+    router = TargetRouter()
+    static = Route("/A/{id:str}/items", endpoint, name="static")
+    param = Route("/A/{id:str}/{name:str}", endpoint, name="param")
+    router.add(param)
+    router.add(static)
+
+    scope = {"type": "http", "method": "GET", "path": "/A/1/items"}
+    match, child_scope = router.matches(scope)
+    assert match == Match.FULL
+    assert child_scope["redmage.route"] is static
+    assert child_scope["path_params"] == {"id": "1"}
+
+    scope = {"type": "http", "method": "GET", "path": "/A/1/other"}
+    match, child_scope = router.matches(scope)
+    assert child_scope["redmage.route"] is param
+    assert child_scope["path_params"] == {"id": "1", "name": "other"}
+
+    assert router.matches({"type": "websocket", "path": "/A/1/b"})[0] == Match.NONE
+
+
+def test_target_router_backtracks_typed_segments():
+    router = TargetRouter()
+    ints = Route("/A/{id:str}/m/{n:int}/x", endpoint, name="ints")
+    strs = Route("/A/{id:str}/m/{s:str}/y", endpoint, name="strs")
+    router.add(ints)
+    router.add(strs)
+
+    match, child_scope = router.matches(
+        {"type": "http", "method": "GET", "path": "/A/1/m/2/y"}
+    )
+    assert match == Match.FULL
+    assert child_scope["redmage.route"] is strs
+    assert child_scope["path_params"] == {"id": "1", "s": "2"}
+
+    match, child_scope = router.matches(
+        {"type": "http", "method": "GET", "path": "/A/1/m/2/x"}
+    )
+    assert child_scope["path_params"] == {"id": "1", "n": 2}
+
+
+def test_target_router_unsupported_routes():
+    router = TargetRouter()
+    assert not router.can_add(Route("/A/{id:str}.json", endpoint))
+    assert not router.can_add(Route("/A/{rest:path}", endpoint))
+    assert router.can_add(Route("/A/{id}", endpoint))
+
+
+def test_target_router_url_path_for():
+    router = TargetRouter()
+    router.add(Route("/A/{id:str}/m", endpoint, name="m"))
+    assert router.url_path_for("m", id="1") == "/A/1/m"
+    with pytest.raises(NoMatchFound):
+        router.url_path_for("other")
+
+
+def test_target_router_add_replaces_route():
+    router = TargetRouter()
+    first = Route("/A/{id:str}/m", endpoint, name="m")
+    second = Route("/A/{id:str}/m", endpoint, name="m")
+    router.add(first)
+    router.add(second)
+    assert router.routes == [second]
+    match, child_scope = router.matches(
+        {"type": "http", "method": "GET", "path": "/A/1/m"}
+    )
+    assert child_scope["redmage.route"] is second
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from typing import ClassVar
+
+from starlette.testclient import TestClient
+
+from redmage import Component, Redmage, Target
+from redmage.elements import Div
+from redmage.state import StateSchema
+
+
+def test_state_schema_with_postponed_annotations():
+    class TestComponent(Component):
+        count: int
+        name: str
+        shared: ClassVar[int] = 0
+
+        async def render(self): ...
+
+    schema = TestComponent.get_state_schema()
+    assert [(f.name, f.type_name) for f in schema.fields] == [
+        ("count", "int"),
+        ("name", "str"),
+    ]
+    assert schema.route_path == (
+        "/TestComponent/{id:str}/count/{count:int}/name/{name:str}"
+    )
+    assert TestComponent.get_state_schema() is schema
+
+
+def test_state_schema_does_not_mutate_annotations():
+    class TestComponent(Component):
+        async def render(self): ...
+
+    annotations = dict(Component.__annotations__)
+    assert TestComponent.get_base_path() == "/TestComponent/{id:str}"
+    assert Component.__annotations__ == annotations
+
+
+def test_state_schema_inherits_fields():
+    class ParentComponent(Component):
+        count: int
+
+        async def render(self): ...
+
+    class ChildComponent(ParentComponent):
+        name: str
+
+    assert ChildComponent.get_base_path() == (
+        "/ChildComponent/{id:str}/count/{count:int}/name/{name:str}"
+    )
+    assert (
+        ParentComponent.get_base_path() == "/ParentComponent/{id:str}/count/{count:int}"
+    )
+
+
+def test_state_schema_unresolved_forward_reference():
+    class TestComponent(Component):
+        count: int
+        other: NotDefinedYet  # noqa: F821
+
+        async def render(self): ...
+
+    schema = StateSchema(TestComponent)
+    assert [(f.name, f.type_name) for f in schema.fields] == [
+        ("count", "int"),
+        ("other", "NotDefinedYet"),
+    ]
+    assert schema.fields[1].convertor is None
+
+
+def test_state_schema_target_round_trip():
+    app = Redmage()
+
+    class TestComponent(Component):
+        count: int
+        enabled: bool
+
+        def __init__(self, count: int = 0, enabled: bool = False):
+            self.count = count
+            self.enabled = enabled
+
+        async def render(self):
+            return Div(
+                f"{self.count} {self.enabled}",
+                click=self.test_target(),
+            )
+
+        @Target.get
+        def test_target(self):
+            self.count += 1
+
+    client = TestClient(app.starlette)
+    response = client.get("/TestComponent/1/count/1/enabled/True/test_target")
+    assert response.status_code == 200
+    assert 'hx-get="/TestComponent/1/count/2/enabled/True/test_target"' in response.text
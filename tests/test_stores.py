@@ -0,0 +1,182 @@
+import asyncio
+import sqlite3
+import uuid
+
+import pytest
+from starlette.testclient import TestClient
+
+from redmage import Component, Redmage, Target
+from redmage.elements import Div, Li, Ul
+from redmage.stores import MemoryStateStore, SQLiteStateStore
+from redmage.utils import astr, astream
+
+
+@pytest.mark.asyncio
+async def test_memory_state_store(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("redmage.cache.monotonic", lambda: now[0])
+    store = MemoryStateStore(max_entries=2, ttl=10)
+    store.save("a", {"n": 1})
+    store.save("b", {"n": 2})
+    store.save("c", {"n": 3})
+    assert await store.load("a") is None
+    assert await store.load("b") == {"n": 2}
+    now[0] = 10
+    assert await store.load("c") is None
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_state_store(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = SQLiteStateStore(path, flush_interval=0.01)
+    await store.flush()
+    store.save("a", {"n": 1})
+    store.save("b", {"n": [1, 2]})
+    # queued, loaded from the queue
+    assert store.pending
+    assert await store.load("a") == {"n": 1}
+
+    await asyncio.sleep(0.05)
+    assert store.pending == {}
+    assert (store.writes, store.flushes) == (2, 1)
+    assert await store.load("b") == {"n": [1, 2]}
+    assert await store.load("c") is None
+
+    # other processes read the same database
+    other = SQLiteStateStore(path)
+    assert await other.load("a") == {"n": 1}
+    await other.close()
+
+    store.save("a", {"n": 2})
+    await store.close()
+    store = SQLiteStateStore(path, ttl=None)
+    assert await store.load("a") == {"n": 2}
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_state_store_expired(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("redmage.stores.time.time", lambda: now[0])
+    store = SQLiteStateStore(str(tmp_path / "state.db"), ttl=10)
+    store.save("a", {"n": 1})
+    await store.flush()
+    now[0] += 11
+    assert await store.load("a") is None
+    store.save("b", {"n": 1})
+    await store.close()
+
+    # the expired states are deleted when the next ones are written
+    connection = sqlite3.connect(str(tmp_path / "state.db"))
+    assert connection.execute("SELECT key FROM redmage_state").fetchall() == [("b",)]
+    connection.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_state_store_saved_while_written(tmp_path):
+    store = SQLiteStateStore(str(tmp_path / "state.db"), flush_interval=10)
+    store.save("a", {"n": 1})
+    flush = asyncio.create_task(store.flush())
+    await asyncio.sleep(0)
+    store.save("a", {"n": 2})
+    await flush
+    assert store.pending == {"a": {"n": 2}}
+    await store.close()
+    assert store.pending == {}
+
+
+@pytest.mark.asyncio
+async def test_sqlite_state_store_failed_write(tmp_path, caplog):
+    def dumps(state):
+        raise ValueError("can't serialize")
+
+    store = SQLiteStateStore(str(tmp_path / "state.db"), 0, 0.01, dumps=dumps)
+    store.save("a", {"n": 1})
+    await asyncio.sleep(0.05)
+    assert "Writing the state of components" in caplog.text
+    store.pending.clear()
+    await store.close()
+
+
+def test_redmage_state_store(tmp_path):
+    store = SQLiteStateStore(str(tmp_path / "state.db"))
+    app = Redmage()
+
+    def create_component(name, component_store):
+        class ListComponent(Component):
+            state_store = component_store
+            items: list
+
+            def __init__(self, items: list):
+                self.items = items
+
+            def render(self):
+                return Div(
+                    Ul(*[Li(item) for item in self.items]),
+                    click=self.add("x"),
+                )
+
+            @Target.get
+            def add(self, item: str):
+                self.items = [*self.items, item]
+
+        ListComponent.__name__ = name
+        return ListComponent
+
+    ListComponent = create_component("ListComponent", True)
+    SQLiteComponent = create_component("SQLiteComponent", store)
+
+    class PageComponent(Component, routes=("/",)):
+        def render(self):
+            return Div(ListComponent(["a", "b"]), SQLiteComponent(["c"]))
+
+    with TestClient(app.starlette) as client:
+        html = client.get("/").text
+        ids = [f"{name}-" for name in ("ListComponent", "SQLiteComponent")]
+        paths = []
+        for id in ids:
+            start = html.index(f'id="{id}') + 4
+            id = html[start : html.index('"', start)]
+            # random, not a timestamp that can be guessed from another id
+            assert uuid.UUID(id.partition("-")[2]).version == 4
+            # only the id is in the path
+            paths.append(f"/{id.replace('-', '/', 1)}/add/x")
+            assert f'hx-get="{paths[-1]}"' in html
+
+        def get_items(path):
+            return client.get(path).text.replace("\n", "")
+
+        assert "<li>a</li><li>b</li><li>x</li></ul>" in get_items(paths[0])
+        assert "<li>b</li><li>x</li><li>x</li></ul>" in get_items(paths[0])
+        assert "<li>c</li><li>x</li></ul>" in get_items(paths[1])
+
+        assert client.get("/ListComponent/unknown/add/x").status_code == 410
+
+    assert app.state_stores == [app.state_store, store]
+    # written on shutdown
+    assert store.pending == {}
+    assert store.writes > 0
+
+
+@pytest.mark.asyncio
+async def test_state_saved_when_rendered():
+    app = Redmage()
+
+    class TestComponent(Component):
+        state_store = True
+        n: int
+
+        def __init__(self, n: int):
+            self.n = n
+
+        def render(self):
+            return Div(self.n)
+
+    component = TestComponent(1)
+    await astr(component)
+    assert await app.state_store.load(component.id) == {"n": 1}
+    component.n = 2
+    async for _ in astream(component):
+        pass
+    assert await app.state_store.load(component.id) == {"n": 2}
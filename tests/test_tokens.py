@@ -0,0 +1,168 @@
+import base64
+import uuid
+
+import pytest
+from starlette.convertors import CONVERTOR_TYPES, Convertor
+from starlette.testclient import TestClient
+
+from redmage import Component, Redmage, Target
+from redmage.elements import Div
+from redmage.exceptions import InvalidStateToken
+from redmage.state import StateSchema
+from redmage.tokens import StateCodec
+
+VALUES = (None, True, False, 0, -1, 300, -(2**70), 1.5, "", "héllo", uuid.uuid4())
+CONVERTORS = (None,) * 10 + (CONVERTOR_TYPES["uuid"],)
+
+
+@pytest.mark.parametrize(
+    "codec",
+    [StateCodec(), StateCodec(compress=True), StateCodec(secret="secret")],
+)
+def test_state_codec(codec):
+    token = codec.encode(VALUES, CONVERTORS)
+    assert "=" not in token and "/" not in token and "+" not in token
+    assert codec.decode(token, CONVERTORS) == VALUES
+
+
+def test_state_codec_compress():
+    values = ["a" * 100]
+    assert len(StateCodec(compress=True).encode(values, (None,))) < 30
+    assert len(StateCodec().encode(values, (None,))) > 100
+    # not worth it for a short payload
+    assert StateCodec(compress=True).encode([1], (None,)) == StateCodec().encode(
+        [1], [None]
+    )
+
+
+def test_state_codec_converted_without_convertor():
+    codec = StateCodec()
+    value = uuid.uuid4()
+    assert codec.decode(codec.encode([value], (None,)), (None,)) == (str(value),)
+
+
+def encode_raw(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        "a",  # not base64
+        "",  # no flags
+        encode_raw(b"\x00"),  # missing a value
+        encode_raw(b"\x00\x03\x01\x00"),  # trailing bytes
+        encode_raw(b"\x00\x09"),  # unknown tag
+        encode_raw(b"\x00\x05\x05ab"),  # truncated string
+        encode_raw(b"\x00\x05\x01\xff"),  # not utf-8
+        encode_raw(b"\x00\x04\x00"),  # truncated float
+        encode_raw(b"\x01\x00"),  # not zlib
+    ],
+)
+def test_state_codec_invalid(token):
+    with pytest.raises(InvalidStateToken):
+        StateCodec().decode(token, (None,))
+
+
+def test_state_codec_types():
+    codec = StateCodec()
+    convertors = tuple(
+        CONVERTOR_TYPES[name] for name in ("int", "float", "str", "bool", "uuid")
+    )
+    values = (1, 2, "a", True, uuid.uuid4())
+    assert codec.decode(codec.encode(values, convertors), convertors) == values
+    assert codec.decode(codec.encode((None,) * 5, convertors), convertors) == (
+        (None,) * 5
+    )
+    # a value of another type than the field's is rejected
+    for n, value in enumerate(("1", "1.5", 1, "True", "x")):
+        token = codec.encode(values[:n] + (value,) + values[n + 1 :], (None,) * 5)
+        with pytest.raises(InvalidStateToken):
+            codec.decode(token, convertors)
+    # a convertor whose type isn't known isn't checked
+    route = type("RouteConvertor", (Convertor,), {"regex": "a|b"})()
+    assert codec.decode(codec.encode((1,), (None,)), (route,)) == (1,)
+
+
+def test_state_codec_signed():
+    codec = StateCodec(secret=b"secret")
+    token = codec.encode([1], (None,))
+    with pytest.raises(InvalidStateToken):
+        codec.decode(StateCodec(secret="other").encode([1], (None,)), (None,))
+    with pytest.raises(InvalidStateToken):
+        codec.decode(StateCodec().encode([2], (None,)), (None,))
+    with pytest.raises(InvalidStateToken):
+        StateCodec().decode(token, (CONVERTOR_TYPES["uuid"],))
+
+
+def test_redmage_state_codec():
+    app = Redmage(state_codec=StateCodec(secret="secret", compress=True))
+
+    class TestComponent(Component):
+        count: int
+        message: str
+        ratio: float
+
+        def __init__(self, count: int, message: str, ratio: float):
+            self.count = count
+            self.message = message
+            self.ratio = ratio
+
+        def render(self):
+            return Div(f"{self.count} {self.message} {self.ratio}")
+
+        @Target.get
+        def add(self, n: int, times: int = 1):
+            self.count += n * times
+
+    class StatelessComponent(Component):
+        def render(self):
+            return Div("stateless")
+
+        @Target.get
+        def get(self): ...
+
+    client = TestClient(app.starlette)
+    component = TestComponent(1, "hello " * 20, 0.5)
+    path = component.add(2, times=3).path
+    segments = path.split("?")[0].split("/")
+    assert segments[:3] == ["", "TestComponent", component.id.partition("-")[2]]
+    assert segments[4:] == ["add", "2"]
+    # shorter than a pair of segments per field
+    path_without_codec = StateSchema(TestComponent).build_path(component)
+    assert len(path.split("/add")[0]) < len(path_without_codec)
+
+    response = client.get(path)
+    assert f"7 {'hello ' * 20} 0.5" in response.text
+
+    token = segments[3]
+    response = client.get(path.replace(token, token[:-2] + "AA"))
+    assert response.status_code == 400
+
+    stateless = StatelessComponent()
+    path = stateless.get().path
+    assert path == f"/StatelessComponent/{stateless.id.partition('-')[2]}/get"
+    assert client.get(path).status_code == 200
+
+
+def test_redmage_state_codec_types():
+    Redmage(state_codec=StateCodec())
+
+    class TestComponent(Component):
+        n: int
+
+        def __init__(self, n: int):
+            self.n = n
+
+        def render(self):
+            return Div(self.n + 1)
+
+        @Target.get
+        def get(self): ...
+
+    client = TestClient(Component.app.starlette)
+    path = TestComponent(1).get().path
+    assert client.get(path).text.endswith(">2</div>")
+    token = path.split("/")[3]
+    forged = StateCodec().encode(("1",), (None,))
+    assert client.get(path.replace(token, forged)).status_code == 400
@@ -1,6 +1,9 @@
+import asyncio
 import inspect
 
-from redmage.utils import group_signature_param_by_kind
+import pytest
+
+from redmage.utils import gather_limited, group_signature_param_by_kind
 
 
 def test_group_signature_param_by_kind():
@@ -13,3 +16,46 @@ def test_group_signature_param_by_kind():
     assert len(grouped[inspect.Parameter.POSITIONAL_ONLY]) == 2
     assert len(grouped[inspect.Parameter.POSITIONAL_OR_KEYWORD]) == 2
     assert len(grouped[inspect.Parameter.KEYWORD_ONLY]) == 1
+
+
+@pytest.mark.asyncio
+async def test_gather_limited():
+    running = 0
+    max_running = 0
+
+    def create(n):
+        async def fn():
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            # finish in reverse order
+            await asyncio.sleep(0.001 * (10 - n))
+            running -= 1
+            return n
+
+        return fn
+
+    assert await gather_limited([create(n) for n in range(10)], 3) == list(range(10))
+    assert max_running == 3
+    assert await gather_limited([], 3) == []
+
+
+@pytest.mark.asyncio
+async def test_gather_limited_cancels_on_error():
+    cancelled = False
+
+    async def fail():
+        raise ValueError()
+
+    async def slow():
+        nonlocal cancelled
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    with pytest.raises(ValueError):
+        await gather_limited([slow, fail], 2)
+    await asyncio.sleep(0)
+    assert cancelled
@@ -0,0 +1,174 @@
+import html
+import json
+from dataclasses import dataclass
+
+import pytest
+from starlette.exceptions import HTTPException
+from starlette.testclient import TestClient
+
+from redmage import Component, Redmage, Target
+from redmage.elements import Button, Div
+from redmage.targets import SWAP_PARAM, TARGET_PARAM, WS_PATH
+from redmage.types import HTMXSwap
+from redmage.utils import astr
+from redmage.websockets import connect, parse_message
+
+
+def test_parse_message():
+    message = json.dumps(
+        {
+            TARGET_PARAM: "POST /a/b",
+            "HEADERS": {"HX-Request": "true"},
+            "message": "hi",
+            "tags": ["a", "b"],
+            "n": 1,
+        }
+    )
+    assert parse_message(message) == (
+        "POST /a/b",
+        b"message=hi&tags=a&tags=b&n=1",
+        HTMXSwap.OUTER_HTML,
+    )
+    message = json.dumps({TARGET_PARAM: "GET /a/b", SWAP_PARAM: "innerHTML"})
+    assert parse_message(message) == ("GET /a/b", b"", HTMXSwap.INNER_HTML)
+    # the modifiers of the swap are kept
+    message = json.dumps({TARGET_PARAM: "GET /a/b", SWAP_PARAM: "innerHTML swap:1s"})
+    assert parse_message(message) == ("GET /a/b", b"", "innerHTML swap:1s")
+    message = json.dumps({TARGET_PARAM: "GET /a/b", SWAP_PARAM: "sideways"})
+    assert parse_message(message) is None
+    assert parse_message("not json") is None
+    assert parse_message("[]") is None
+    assert parse_message("{}") is None
+
+
+@pytest.mark.asyncio
+async def test_connect():
+    assert await astr(connect(Div("a"), _class="page")) == (
+        f'\n<div class="page" hx-ext="ws" ws-connect="{WS_PATH}">'
+        "\n<div>a</div></div>"
+    )
+
+
+def create_app():
+    app = Redmage(websocket=True)
+
+    @dataclass
+    class Message:
+        message: str
+
+    class HoverCount(Component):
+        count: int
+
+        def __init__(self, count: int = 0):
+            self.count = count
+
+        def render(self):
+            return Div(self.count, mouse_over=self.set_count(self.count + 1))
+
+        @Target.post
+        def set_count(self, count: int):
+            self.count = count
+
+        @Target.put
+        def set_message(self, message: Message, /):
+            self.message = message.message
+            return Div(self.message, _id=self.id)
+
+        @Target.post
+        def broken(self):
+            raise ValueError("broken")
+
+        @Target.get
+        def missing(self):
+            raise HTTPException(status_code=404)
+
+    return app, HoverCount
+
+
+@pytest.mark.asyncio
+async def test_websocket_attributes():
+    app, HoverCount = create_app()
+    app.create_routes()
+    component = HoverCount()
+    button = await astr(Button("Add", click=component.set_count(1)))
+    vals = {TARGET_PARAM: f"POST {component.set_count(1).path}"}
+    assert f'hx-vals="{html.escape(json.dumps(vals))}"' in button
+    assert " ws-send " in button
+    assert "hx-post" not in button
+    assert "hx-target" not in button
+
+    button = await astr(
+        Button("Add", click=component.set_count(1), swap=HTMXSwap.DELETE)
+    )
+    vals = {**vals, SWAP_PARAM: "delete"}
+    assert f'hx-vals="{html.escape(json.dumps(vals))}"' in button
+
+
+def test_websocket():
+    app, HoverCount = create_app()
+    client = TestClient(app.starlette)
+    component = HoverCount()
+
+    with client.websocket_connect(WS_PATH) as websocket:
+        for count in (1, 2):
+            target = component.set_count(count)
+            websocket.send_json(
+                {TARGET_PARAM: f"POST {target.path}", "HEADERS": {}}
+            )
+            fragment = websocket.receive_text()
+            assert fragment.startswith(
+                f'\n<div hx-swap-oob="true" id="{component.id}" '
+            )
+            assert f">{count}</div>" in fragment
+
+        # the values of the message are the body of the target
+        target = component.set_message()
+        websocket.send_json({TARGET_PARAM: f"PUT {target.path}", "message": "hi"})
+        assert websocket.receive_text() == (
+            f'\n<div hx-swap-oob="outerHTML:#{component.id}" id="{component.id}">'
+            "hi</div>"
+        )
+
+        # with the swap of the element, in place of the invoking component
+        websocket.send_json(
+            {
+                TARGET_PARAM: f"PUT {target.path}",
+                SWAP_PARAM: "innerHTML",
+                "message": "ho",
+            }
+        )
+        assert websocket.receive_text() == (
+            f'<div hx-swap-oob="innerHTML:#{component.id}">'
+            f'\n<div id="{component.id}">ho</div></div>'
+        )
+
+
+def test_websocket_invalid(caplog):
+    app, HoverCount = create_app()
+    client = TestClient(app.starlette)
+    component = HoverCount()
+
+    with client.websocket_connect(WS_PATH) as websocket:
+        websocket.send_text("not json")
+        websocket.send_json({TARGET_PARAM: "GET /unknown"})
+        websocket.send_json({TARGET_PARAM: f"GET {component.missing().path}"})
+        websocket.send_json({TARGET_PARAM: f"POST {component.broken().path}"})
+        # the connection is still open
+        target = component.set_count(5)
+        websocket.send_json({TARGET_PARAM: f"POST {target.path}"})
+        assert ">5</div>" in websocket.receive_text()
+    assert "Invalid WebSocket message" in caplog.text
+    assert "Unknown target GET /unknown" in caplog.text
+    assert "failed" in caplog.text
+    assert "ValueError: broken" in caplog.text
+
+
+def test_websocket_routes():
+    app, HoverCount = create_app()
+    app.create_routes()
+    app.create_routes()
+    assert [getattr(r, "path", None) for r in app.routes].count(WS_PATH) == 1
+
+    Component.components = []
+    app = Redmage()
+    assert all(getattr(r, "path", None) != WS_PATH for r in app.starlette.routes)